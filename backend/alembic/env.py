@@ -10,7 +10,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from app.core.database import Base
 from app.core.config import settings
-from app.models import Analysis, Scenario, Strategy, SearchQuery
+from app.models import Analysis, Scenario, Strategy, SearchQuery, CacheEntry, AnalysisJob
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,37 @@
+"""Add shared cache table
+
+Revision ID: 003_cache_entries
+Revises: 002_remove_auth
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '003_cache_entries'
+down_revision = '002_remove_auth'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'cache_entries',
+        sa.Column('namespace', sa.String(), nullable=False),
+        sa.Column('key', sa.String(), nullable=False),
+        sa.Column('value', postgresql.JSON(astext_type=sa.Text()), nullable=False),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('last_accessed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('namespace', 'key')
+    )
+    op.create_index(op.f('ix_cache_entries_expires_at'), 'cache_entries', ['expires_at'], unique=False)
+    op.create_index(op.f('ix_cache_entries_last_accessed_at'), 'cache_entries', ['last_accessed_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_cache_entries_last_accessed_at'), table_name='cache_entries')
+    op.drop_index(op.f('ix_cache_entries_expires_at'), table_name='cache_entries')
+    op.drop_table('cache_entries')
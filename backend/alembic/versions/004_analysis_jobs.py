@@ -0,0 +1,45 @@
+"""Add analysis job queue
+
+Revision ID: 004_analysis_jobs
+Revises: 003_cache_entries
+Create Date: 2026-10-16 00:00:01.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004_analysis_jobs'
+down_revision = '003_cache_entries'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'analysis_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('analysis_id', sa.Integer(), nullable=False),
+        sa.Column('company_name', sa.String(), nullable=False),
+        sa.Column('status', sa.Enum('QUEUED', 'RUNNING', 'SUCCEEDED', 'FAILED', name='jobstatus'), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('max_attempts', sa.Integer(), nullable=False, server_default='3'),
+        sa.Column('worker_id', sa.String(), nullable=True),
+        sa.Column('lease_expires_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['analysis_id'], ['analyses.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('analysis_id')
+    )
+    op.create_index(op.f('ix_analysis_jobs_id'), 'analysis_jobs', ['id'], unique=False)
+    op.create_index('ix_analysis_jobs_status_created_at', 'analysis_jobs', ['status', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_analysis_jobs_status_created_at', table_name='analysis_jobs')
+    op.drop_index(op.f('ix_analysis_jobs_id'), table_name='analysis_jobs')
+    op.drop_table('analysis_jobs')
+    op.execute('DROP TYPE jobstatus')
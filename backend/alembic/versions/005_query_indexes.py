@@ -0,0 +1,51 @@
+"""Add foreign-key and history listing indexes
+
+Revision ID: 005_query_indexes
+Revises: 004_analysis_jobs
+Create Date: 2026-10-16 00:00:02.000000
+
+Indexes are built CONCURRENTLY so the migration does not block writes on a
+live database. CREATE INDEX CONCURRENTLY cannot run inside a transaction,
+hence the autocommit block. If a build fails part way, Postgres leaves an
+INVALID index behind; drop it and run the migration again.
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '005_query_indexes'
+down_revision = '004_analysis_jobs'
+branch_labels = None
+depends_on = None
+
+# (index name, table, columns)
+INDEXES = [
+    # Detail reads and cascade deletes filter children by their parent id
+    ('ix_scenarios_analysis_id', 'scenarios', ['analysis_id']),
+    ('ix_strategies_scenario_id', 'strategies', ['scenario_id']),
+    ('ix_search_queries_analysis_id', 'search_queries', ['analysis_id']),
+    # History listing: latest analyses by status, and the keyset pagination order
+    ('ix_analyses_status_created_at', 'analyses', ['status', 'created_at']),
+    ('ix_analyses_created_at_id', 'analyses', ['created_at', 'id']),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name, table, columns,
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(
+                name, table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True
+            )
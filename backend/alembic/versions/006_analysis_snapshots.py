@@ -0,0 +1,26 @@
+"""Add stored detail snapshots for completed analyses
+
+Revision ID: 006_analysis_snapshots
+Revises: 005_query_indexes
+Create Date: 2026-10-16 00:00:03.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006_analysis_snapshots'
+down_revision = '005_query_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing completed analyses get their snapshot on their next detail read
+    op.add_column('analyses', sa.Column('result_snapshot', sa.LargeBinary(), nullable=True))
+    op.add_column('analyses', sa.Column('result_etag', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('analyses', 'result_etag')
+    op.drop_column('analyses', 'result_snapshot')
@@ -0,0 +1,97 @@
+from typing import Any, Optional
+import asyncio
+import logging
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_checkpointer: Optional[Any] = None
+_pool: Optional[Any] = None
+_lock = asyncio.Lock()
+
+
+def _postgres_conninfo(database_url: str) -> str:
+    # psycopg 3 takes a libpq URL, without SQLAlchemy's driver suffix
+    from sqlalchemy.engine import make_url
+    return make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+async def _open_postgres_saver(database_url: str):
+    global _pool
+    from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+    from psycopg.rows import dict_row
+    from psycopg_pool import AsyncConnectionPool
+
+    _pool = AsyncConnectionPool(
+        conninfo=_postgres_conninfo(database_url),
+        max_size=settings.CHECKPOINT_POOL_SIZE,
+        # Settings required by AsyncPostgresSaver
+        kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+        open=False
+    )
+    await _pool.open()
+    saver = AsyncPostgresSaver(_pool)  # type: ignore[arg-type]
+    # Creates or migrates the checkpoint tables; safe to run on every start
+    await saver.setup()
+    return saver
+
+
+async def _close_pool():
+    global _pool
+    pool, _pool = _pool, None
+    if pool is not None:
+        try:
+            await pool.close()
+        except Exception as e:
+            logger.warning(f"[CHECKPOINT] Error closing checkpoint pool: {type(e).__name__}: {e}")
+
+
+async def get_checkpointer() -> Optional[Any]:
+    """
+    Return the process-wide pipeline checkpointer, creating it on first use
+
+    Selected by PIPELINE_CHECKPOINTER: "postgres" stores checkpoints in the
+    application database (AsyncPostgresSaver), "memory" keeps them in this
+    process only, "none" disables checkpointing. "postgres" falls back to
+    memory when the database is not Postgres (local SQLite setups) or the
+    Postgres checkpointer cannot be set up (missing package, connection or
+    migration failure), so analyses still run without resumable checkpoints.
+
+    Returns:
+        A LangGraph checkpoint saver, or None when disabled
+    """
+    global _checkpointer
+    backend = settings.PIPELINE_CHECKPOINTER
+    if backend == "none":
+        return None
+    async with _lock:
+        if _checkpointer is not None:
+            return _checkpointer
+        if backend not in ("postgres", "memory"):
+            raise ValueError(f"Unknown pipeline checkpointer: {backend}")
+        if backend == "postgres" and settings.DATABASE_URL.startswith("postgresql"):
+            try:
+                _checkpointer = await _open_postgres_saver(settings.DATABASE_URL)
+                logger.info("[CHECKPOINT] Using Postgres checkpointer")
+                return _checkpointer
+            except Exception as e:
+                # Checkpoints only serve resume; never let them fail the analysis itself
+                logger.error(
+                    f"[CHECKPOINT] Postgres checkpointer unavailable ({type(e).__name__}: {e}), "
+                    "keeping pipeline checkpoints in memory",
+                    exc_info=True
+                )
+                await _close_pool()
+        elif backend == "postgres":
+            logger.warning("[CHECKPOINT] DATABASE_URL is not Postgres, keeping pipeline checkpoints in memory")
+        from langgraph.checkpoint.memory import InMemorySaver
+        _checkpointer = InMemorySaver()
+        return _checkpointer
+
+
+async def close_checkpointer():
+    """Release the checkpointer's connection pool (called on shutdown)"""
+    global _checkpointer
+    _checkpointer = None
+    await _close_pool()
@@ -0,0 +1,110 @@
+from typing import Any, Dict, List, Optional
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalArrayParser:
+    """
+    Incremental parser for LLM responses shaped like {"<key>": [{...}, {...}]}
+
+    Text is fed in arbitrary chunks as it streams in; every element of the
+    target array is returned as soon as its closing brace has arrived, without
+    waiting for the rest of the document. A bare top-level array ([{...}, ...])
+    is accepted too, matching the fallback the agents already allow.
+
+    The parser only tracks nesting and string boundaries. Each finished
+    element is decoded with json.loads, and elements that fail to decode are
+    skipped (and logged); the agents still parse the complete text at the end.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start: Optional[int] = None
+        self._last_string: Optional[str] = None
+        self._current_key: Optional[str] = None
+        self._target_depth: Optional[int] = None
+        self._element_start: Optional[int] = None
+        self._text = ""
+        self.count = 0
+        self.done = False
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """
+        Add streamed text
+
+        Returns:
+            Array elements completed by this chunk, in order
+        """
+        self._text += chunk
+        completed: List[Dict[str, Any]] = []
+        text = self._text
+        stack = self._stack
+
+        for i in range(self._pos, len(text)):
+            char = text[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if len(stack) == 1 and stack[0] == "{" and self._string_start is not None:
+                        # Possibly a top-level key; confirmed when the ':' arrives
+                        self._last_string = text[self._string_start + 1:i]
+                    self._string_start = None
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = i
+            elif char == ":":
+                if len(stack) == 1 and stack[0] == "{":
+                    self._current_key = self._last_string
+            elif char == "{":
+                if self._target_depth is not None and len(stack) == self._target_depth:
+                    self._element_start = i
+                stack.append("{")
+            elif char == "[":
+                stack.append("[")
+                if self._target_depth is None and not self.done:
+                    if len(stack) == 1:
+                        self._target_depth = 1  # bare top-level array
+                    elif len(stack) == 2 and stack[0] == "{" and self._current_key == self.key:
+                        self._target_depth = 2
+            elif char == "}":
+                if stack:
+                    stack.pop()
+                if self._target_depth is not None and len(stack) == self._target_depth and self._element_start is not None:
+                    element = self._decode(text[self._element_start:i + 1])
+                    self._element_start = None
+                    if element is not None:
+                        completed.append(element)
+            elif char == "]":
+                if stack:
+                    stack.pop()
+                if self._target_depth is not None and len(stack) < self._target_depth:
+                    self._target_depth = None
+                    self.done = True
+
+        self._pos = len(text)
+        self.count += len(completed)
+        return completed
+
+    def _decode(self, raw: str) -> Optional[Dict[str, Any]]:
+        try:
+            # strict=False tolerates raw newlines inside strings, which LLMs emit
+            value = json.loads(raw, strict=False)
+        except json.JSONDecodeError as e:
+            logger.warning(f"[JSON STREAM] Skipping undecodable '{self.key}' element: {e}")
+            return None
+        if not isinstance(value, dict):
+            return None
+        return value
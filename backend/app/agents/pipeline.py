@@ -1,13 +1,46 @@
-from typing import TypedDict, List, Dict, Any, Optional, Callable
+from typing import Annotated, TypedDict, List, Dict, Any, Optional, Callable, Tuple
 from langgraph.graph import StateGraph, END
+from langgraph.types import Send
 import asyncio
+import inspect
 import logging
+import time
+from app.core.config import settings
+from app.core.concurrency import ConcurrencyLimiter
 from app.agents.research_agent import research_agent
-from app.agents.scenario_agent import scenario_agent
+from app.agents.scenario_agent import scenario_agent, MAX_SCENARIOS
 from app.agents.strategy_agent import strategy_agent
 
 logger = logging.getLogger(__name__)
 
+# Shared by every pipeline in the process so concurrent analyses cannot
+# multiply the number of strategy generations hitting Groq at once
+strategy_limiter = ConcurrencyLimiter(settings.STRATEGY_CONCURRENCY, name="STRATEGIES")
+
+# Streamed text is forwarded in batches so a token-by-token stream does not
+# turn into one progress event per token
+STREAM_FLUSH_CHARS = 200
+STREAM_FLUSH_INTERVAL = 0.25  # seconds
+
+
+def _accepts_data(callback: Optional[Callable]) -> bool:
+    """Whether a progress callback takes the optional third `data` argument"""
+    if callback is None:
+        return False
+    try:
+        params = list(inspect.signature(callback).parameters.values())
+    except (TypeError, ValueError):
+        return False
+    if any(p.kind == inspect.Parameter.VAR_POSITIONAL for p in params):
+        return True
+    positional = [p for p in params if p.kind in (inspect.Parameter.POSITIONAL_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD)]
+    return len(positional) >= 3
+
+
+def _merge_strategy_results(left: Dict[int, List[Dict[str, Any]]], right: Dict[int, List[Dict[str, Any]]]) -> Dict[int, List[Dict[str, Any]]]:
+    """Reducer combining the per-scenario writes of parallel strategy tasks"""
+    return {**(left or {}), **(right or {})}
+
 
 class AnalysisState(TypedDict):
     company_name: str
@@ -15,22 +48,63 @@ class AnalysisState(TypedDict):
     search_results: Dict[str, Any]
     company_context: str
     scenarios: List[Dict[str, Any]]
+    # Strategies of each finished scenario, keyed by scenario index; written by
+    # one graph task per scenario so each is checkpointed on its own
+    strategy_results: Annotated[Dict[int, List[Dict[str, Any]]], _merge_strategy_results]
     strategies: Dict[str, List[Dict[str, Any]]]
     current_step: str
     progress_message: str
 
 
+class StrategyTask(TypedDict):
+    """Input of the strategy node: one scenario to generate strategies for"""
+    company_name: str
+    company_context: str
+    scenario: Dict[str, Any]
+    index: int
+    total: int
+
+
+def thread_id_for(analysis_id: int) -> str:
+    """Checkpoint thread of an analysis"""
+    return f"analysis-{analysis_id}"
+
+
 class AnalysisPipeline:
-    """LangGraph pipeline for strategic futures analysis"""
+    """
+    LangGraph pipeline for strategic futures analysis
     
-    def __init__(self, progress_callback: Optional[Callable[[str, str], None]] = None):
+    With a checkpointer, the graph state is saved after research, after
+    scenarios and after each scenario's strategies, under a thread id per
+    analysis. resume() continues a failed or interrupted run from there, so
+    an upstream outage costs the unfinished stage rather than the whole run.
+    """
+    
+    def __init__(
+        self,
+        progress_callback: Optional[Callable[[str, str], None]] = None,
+        limiter: Optional[ConcurrencyLimiter] = None,
+        checkpointer: Optional[Any] = None
+    ):
         """
         Initialize the pipeline
         
         Args:
-            progress_callback: Optional callback function(event_type, message) for progress updates
+            progress_callback: Optional callback function(event_type, message) for progress updates.
+                Callbacks taking a third `data` argument also receive structured
+                payloads, such as each scenario as soon as it has been generated.
+            limiter: Concurrency limiter for strategy generation (defaults to the shared strategy_limiter)
+            checkpointer: LangGraph checkpoint saver (see app.agents.checkpointing);
+                without one nothing is saved and resume() starts over
         """
         self.progress_callback = progress_callback
+        self.checkpointer = checkpointer
+        self._callback_accepts_data = _accepts_data(progress_callback)
+        self.limiter = limiter or strategy_limiter
+        # Strategy generations started while scenarios are still streaming in,
+        # keyed by scenario index: (scenario title, task)
+        self._early_strategies: Dict[int, Tuple[Any, asyncio.Task]] = {}
+        self._strategies_done = 0
         self.graph = self._build_graph()
     
     def _build_graph(self) -> StateGraph:
@@ -40,30 +114,59 @@ class AnalysisPipeline:
         # Add nodes
         workflow.add_node("research", self._research_node)
         workflow.add_node("scenarios", self._scenarios_node)
+        workflow.add_node("strategy", self._strategy_node, input_schema=StrategyTask)
         workflow.add_node("strategies", self._strategies_node)
         
-        # Define edges
+        # Define edges: one strategy task per scenario, then collect them in order
         workflow.set_entry_point("research")
         workflow.add_edge("research", "scenarios")
-        workflow.add_edge("scenarios", "strategies")
+        workflow.add_conditional_edges("scenarios", self._route_strategies, ["strategy", "strategies"])
+        workflow.add_edge("strategy", "strategies")
         workflow.add_edge("strategies", END)
         
-        return workflow.compile()
+        return workflow.compile(checkpointer=self.checkpointer)
     
-    async def _emit_progress(self, event_type: str, message: str):
+    async def _emit_progress(self, event_type: str, message: str, data: Optional[Dict[str, Any]] = None):
         """Emit progress event if callback is set"""
         msg_preview = (message or "")[:50] if message else ""
         logger.debug(f"[PIPELINE] Emitting progress event: {event_type} - {msg_preview}")
         if self.progress_callback:
             try:
+                args = (event_type, message, data) if data is not None and self._callback_accepts_data else (event_type, message)
                 # Callback is now async, so await it
                 if asyncio.iscoroutinefunction(self.progress_callback):
-                    await self.progress_callback(event_type, message)
+                    await self.progress_callback(*args)
                 else:
-                    self.progress_callback(event_type, message)
+                    self.progress_callback(*args)
             except Exception as e:
                 logger.error(f"[PIPELINE] Error in progress callback: {e}", exc_info=True)
     
+    def _stream_forwarder(self, event_type: str):
+        """
+        Create a chunk callback that forwards streamed text as progress events
+        
+        Returns:
+            (forward, flush): forward(chunk) buffers text and emits it once enough
+            has accumulated; flush() emits whatever is left
+        """
+        buffer: List[str] = []
+        last_flush = time.monotonic()
+        
+        async def flush():
+            nonlocal last_flush
+            if buffer:
+                text = "".join(buffer)
+                buffer.clear()
+                await self._emit_progress(event_type, text)
+            last_flush = time.monotonic()
+        
+        async def forward(chunk: str):
+            buffer.append(chunk)
+            if sum(len(part) for part in buffer) >= STREAM_FLUSH_CHARS or time.monotonic() - last_flush >= STREAM_FLUSH_INTERVAL:
+                await flush()
+        
+        return forward, flush
+    
     async def _research_node(self, state: AnalysisState) -> AnalysisState:
         """Research node: Generate questions and search"""
         company_name = state["company_name"]
@@ -72,7 +175,15 @@ class AnalysisPipeline:
         
         try:
             logger.debug(f"[PIPELINE] Calling research_agent for: {company_name}")
-            research_result = await research_agent(company_name)
+            if self.progress_callback:
+                # Stream the company context to listeners while it is being written
+                forward_context, flush_context = self._stream_forwarder("research_context_delta")
+                try:
+                    research_result = await research_agent(company_name, on_context_chunk=forward_context)
+                finally:
+                    await flush_context()
+            else:
+                research_result = await research_agent(company_name)
             logger.debug(f"[PIPELINE] Research agent completed, got {len(research_result.get('research_questions', []))} questions")
             
             state["research_questions"] = research_result["research_questions"]
@@ -97,11 +208,27 @@ class AnalysisPipeline:
         logger.debug(f"[PIPELINE] Starting scenarios node for: {company_name}")
         await self._emit_progress("scenarios_start", "Generating future scenarios...")
         
+        async def on_scenario(scenario: Dict[str, Any]):
+            # Publish each scenario and start its strategies while the rest are still being generated
+            index = len(self._early_strategies)
+            title = scenario.get("title")
+            logger.debug(f"[PIPELINE] Scenario {index+1} received early, starting its strategies: {title}")
+            await self._emit_progress("scenario_ready", f"Scenario {index+1} ready: {title}", data={"scenario": scenario})
+            task = asyncio.create_task(self._generate_scenario_strategies(
+                company_name,
+                state["company_context"],
+                dict(scenario),
+                index,
+                MAX_SCENARIOS
+            ))
+            self._early_strategies[index] = (title, task)
+        
         try:
             logger.debug(f"[PIPELINE] Calling scenario_agent for: {company_name}")
             scenarios = await scenario_agent(
                 company_name,
-                state["company_context"]
+                state["company_context"],
+                on_scenario=on_scenario
             )
             logger.debug(f"[PIPELINE] Scenario agent completed, generated {len(scenarios)} scenarios")
             
@@ -111,68 +238,134 @@ class AnalysisPipeline:
             
             await self._emit_progress("scenarios_complete", f"Generated {len(scenarios)} scenarios")
             logger.debug(f"[PIPELINE] Scenarios node completed successfully")
+            await self._emit_progress("strategies_start", "Generating strategic recommendations...")
         except Exception as e:
             logger.error(f"[PIPELINE] CRITICAL: Error in scenarios node: {type(e).__name__}: {str(e)}", exc_info=True)
+            await self._cancel_early_strategies()
             state["progress_message"] = f"Scenarios error: {str(e)}"
             await self._emit_progress("scenarios_error", f"Scenarios error: {str(e)}")
             raise
         
         return state
     
+    async def _generate_scenario_strategies(
+        self,
+        company_name: str,
+        company_context: str,
+        scenario: Dict[str, Any],
+        index: int,
+        total: int
+    ) -> List[Dict[str, Any]]:
+        """Generate strategies for one scenario, retrying only this scenario on failure"""
+        max_attempts = max(1, settings.STRATEGY_MAX_ATTEMPTS)
+        for attempt in range(max_attempts):
+            try:
+                async with self.limiter:
+                    logger.debug(f"[PIPELINE] Generating strategies for scenario {index+1}/{total} (attempt {attempt + 1}/{max_attempts})")
+                    return await strategy_agent(company_name, company_context, scenario)
+            except Exception as e:
+                if attempt < max_attempts - 1:
+                    logger.warning(f"[PIPELINE] Strategy generation failed for scenario {index+1}/{total}, retrying: {type(e).__name__}: {str(e)}")
+                    await asyncio.sleep(settings.STRATEGY_RETRY_DELAY)
+                    continue
+                raise
+        return []  # unreachable, keeps type checkers happy
+    
+    def _route_strategies(self, state: AnalysisState):
+        """Fan out one strategy task per scenario that has no strategies yet"""
+        done = state.get("strategy_results") or {}
+        tasks = [
+            Send("strategy", {
+                "company_name": state["company_name"],
+                "company_context": state["company_context"],
+                "scenario": scenario,
+                "index": i,
+                "total": len(state["scenarios"])
+            })
+            for i, scenario in enumerate(state["scenarios"])
+            if i not in done
+        ]
+        return tasks or "strategies"
+    
+    async def _strategy_node(self, task: StrategyTask) -> Dict[str, Any]:
+        """Strategy node: Generate strategies for one scenario"""
+        i = task["index"]
+        scenario = task["scenario"]
+        num_scenarios = task["total"]
+        try:
+            early = self._early_strategies.pop(i, None)
+            if early and early[0] == scenario.get("title"):
+                # Already started while the scenarios were streaming in
+                strategies = await early[1]
+            else:
+                if early:
+                    early[1].cancel()
+                strategies = await self._generate_scenario_strategies(
+                    task["company_name"],
+                    task["company_context"],
+                    scenario,
+                    i,
+                    num_scenarios
+                )
+        except Exception as e:
+            logger.error(f"[PIPELINE] CRITICAL: Strategy generation failed for scenario {i+1}/{num_scenarios}: {type(e).__name__}: {str(e)}", exc_info=True)
+            await self._emit_progress("strategies_error", f"Strategies error: {str(e)}")
+            raise
+        
+        self._strategies_done += 1
+        logger.debug(f"[PIPELINE] Generated {len(strategies)} strategies for scenario {i+1}")
+        await self._emit_progress(
+            "strategy_progress",
+            f"Generated strategies for scenario {i+1}/{num_scenarios} ({self._strategies_done}/{num_scenarios} complete)"
+        )
+        return {"strategy_results": {i: strategies}}
+    
     async def _strategies_node(self, state: AnalysisState) -> AnalysisState:
-        """Strategies node: Generate strategies for each scenario"""
+        """Strategies node: Collect the per-scenario strategies in scenario order"""
         company_name = state["company_name"]
-        num_scenarios = len(state["scenarios"])
-        logger.debug(f"[PIPELINE] Starting strategies node for: {company_name}, {num_scenarios} scenarios")
-        await self._emit_progress("strategies_start", "Generating strategic recommendations...")
-        
+        results = state.get("strategy_results") or {}
         try:
+            # Build the dict in scenario order regardless of completion order
             strategies_dict = {}
-            
             for i, scenario in enumerate(state["scenarios"]):
-                scenario_title = scenario.get("title", f"scenario_{i+1}")
-                logger.debug(f"[PIPELINE] Processing scenario {i+1}/{num_scenarios}: {scenario_title}")
-                await self._emit_progress(
-                    "strategy_progress",
-                    f"Generating strategies for scenario {i+1}/{num_scenarios}..."
-                )
-                
-                strategies = await strategy_agent(
-                    company_name,
-                    state["company_context"],
-                    scenario
-                )
-                logger.debug(f"[PIPELINE] Generated {len(strategies)} strategies for scenario {i+1}")
-                
                 # Use scenario title or number as key
                 scenario_key = scenario.get("title", f"scenario_{scenario.get('scenario_number', i+1)}")
-                strategies_dict[scenario_key] = strategies
-                
-                # Add a small delay between strategy generation to avoid rate limits
-                # (except after the last scenario)
-                if i < num_scenarios - 1:
-                    await asyncio.sleep(1)
+                strategies_dict[scenario_key] = results.get(i, [])
             
             state["strategies"] = strategies_dict
             state["current_step"] = "strategies"
             state["progress_message"] = "All strategies generated"
             
             await self._emit_progress("strategies_complete", "All strategic recommendations completed")
-            logger.debug(f"[PIPELINE] Strategies node completed successfully, total strategies: {sum(len(s) for s in strategies_dict.values())}")
-        except Exception as e:
-            logger.error(f"[PIPELINE] CRITICAL: Error in strategies node: {type(e).__name__}: {str(e)}", exc_info=True)
-            state["progress_message"] = f"Strategies error: {str(e)}"
-            await self._emit_progress("strategies_error", f"Strategies error: {str(e)}")
-            raise
+            logger.debug(f"[PIPELINE] Strategies node completed for {company_name}, total strategies: {sum(len(s) for s in strategies_dict.values())}")
+        finally:
+            # Early generations for scenarios that did not make the final list
+            await self._cancel_early_strategies()
         
         return state
     
-    async def run(self, company_name: str) -> AnalysisState:
+    async def _cancel_early_strategies(self):
+        """Cancel and reap any early strategy generations that are still pending"""
+        tasks = [task for _, task in self._early_strategies.values()]
+        self._early_strategies.clear()
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
+    def _config(self, thread_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        if self.checkpointer is None:
+            return None
+        return {"configurable": {"thread_id": thread_id or f"pipeline-{id(self)}"}}
+    
+    async def run(self, company_name: str, thread_id: Optional[str] = None) -> AnalysisState:
         """
         Run the analysis pipeline
         
         Args:
             company_name: Name of the company to analyze
+            thread_id: Checkpoint thread (see thread_id_for); any checkpoints
+                already saved under it are discarded first
             
         Returns:
             Final analysis state
@@ -183,26 +376,68 @@ class AnalysisPipeline:
             "search_results": {},
             "company_context": "",
             "scenarios": [],
+            "strategy_results": {},
             "strategies": {},
             "current_step": "initializing",
             "progress_message": "Starting analysis..."
         }
+        config = self._config(thread_id)
+        if config is not None:
+            await self.checkpointer.adelete_thread(config["configurable"]["thread_id"])
         
-        try:
-            logger.info(f"[PIPELINE] Starting pipeline execution for: {company_name}")
-            await self._emit_progress("analysis_start", f"Starting analysis for {company_name}")
+        logger.info(f"[PIPELINE] Starting pipeline execution for: {company_name}")
+        await self._emit_progress("analysis_start", f"Starting analysis for {company_name}")
+        return await self._invoke(company_name, initial_state, config)
+    
+    async def resume(self, company_name: str, thread_id: str) -> AnalysisState:
+        """
+        Continue a run from its last checkpoint
+        
+        Stages that finished before the failure are not run again: the graph
+        picks up at the node that was interrupted, and for the strategies
+        stage only scenarios without saved strategies are regenerated. Falls
+        back to a full run when nothing was checkpointed.
+        
+        Args:
+            company_name: Name of the company to analyze
+            thread_id: Checkpoint thread the run was started with
             
+        Returns:
+            Final analysis state
+        """
+        config = self._config(thread_id)
+        snapshot = await self.graph.aget_state(config) if config is not None else None
+        if snapshot is None or not snapshot.values:
+            logger.info(f"[PIPELINE] No checkpoint for {thread_id}, starting over")
+            return await self.run(company_name, thread_id)
+        if not snapshot.next:
+            logger.info(f"[PIPELINE] Checkpoint for {thread_id} is already complete")
+            return snapshot.values  # type: ignore
+        
+        self._strategies_done = len(snapshot.values.get("strategy_results") or {})
+        next_nodes = ", ".join(sorted(set(snapshot.next)))
+        logger.info(f"[PIPELINE] Resuming pipeline for {company_name} at: {next_nodes}")
+        await self._emit_progress("analysis_start", f"Resuming analysis for {company_name} at: {next_nodes}")
+        return await self._invoke(company_name, None, config)
+    
+    async def discard_checkpoints(self, thread_id: str):
+        """Delete the checkpoints of a thread once its results are stored elsewhere"""
+        if self.checkpointer is not None:
+            await self.checkpointer.adelete_thread(thread_id)
+    
+    async def _invoke(self, company_name: str, graph_input: Optional[AnalysisState], config: Optional[Dict[str, Any]]) -> AnalysisState:
+        # No analysis_complete/analysis_failed here: streams close on those, so
+        # the caller sends them once the outcome has been stored
+        try:
             # Run the graph
             logger.debug(f"[PIPELINE] Invoking LangGraph workflow...")
-            final_state = await self.graph.ainvoke(initial_state)
+            final_state = await self.graph.ainvoke(graph_input, config)
             logger.debug(f"[PIPELINE] LangGraph workflow completed successfully")
             
-            await self._emit_progress("analysis_complete", "Analysis completed successfully")
             logger.info(f"[PIPELINE] Pipeline execution completed successfully for: {company_name}")
             return final_state
             
         except Exception as e:
             logger.error(f"[PIPELINE] CRITICAL: Pipeline execution failed for {company_name}: {type(e).__name__}: {str(e)}", exc_info=True)
-            await self._emit_progress("analysis_failed", f"Analysis failed: {str(e)}")
+            await self._cancel_early_strategies()
             raise
-
@@ -1,4 +1,5 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Callable, Awaitable
+from app.core.config import settings
 from app.services.groq_service import groq_service
 from app.services.tavily_service import tavily_service
 import json
@@ -8,12 +9,85 @@ import asyncio
 logger = logging.getLogger(__name__)
 
 
-async def research_agent(company_name: str) -> Dict[str, Any]:
+async def _search_question(
+    question: str,
+    index: int,
+    total: int,
+    semaphore: asyncio.Semaphore,
+    timeout: Optional[float]
+) -> List[Dict[str, Any]]:
+    """
+    Run the Tavily search for a single research question
+    
+    Failures are isolated to the question: a search that errors, is cancelled
+    or exceeds the timeout yields an empty result list.
+    """
+    async with semaphore:
+        try:
+            logger.info(f"Searching for question {index+1}/{total}: {question}")
+            return await asyncio.wait_for(
+                tavily_service.search(query=question, max_results=5),
+                timeout=timeout
+            )
+        except asyncio.TimeoutError:
+            logger.error(f"[RESEARCH] Search timed out after {timeout}s for question '{question}'")
+            return []
+        except asyncio.CancelledError as e:
+            logger.error(f"[RESEARCH] Search cancelled for question '{question}': {e}", exc_info=True)
+            return []
+        except Exception as e:
+            logger.error(f"[RESEARCH] Error searching for question '{question}': {type(e).__name__}: {str(e)}", exc_info=True)
+            return []
+
+
+async def search_questions(
+    research_questions: List[str],
+    max_concurrency: Optional[int] = None,
+    timeout: Optional[float] = None
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Search for all research questions concurrently
+    
+    Args:
+        research_questions: Questions to search for
+        max_concurrency: Maximum number of searches in flight at once
+            (defaults to RESEARCH_SEARCH_CONCURRENCY; 1 searches sequentially)
+        timeout: Per-question timeout in seconds (defaults to RESEARCH_SEARCH_TIMEOUT)
+        
+    Returns:
+        Dictionary mapping each question to its results, in question order
+    """
+    if max_concurrency is None:
+        max_concurrency = settings.RESEARCH_SEARCH_CONCURRENCY
+    if timeout is None:
+        timeout = settings.RESEARCH_SEARCH_TIMEOUT
+    
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    total = len(research_questions)
+    results = await asyncio.gather(*[
+        _search_question(question, i, total, semaphore, timeout)
+        for i, question in enumerate(research_questions)
+    ])
+    
+    # gather preserves input order, so results line up with the questions
+    return dict(zip(research_questions, results))
+
+
+async def research_agent(
+    company_name: str,
+    max_concurrency: Optional[int] = None,
+    search_timeout: Optional[float] = None,
+    on_context_chunk: Optional[Callable[[str], Awaitable[None]]] = None
+) -> Dict[str, Any]:
     """
     Research Agent: Generate research questions and search for information
     
     Args:
         company_name: Name of the company to research
+        max_concurrency: Maximum number of concurrent searches (see search_questions)
+        search_timeout: Per-question search timeout in seconds
+        on_context_chunk: Optional async callback; when set, the company context
+            is streamed and each piece of text is passed to it as it arrives
         
     Returns:
         Dictionary with research_questions, search_results, and company_context
@@ -83,19 +157,12 @@ Format: {{"questions": ["Question 1?", "Question 2?", ...]}}
             f"What are {company_name}'s strategic priorities and recent initiatives?"
         ]
     
-    # Step 2: Search for each question
-    search_results = {}
-    for i, question in enumerate(research_questions):
-        try:
-            logger.info(f"Searching for question {i+1}/{len(research_questions)}: {question}")
-            results = await tavily_service.search(query=question, max_results=5)
-            search_results[question] = results
-        except asyncio.CancelledError as e:
-            logger.error(f"[RESEARCH] Search cancelled for question '{question}': {e}", exc_info=True)
-            search_results[question] = []
-        except Exception as e:
-            logger.error(f"[RESEARCH] Error searching for question '{question}': {type(e).__name__}: {str(e)}", exc_info=True)
-            search_results[question] = []
+    # Step 2: Search for each question (concurrently, bounded by max_concurrency)
+    search_results = await search_questions(
+        research_questions,
+        max_concurrency=max_concurrency,
+        timeout=search_timeout
+    )
     
     # Step 3: Synthesize findings into company context
     # Prepare search results with URLs preserved for citations
@@ -140,13 +207,27 @@ CRITICAL REQUIREMENTS:
 Format as a well-structured markdown document with clear sections.
 """
     
+    synthesis_system_prompt = "You are a strategic business analyst with a deep understanding of industry analysis and market research. Include specific financial metrics and cite sources with URLs."
+    
     try:
-        company_context = await groq_service.generate(
-            prompt=synthesis_prompt,
-            system_prompt="You are a strategic business analyst with a deep understanding of industry analysis and market research. Include specific financial metrics and cite sources with URLs.",
-            temperature=0.7,
-            max_tokens=4000  # Increased to accommodate financial data and citations
-        )
+        if on_context_chunk:
+            parts = []
+            async for chunk in groq_service.generate_stream(
+                prompt=synthesis_prompt,
+                system_prompt=synthesis_system_prompt,
+                temperature=0.7,
+                max_tokens=4000
+            ):
+                parts.append(chunk)
+                await on_context_chunk(chunk)
+            company_context = "".join(parts)
+        else:
+            company_context = await groq_service.generate(
+                prompt=synthesis_prompt,
+                system_prompt=synthesis_system_prompt,
+                temperature=0.7,
+                max_tokens=4000  # Increased to accommodate financial data and citations
+            )
         logger.info("Successfully synthesized company context")
     except Exception as e:
         logger.error(f"Error synthesizing context: {e}")
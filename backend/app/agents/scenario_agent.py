@@ -1,5 +1,6 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Callable, Awaitable
 from app.services.groq_service import groq_service
+from app.agents.json_stream import IncrementalArrayParser
 import json
 import logging
 import re
@@ -36,13 +37,34 @@ def sanitize_json_string(text: str) -> str:
     return text
 
 
-async def scenario_agent(company_name: str, company_context: str) -> List[Dict[str, Any]]:
+MAX_SCENARIOS = 4
+
+
+def normalize_scenario(scenario: Dict[str, Any], index: int) -> Dict[str, Any]:
+    """Fill in scenario_number and a valid likelihood for the scenario at position `index`"""
+    if "scenario_number" not in scenario:
+        scenario["scenario_number"] = index + 1
+    if "likelihood" not in scenario:
+        scenario["likelihood"] = 0.25
+    elif not isinstance(scenario["likelihood"], (int, float)):
+        scenario["likelihood"] = 0.25
+    return scenario
+
+
+async def scenario_agent(
+    company_name: str,
+    company_context: str,
+    on_scenario: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
+) -> List[Dict[str, Any]]:
     """
     Scenario Agent: Generate 4 diverse future scenarios
     
     Args:
         company_name: Name of the company
         company_context: Research context about the company
+        on_scenario: Optional async callback; when set, the response is streamed
+            and each scenario is passed to it (normalized) as soon as it has
+            been fully received, before the rest of the response arrives
         
     Returns:
         List of 4 scenario dictionaries
@@ -91,13 +113,33 @@ Ensure all string values are properly quoted and escaped. Generate exactly 4 div
 """
     
     try:
-        response = await groq_service.generate(
-            prompt=scenario_prompt,
-            system_prompt="You are a strategic futurist. You must return valid JSON only.",
-            temperature=0.8,
-            max_tokens=3000,
-            json_mode=True
-        )
+        if on_scenario:
+            parser = IncrementalArrayParser("scenarios")
+            parts = []
+            async for chunk in groq_service.generate_stream(
+                prompt=scenario_prompt,
+                system_prompt="You are a strategic futurist. You must return valid JSON only.",
+                temperature=0.8,
+                max_tokens=3000,
+                json_mode=True
+            ):
+                parts.append(chunk)
+                completed = parser.feed(chunk)
+                # parser.count already includes every scenario this chunk completed
+                first_index = parser.count - len(completed)
+                for offset, scenario in enumerate(completed):
+                    index = first_index + offset
+                    if index < MAX_SCENARIOS:
+                        await on_scenario(normalize_scenario(scenario, index))
+            response = "".join(parts)
+        else:
+            response = await groq_service.generate(
+                prompt=scenario_prompt,
+                system_prompt="You are a strategic futurist. You must return valid JSON only.",
+                temperature=0.8,
+                max_tokens=3000,
+                json_mode=True
+            )
         
         # Log the raw response for debugging
         logger.debug(f"Raw Groq response (first 500 chars): {response[:500]}")
@@ -112,8 +154,9 @@ Ensure all string values are properly quoted and escaped. Generate exactly 4 div
         if not scenarios_text:
             raise ValueError("Empty response from Groq")
         
-        # Parse the JSON response
-        data = json.loads(scenarios_text)
+        # Parse the JSON response; as lenient as the streaming parser, which has
+        # already published its scenarios (raw newlines inside strings are allowed)
+        data = json.loads(scenarios_text, strict=False)
         
         # Extract scenarios array from the response
         if isinstance(data, dict) and "scenarios" in data:
@@ -127,19 +170,14 @@ Ensure all string values are properly quoted and escaped. Generate exactly 4 div
             raise ValueError("Scenarios response is not a list")
         
         # Ensure we have exactly 4 scenarios
-        if len(scenarios) < 4:
-            logger.warning(f"Only got {len(scenarios)} scenarios, expected 4")
-        elif len(scenarios) > 4:
-            scenarios = scenarios[:4]
+        if len(scenarios) < MAX_SCENARIOS:
+            logger.warning(f"Only got {len(scenarios)} scenarios, expected {MAX_SCENARIOS}")
+        elif len(scenarios) > MAX_SCENARIOS:
+            scenarios = scenarios[:MAX_SCENARIOS]
         
         # Validate and clean scenarios
         for i, scenario in enumerate(scenarios):
-            if "scenario_number" not in scenario:
-                scenario["scenario_number"] = i + 1
-            if "likelihood" not in scenario:
-                scenario["likelihood"] = 0.25
-            elif not isinstance(scenario["likelihood"], (int, float)):
-                scenario["likelihood"] = 0.25
+            normalize_scenario(scenario, i)
         
         logger.info(f"Generated {len(scenarios)} scenarios")
         return scenarios
@@ -1,21 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, desc, or_, select, update
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.attributes import flag_modified
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import Annotated, List, Optional, Dict, Any, Tuple
 import asyncio
+import base64
+import hashlib
 import json
 import logging
 import sys
+import time
 import traceback
 from datetime import datetime
 
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, get_async_db
 from app.models.analysis import Analysis, AnalysisStatus
+from app.models.analysis_job import AnalysisJob
 from app.models.scenario import Scenario
-from app.models.strategy import Strategy
-from app.models.search_query import SearchQuery
+from app.services.analysis_persistence import save_pipeline_results
+from app.services.job_queue import job_queue
+from app.services.progress_bus import TERMINAL_EVENTS, format_sse_event, progress_bus
 # Import AnalysisPipeline lazily to avoid dependency issues at module import time
 # AnalysisPipeline = None  # Will be imported when needed
 
@@ -23,14 +31,32 @@ router = APIRouter(prefix="/api/analyses", tags=["analyses"])
 
 logger = logging.getLogger(__name__)
 
-# Store active analysis jobs and their progress callbacks
-active_analyses: Dict[int, Dict[str, Any]] = {}
+# History listing page size
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Seconds between SSE keepalive comments on an idle stream
+SSE_KEEPALIVE_INTERVAL = 15.0
+# Seconds between status reads on a stream that has heard nothing from the
+# bus: catches analyses that finished where the bus could not reach us (a
+# worker on the memory bus) or whose pipeline died without a terminal event
+SSE_STATUS_CHECK_INTERVAL = 60.0
+# A completed analysis never changes, so its snapshot can be cached indefinitely
+SNAPSHOT_CACHE_CONTROL = "public, max-age=31536000, immutable"
 
 
 class AnalysisCreate(BaseModel):
     company_name: str
 
 
+class AnalysisSummaryResponse(BaseModel):
+    id: int
+    company_name: str
+    status: str
+    created_at: datetime
+    updated_at: datetime
+
+
 class AnalysisResponse(BaseModel):
     id: int
     company_name: str
@@ -81,104 +107,213 @@ class AnalysisDetailResponse(BaseModel):
         from_attributes = True
 
 
-def progress_callback_factory(analysis_id: int, event_queue: Optional[asyncio.Queue] = None):
-    """Factory for creating progress callbacks that dynamically check for event queue"""
-    async def callback(event_type: str, message: str):
+async def load_analysis_detail(db: AsyncSession, analysis_id: int) -> Optional[Analysis]:
+    """Load an analysis with its scenarios and their strategies in one statement"""
+    result = await db.execute(
+        select(Analysis).filter(
+            Analysis.id == analysis_id
+        ).options(
+            joinedload(Analysis.scenarios).joinedload(Scenario.strategies)
+        ).execution_options(populate_existing=True)
+    )
+    return result.unique().scalar_one_or_none()
+
+
+def build_analysis_detail(analysis: Analysis) -> Dict[str, Any]:
+    """Shape an eager-loaded analysis like AnalysisDetailResponse"""
+    scenarios = sorted(analysis.scenarios, key=lambda scenario: scenario.scenario_number)
+    
+    # Group strategies by scenario
+    strategies_dict = {
+        scenario.title: sorted(scenario.strategies, key=lambda strategy: strategy.id)
+        for scenario in scenarios
+    }
+    
+    return {
+        "id": analysis.id,
+        "company_name": analysis.company_name,
+        "status": analysis.status.value,
+        "company_context": analysis.company_context,
+        "created_at": analysis.created_at,
+        "updated_at": analysis.updated_at,
+        "scenarios": scenarios,
+        "strategies": strategies_dict
+    }
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    return "*" in candidates or etag in (
+        candidate[2:] if candidate.startswith("W/") else candidate for candidate in candidates
+    )
+
+
+async def store_analysis_snapshot(db: AsyncSession, analysis_id: int) -> Tuple[Optional[bytes], Optional[str]]:
+    """
+    Serialize a completed analysis' detail payload once and store it with its ETag
+    
+    Returns:
+        (snapshot bytes, ETag), or (None, None) if the analysis does not exist
+    """
+    analysis = await load_analysis_detail(db, analysis_id)
+    if analysis is None:
+        return None, None
+    
+    detail = AnalysisDetailResponse.model_validate(build_analysis_detail(analysis), from_attributes=True)
+    snapshot = detail.model_dump_json().encode("utf-8")
+    etag = f'"{hashlib.sha256(snapshot).hexdigest()}"'
+    
+    analysis.result_snapshot = snapshot  # type: ignore
+    analysis.result_etag = etag  # type: ignore
+    # Keep updated_at as serialized; otherwise onupdate would change it under the snapshot
+    flag_modified(analysis, "updated_at")
+    await db.commit()
+    logger.info(f"[ANALYSIS {analysis_id}] Stored {len(snapshot)}-byte detail snapshot")
+    return snapshot, etag
+
+
+def progress_callback_factory(analysis_id: int):
+    """Factory for creating progress callbacks that publish to the progress bus"""
+    async def callback(event_type: str, message: str, data: Optional[Dict[str, Any]] = None):
         try:
-            # Dynamically get the event queue in case it was created after the callback
-            # This handles the race condition where SSE stream connects after task starts
-            queue = event_queue
-            if not queue and analysis_id in active_analyses:
-                queue = active_analyses[analysis_id].get("event_queue")
-            
-            if queue:
-                await queue.put({
-                    "event": event_type,
-                    "data": {
-                        "message": message,
-                        "timestamp": datetime.utcnow().isoformat()
-                    }
-                })
-                msg_preview = (message or "")[:50] if message else ""
-                logger.debug(f"[CALLBACK {analysis_id}] Sent event: {event_type} - {msg_preview}")
-            else:
-                msg_preview = (message or "")[:50] if message else ""
-                logger.debug(f"[CALLBACK {analysis_id}] No event queue available for event: {event_type} - {msg_preview}")
+            await progress_bus.publish(analysis_id, {
+                "event": event_type,
+                "data": {
+                    **(data or {}),
+                    "message": message,
+                    "timestamp": datetime.utcnow().isoformat()
+                }
+            })
+            msg_preview = (message or "")[:50] if message else ""
+            logger.debug(f"[CALLBACK {analysis_id}] Published event: {event_type} - {msg_preview}")
         except Exception as e:
             logger.error(f"[CALLBACK {analysis_id}] Error in progress callback: {e}", exc_info=True)
     return callback
 
 
+async def set_analysis_status(analysis_id: int, new_status: AnalysisStatus) -> bool:
+    """
+    Update an analysis' status in its own short transaction
+    
+    Returns:
+        False if the analysis does not exist
+    """
+    async with AsyncSessionLocal() as db:
+        updated = await db.execute(
+            update(Analysis).where(Analysis.id == analysis_id).values(status=new_status)
+        )
+        await db.commit()
+        return updated.rowcount == 1
+
+
+async def save_analysis_results(analysis_id: int, result: Dict[str, Any]):
+    """Store a finished pipeline's results and mark the analysis COMPLETED in one transaction"""
+    async with AsyncSessionLocal() as db:
+        # Bulk insert search queries, scenarios and strategies in the same transaction
+        counts = await save_pipeline_results(db, analysis_id, result)
+        await db.execute(
+            update(Analysis).where(Analysis.id == analysis_id).values(
+                company_context=result.get("company_context", ""),
+                status=AnalysisStatus.COMPLETED
+            )
+        )
+        await db.commit()
+        logger.info(
+            f"[ANALYSIS {analysis_id}] Saved {counts['search_queries']} search queries, "
+            f"{counts['scenarios']} scenarios and {counts['strategies']} strategies"
+        )
+        
+        # Serialize the finished payload once; detail requests serve it as-is from now on
+        try:
+            await store_analysis_snapshot(db, analysis_id)
+        except Exception as e:
+            # Not fatal: the detail endpoint builds the snapshot on first read
+            logger.warning(f"[ANALYSIS {analysis_id}] Failed to store detail snapshot: {type(e).__name__}: {e}")
+            await db.rollback()
+
+
 async def run_analysis_task(
     analysis_id: int,
-    company_name: str
+    company_name: str,
+    resume: bool = False,
+    fail_on_cancel: bool = True
 ):
-    """Background task to run the analysis pipeline"""
-    logger.info(f"[ANALYSIS {analysis_id}] Starting analysis task for company: {company_name}")
-    # Get fresh database session for background task
-    from app.core.database import SessionLocal
-    db = SessionLocal()
+    """
+    Background task to run the analysis pipeline
+    
+    No database session is held while the pipeline runs: the task marks the
+    analysis PROCESSING, runs the pipeline (minutes of LLM and search calls)
+    without a session, then opens a fresh one for the single save, or for the
+    status update on failure.
+    
+    Args:
+        analysis_id: Analysis to run
+        company_name: Company to analyze
+        resume: Continue from the analysis' last pipeline checkpoint instead
+            of starting over (a full run when there is none)
+        fail_on_cancel: Mark the analysis FAILED when the task is cancelled.
+            Queue workers pass False: their runs are only cancelled when the
+            job's lease was lost or the worker is shutting down, and the job
+            queue hands the analysis to another worker, so the status and the
+            SSE streams belong to that run
+    """
+    logger.info(f"[ANALYSIS {analysis_id}] Starting analysis task for company: {company_name}{' (resume)' if resume else ''}")
     try:
-        analysis = db.query(Analysis).filter(Analysis.id == analysis_id).first()
-        if not analysis:
+        if not await set_analysis_status(analysis_id, AnalysisStatus.PROCESSING):
             logger.error(f"[ANALYSIS {analysis_id}] ERROR: Analysis not found in database")
             return
-        
-        logger.info(f"[ANALYSIS {analysis_id}] Found analysis, current status: {analysis.status}")
-        # Update status to processing
-        analysis.status = AnalysisStatus.PROCESSING  # type: ignore
-        db.commit()
         logger.info(f"[ANALYSIS {analysis_id}] Status updated to PROCESSING")
         
-        # Get event queue for this analysis (may be None if SSE hasn't connected yet)
-        event_queue = active_analyses.get(analysis_id, {}).get("event_queue")
-        if event_queue:
-            logger.info(f"[ANALYSIS {analysis_id}] Event queue found, SSE will be available")
-            # Send initial processing event
-            try:
-                await event_queue.put({
-                    "event": "status",
-                    "data": {
-                        "status": "processing",
-                        "message": "Analysis started, initializing pipeline...",
-                        "timestamp": datetime.utcnow().isoformat()
-                    }
-                })
-            except Exception as e:
-                logger.warning(f"[ANALYSIS {analysis_id}] Failed to send initial status event: {e}")
-        else:
-            logger.info(f"[ANALYSIS {analysis_id}] No event queue yet (SSE may connect later), callback will check dynamically")
+        # Send initial processing event to any connected SSE streams
+        try:
+            await progress_bus.publish(analysis_id, {
+                "event": "status",
+                "data": {
+                    "status": "processing",
+                    "message": "Analysis started, initializing pipeline...",
+                    "timestamp": datetime.utcnow().isoformat()
+                }
+            })
+        except Exception as e:
+            logger.warning(f"[ANALYSIS {analysis_id}] Failed to send initial status event: {e}")
         
         # Import AnalysisPipeline lazily to avoid dependency issues
         logger.info(f"[ANALYSIS {analysis_id}] Importing AnalysisPipeline...")
         try:
-            from app.agents.pipeline import AnalysisPipeline
+            from app.agents.checkpointing import get_checkpointer
+            from app.agents.pipeline import AnalysisPipeline, thread_id_for
             logger.info(f"[ANALYSIS {analysis_id}] AnalysisPipeline imported successfully")
         except Exception as e:
             logger.error(f"[ANALYSIS {analysis_id}] CRITICAL: Failed to import AnalysisPipeline: {str(e)}", exc_info=True)
-            analysis.status = AnalysisStatus.FAILED  # type: ignore
-            db.commit()
+            await set_analysis_status(analysis_id, AnalysisStatus.FAILED)
+            await progress_callback_factory(analysis_id)("analysis_failed", "Analysis failed: pipeline unavailable")
             return
         
-        # Create pipeline with progress callback (always create callback, it will check for queue dynamically)
+        # Create pipeline with progress callback publishing to the progress bus
         logger.info(f"[ANALYSIS {analysis_id}] Creating pipeline instance...")
         try:
-            # Always create callback - it will dynamically check for event queue
-            # This handles race condition where SSE connects after task starts
             pipeline = AnalysisPipeline(
-                progress_callback=progress_callback_factory(analysis_id, event_queue)  # type: ignore
+                progress_callback=progress_callback_factory(analysis_id),  # type: ignore
+                checkpointer=await get_checkpointer()
             )
             logger.info(f"[ANALYSIS {analysis_id}] Pipeline instance created successfully with progress callback")
         except Exception as e:
             logger.error(f"[ANALYSIS {analysis_id}] CRITICAL: Failed to create pipeline: {str(e)}", exc_info=True)
-            analysis.status = AnalysisStatus.FAILED  # type: ignore
-            db.commit()
+            await set_analysis_status(analysis_id, AnalysisStatus.FAILED)
+            await progress_callback_factory(analysis_id)("analysis_failed", f"Analysis failed: {str(e)}")
             return
         
         # Run the pipeline
         logger.info(f"[ANALYSIS {analysis_id}] Starting pipeline execution...")
         try:
-            result = await pipeline.run(company_name)
+            thread_id = thread_id_for(analysis_id)
+            if resume:
+                result = await pipeline.resume(company_name, thread_id)
+            else:
+                result = await pipeline.run(company_name, thread_id)
             logger.info(f"[ANALYSIS {analysis_id}] Pipeline execution completed successfully")
         except Exception as e:
             logger.error(f"[ANALYSIS {analysis_id}] CRITICAL: Pipeline execution failed: {str(e)}", exc_info=True)
@@ -191,99 +326,50 @@ async def run_analysis_task(
             logger.warning(f"[ANALYSIS {analysis_id}] WARNING: Result missing company_context")
         
         logger.info(f"[ANALYSIS {analysis_id}] Saving results to database...")
-        # Save results to database
-        analysis.company_context = result.get("company_context", "")  # type: ignore
-        analysis.status = AnalysisStatus.COMPLETED  # type: ignore
-        
-        # Save search queries
-        search_queries_count = 0
-        for question, results in result.get("search_results", {}).items():
-            search_query = SearchQuery(
-                analysis_id=analysis_id,
-                query=question,
-                results=results
-            )
-            db.add(search_query)
-            search_queries_count += 1
-        logger.info(f"[ANALYSIS {analysis_id}] Saved {search_queries_count} search queries")
-        
-        # Save scenarios
-        scenarios_count = 0
-        strategies_count = 0
-        for scenario_data in result.get("scenarios", []):
-            scenario = Scenario(
-                analysis_id=analysis_id,
-                scenario_number=scenario_data.get("scenario_number", 0),
-                title=scenario_data.get("title", ""),
-                description=scenario_data.get("description", ""),
-                timeline=scenario_data.get("timeline"),
-                key_assumptions=scenario_data.get("key_assumptions"),
-                likelihood=scenario_data.get("likelihood")
-            )
-            db.add(scenario)
-            db.flush()  # Get scenario.id
-            scenarios_count += 1
-            
-            # Save strategies for this scenario
-            scenario_key = scenario_data.get("title", f"scenario_{scenario.scenario_number}")
-            strategies_data = result.get("strategies", {}).get(scenario_key, [])
-            
-            for strategy_data in strategies_data:
-                strategy = Strategy(
-                    scenario_id=scenario.id,
-                    name=strategy_data.get("name", ""),
-                    description=strategy_data.get("description", ""),
-                    expected_impact=strategy_data.get("expected_impact"),
-                    key_risks=strategy_data.get("key_risks")
-                )
-                db.add(strategy)
-                strategies_count += 1
-        
-        logger.info(f"[ANALYSIS {analysis_id}] Saved {scenarios_count} scenarios and {strategies_count} strategies")
-        
-        db.commit()
+        await save_analysis_results(analysis_id, result)  # type: ignore
         logger.info(f"[ANALYSIS {analysis_id}] Database commit successful")
         
+        # The results are stored, nothing left to resume
+        try:
+            await pipeline.discard_checkpoints(thread_id)
+        except Exception as e:
+            logger.warning(f"[ANALYSIS {analysis_id}] Failed to delete pipeline checkpoints: {type(e).__name__}: {e}")
+        
         # Send completion event
-        if event_queue:
-            try:
-                await event_queue.put({
-                    "event": "analysis_complete",
-                    "data": {
-                        "message": "Analysis completed successfully",
-                        "timestamp": datetime.utcnow().isoformat()
-                    }
-                })
-                logger.info(f"[ANALYSIS {analysis_id}] Completion event sent to SSE queue")
-            except Exception as e:
-                logger.warning(f"[ANALYSIS {analysis_id}] Failed to send completion event: {e}")
+        try:
+            await progress_bus.publish(analysis_id, {
+                "event": "analysis_complete",
+                "data": {
+                    "message": "Analysis completed successfully",
+                    "timestamp": datetime.utcnow().isoformat()
+                }
+            })
+            logger.info(f"[ANALYSIS {analysis_id}] Completion event published")
+        except Exception as e:
+            logger.warning(f"[ANALYSIS {analysis_id}] Failed to send completion event: {e}")
         
         logger.info(f"[ANALYSIS {analysis_id}] ✓ Analysis completed successfully")
         
     except asyncio.CancelledError as e:
+        if not fail_on_cancel:
+            logger.warning(f"[ANALYSIS {analysis_id}] Task cancelled, leaving the analysis to the job queue")
+            raise
         logger.error(f"[ANALYSIS {analysis_id}] ✗ TASK CANCELLED (likely timeout): {e}", exc_info=True)
         # Update status to failed
         try:
-            db.rollback()
-            analysis = db.query(Analysis).filter(Analysis.id == analysis_id).first()
-            if analysis:
-                analysis.status = AnalysisStatus.FAILED  # type: ignore
-                db.commit()
+            if await set_analysis_status(analysis_id, AnalysisStatus.FAILED):
                 logger.info(f"[ANALYSIS {analysis_id}] Status updated to FAILED due to cancellation")
         except Exception as db_error:
             logger.error(f"[ANALYSIS {analysis_id}] Failed to update status after cancellation: {db_error}", exc_info=True)
+        # SSE streams learn about terminal states from events only
+        await progress_callback_factory(analysis_id)("analysis_failed", "Analysis was cancelled")
         raise
     except Exception as e:
         logger.error(f"[ANALYSIS {analysis_id}] ✗ CRITICAL ERROR in analysis task: {type(e).__name__}: {str(e)}", exc_info=True)
         
         # Update status to failed
         try:
-            # Refresh the analysis object
-            db.rollback()  # Rollback any pending changes
-            analysis = db.query(Analysis).filter(Analysis.id == analysis_id).first()
-            if analysis:
-                analysis.status = AnalysisStatus.FAILED  # type: ignore
-                db.commit()
+            if await set_analysis_status(analysis_id, AnalysisStatus.FAILED):
                 logger.info(f"[ANALYSIS {analysis_id}] Status updated to FAILED in database")
             else:
                 logger.error(f"[ANALYSIS {analysis_id}] Could not find analysis to update status")
@@ -292,33 +378,92 @@ async def run_analysis_task(
         
         # Send failure event
         try:
-            event_queue = active_analyses.get(analysis_id, {}).get("event_queue")
-            if event_queue:
-                await event_queue.put({
-                    "event": "analysis_failed",
-                    "data": {
-                        "message": f"Analysis failed: {str(e)}",
-                        "timestamp": datetime.utcnow().isoformat()
-                    }
-                })
-                logger.info(f"[ANALYSIS {analysis_id}] Failure event sent to SSE queue")
+            await progress_bus.publish(analysis_id, {
+                "event": "analysis_failed",
+                "data": {
+                    "message": f"Analysis failed: {str(e)}",
+                    "timestamp": datetime.utcnow().isoformat()
+                }
+            })
+            logger.info(f"[ANALYSIS {analysis_id}] Failure event published")
         except Exception as sse_error:
             logger.warning(f"[ANALYSIS {analysis_id}] Failed to send failure event to SSE: {sse_error}")
         
         # Re-raise to be caught by task wrapper
         raise
-    finally:
+
+
+def start_analysis_task(analysis_id: int, company_name: str, resume: bool = False) -> asyncio.Task:
+    """
+    Run an analysis in a background task of this process (inline execution mode)
+    
+    Any failure the task does not handle itself still marks the analysis FAILED.
+    """
+    async def task_wrapper():
+        try:
+            if resume:
+                await run_analysis_task(analysis_id, company_name, resume=True)
+            else:
+                await run_analysis_task(analysis_id, company_name)
+        except asyncio.CancelledError as e:
+            logger.error(f"[TASK] ✗ TASK CANCELLED for analysis {analysis_id}: {e}", exc_info=True)
+            logger.error(f"[TASK] Full traceback:\n{traceback.format_exc()}")
+            # Try to update status in database
+            try:
+                async with AsyncSessionLocal() as task_db:
+                    task_analysis = await task_db.get(Analysis, analysis_id)
+                    if task_analysis:
+                        task_analysis.status = AnalysisStatus.FAILED  # type: ignore
+                        await task_db.commit()
+                        logger.info(f"[TASK] Updated analysis {analysis_id} status to FAILED after cancellation")
+            except Exception as db_err:
+                logger.error(f"[TASK] Failed to update analysis status after cancellation: {db_err}", exc_info=True)
+        except Exception as e:
+            logger.error(f"[TASK] ✗ CRITICAL: Unhandled exception in analysis task {analysis_id}: {type(e).__name__}: {str(e)}", exc_info=True)
+            logger.error(f"[TASK] Full traceback:\n{traceback.format_exc()}")
+            # Try to update status in database
+            try:
+                async with AsyncSessionLocal() as task_db:
+                    task_analysis = await task_db.get(Analysis, analysis_id)
+                    if task_analysis:
+                        task_analysis.status = AnalysisStatus.FAILED  # type: ignore
+                        await task_db.commit()
+                        logger.info(f"[TASK] Updated analysis {analysis_id} status to FAILED after unhandled exception")
+            except Exception as db_err:
+                logger.error(f"[TASK] Failed to update analysis status after unhandled exception: {db_err}", exc_info=True)
+        except BaseException as e:
+            logger.critical(f"[TASK] ✗ CRITICAL BASE EXCEPTION in analysis task {analysis_id}: {type(e).__name__}: {str(e)}", exc_info=True)
+            logger.critical(f"[TASK] Full traceback:\n{traceback.format_exc()}")
+            # Try to update status in database
+            try:
+                async with AsyncSessionLocal() as task_db:
+                    task_analysis = await task_db.get(Analysis, analysis_id)
+                    if task_analysis:
+                        task_analysis.status = AnalysisStatus.FAILED  # type: ignore
+                        await task_db.commit()
+                        logger.info(f"[TASK] Updated analysis {analysis_id} status to FAILED after base exception")
+            except Exception as db_err:
+                logger.error(f"[TASK] Failed to update analysis status after base exception: {db_err}", exc_info=True)
+    
+    logger.info(f"[TASK] Creating background task...")
+    task = asyncio.create_task(task_wrapper())
+    # Add done callback to log completion/failure
+    def task_done_callback(fut):
         try:
-            db.close()
-            logger.debug(f"[ANALYSIS {analysis_id}] Database session closed")
+            fut.result()  # This will raise if the task failed
+            logger.info(f"[TASK] Background task for analysis {analysis_id} completed successfully")
         except Exception as e:
-            logger.error(f"[ANALYSIS {analysis_id}] Error closing database session: {e}")
+            logger.error(f"[TASK] Background task for analysis {analysis_id} failed: {e}", exc_info=True)
+    
+    task.add_done_callback(task_done_callback)
+    logger.info(f"[TASK] ✓ Started background task for analysis {analysis_id}, company: {company_name}")
+    return task
 
 
 @router.post("", response_model=AnalysisResponse, status_code=status.HTTP_201_CREATED)
 async def create_analysis(
     analysis_data: AnalysisCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new analysis and start background processing"""
     logger.info(f"[CREATE] Received request to create analysis for company: {analysis_data.company_name}")
@@ -331,119 +476,183 @@ async def create_analysis(
             status=AnalysisStatus.PENDING
         )
         db.add(analysis)
-        db.commit()
-        db.refresh(analysis)
+        queued = settings.ANALYSIS_EXECUTION_MODE == "queue"
+        if queued:
+            # Create the job in the same transaction so no analysis is left without one
+            await db.flush()
+            job_queue.enqueue(db, analysis.id, analysis_data.company_name)  # type: ignore
+        await db.commit()
+        await db.refresh(analysis)
         logger.info(f"[CREATE] Analysis record created with ID: {analysis.id}")
         
-        # Create event queue for SSE
-        logger.info(f"[CREATE] Creating event queue for SSE...")
-        event_queue = asyncio.Queue()
-        active_analyses[analysis.id] = {  # type: ignore
-            "event_queue": event_queue,
-            "analysis": analysis
-        }
-        logger.info(f"[CREATE] Event queue created and stored in active_analyses")
+        if queued:
+            logger.info(f"[CREATE] ✓ Queued analysis {analysis.id} for a worker, company: {analysis_data.company_name}")
+            return analysis
     
-        # Start background task using asyncio.create_task for proper async handling
-        # Add error callback to catch any unhandled exceptions
-        async def task_wrapper():
-            try:
-                await run_analysis_task(analysis.id, analysis_data.company_name)  # type: ignore
-            except asyncio.CancelledError as e:
-                logger.error(f"[CREATE] ✗ TASK CANCELLED for analysis {analysis.id}: {e}", exc_info=True)
-                logger.error(f"[CREATE] Full traceback:\n{traceback.format_exc()}")
-                # Try to update status in database
-                try:
-                    from app.core.database import SessionLocal
-                    task_db = SessionLocal()
-                    try:
-                        task_analysis = task_db.query(Analysis).filter(Analysis.id == analysis.id).first()
-                        if task_analysis:
-                            task_analysis.status = AnalysisStatus.FAILED  # type: ignore
-                            task_db.commit()
-                            logger.info(f"[CREATE] Updated analysis {analysis.id} status to FAILED after cancellation")
-                    finally:
-                        task_db.close()
-                except Exception as db_err:
-                    logger.error(f"[CREATE] Failed to update analysis status after cancellation: {db_err}", exc_info=True)
-            except Exception as e:
-                logger.error(f"[CREATE] ✗ CRITICAL: Unhandled exception in analysis task {analysis.id}: {type(e).__name__}: {str(e)}", exc_info=True)
-                logger.error(f"[CREATE] Full traceback:\n{traceback.format_exc()}")
-                # Try to update status in database
-                try:
-                    from app.core.database import SessionLocal
-                    task_db = SessionLocal()
-                    try:
-                        task_analysis = task_db.query(Analysis).filter(Analysis.id == analysis.id).first()
-                        if task_analysis:
-                            task_analysis.status = AnalysisStatus.FAILED  # type: ignore
-                            task_db.commit()
-                            logger.info(f"[CREATE] Updated analysis {analysis.id} status to FAILED after unhandled exception")
-                    finally:
-                        task_db.close()
-                except Exception as db_err:
-                    logger.error(f"[CREATE] Failed to update analysis status after unhandled exception: {db_err}", exc_info=True)
-            except BaseException as e:
-                logger.critical(f"[CREATE] ✗ CRITICAL BASE EXCEPTION in analysis task {analysis.id}: {type(e).__name__}: {str(e)}", exc_info=True)
-                logger.critical(f"[CREATE] Full traceback:\n{traceback.format_exc()}")
-                # Try to update status in database
-                try:
-                    from app.core.database import SessionLocal
-                    task_db = SessionLocal()
-                    try:
-                        task_analysis = task_db.query(Analysis).filter(Analysis.id == analysis.id).first()
-                        if task_analysis:
-                            task_analysis.status = AnalysisStatus.FAILED  # type: ignore
-                            task_db.commit()
-                            logger.info(f"[CREATE] Updated analysis {analysis.id} status to FAILED after base exception")
-                    finally:
-                        task_db.close()
-                except Exception as db_err:
-                    logger.error(f"[CREATE] Failed to update analysis status after base exception: {db_err}", exc_info=True)
-        
-        logger.info(f"[CREATE] Creating background task...")
         try:
-            task = asyncio.create_task(task_wrapper())
-            # Add done callback to log completion/failure
-            def task_done_callback(fut):
-                try:
-                    fut.result()  # This will raise if the task failed
-                    logger.info(f"[CREATE] Background task for analysis {analysis.id} completed successfully")
-                except Exception as e:
-                    logger.error(f"[CREATE] Background task for analysis {analysis.id} failed: {e}", exc_info=True)
-            
-            task.add_done_callback(task_done_callback)
-            logger.info(f"[CREATE] ✓ Started background task for analysis {analysis.id}, company: {analysis_data.company_name}")
+            start_analysis_task(analysis.id, analysis_data.company_name)  # type: ignore
         except Exception as e:
             logger.error(f"[CREATE] CRITICAL: Failed to create background task for analysis {analysis.id}: {e}", exc_info=True)
             # Update analysis status to failed
             analysis.status = AnalysisStatus.FAILED  # type: ignore
-            db.commit()
+            await db.commit()
         
         logger.info(f"[CREATE] Returning analysis response with ID: {analysis.id}")
         return analysis
         
     except Exception as e:
         logger.error(f"[CREATE] CRITICAL ERROR in create_analysis endpoint: {type(e).__name__}: {str(e)}", exc_info=True)
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to create analysis: {str(e)}"
         )
 
 
-@router.get("", response_model=List[AnalysisResponse])
+@router.post("/{analysis_id}/resume", response_model=AnalysisResponse, status_code=status.HTTP_202_ACCEPTED)
+async def resume_analysis(
+    analysis_id: int,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Resume a failed analysis from its last pipeline checkpoint
+    
+    Finished stages (research, scenarios, the strategies of each finished
+    scenario) are reused; only the rest of the pipeline runs again. Without
+    a checkpoint the analysis runs from the start.
+    """
+    analysis = await db.get(Analysis, analysis_id)
+    if not analysis:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Analysis not found"
+        )
+    if analysis.status != AnalysisStatus.FAILED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Only failed analyses can be resumed (status: {analysis.status.value})"
+        )
+    
+    company_name: str = analysis.company_name  # type: ignore
+    # Conditional update: of two concurrent resumes only one moves it out of FAILED
+    claimed = await db.execute(
+        update(Analysis)
+        .where(Analysis.id == analysis_id, Analysis.status == AnalysisStatus.FAILED)
+        .values(status=AnalysisStatus.PENDING)
+    )
+    if claimed.rowcount == 0:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Analysis is already being resumed"
+        )
+    queued = settings.ANALYSIS_EXECUTION_MODE == "queue"
+    if queued:
+        requeued = await db.execute(job_queue.requeue_statement(analysis_id))
+        if requeued.rowcount == 0:
+            # Analyses created in inline mode have no job yet
+            existing = await db.execute(select(AnalysisJob.id).filter(AnalysisJob.analysis_id == analysis_id))
+            if existing.first() is not None:
+                await db.rollback()
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Analysis job is already queued or running"
+                )
+            job_queue.enqueue(db, analysis_id, company_name)
+    await db.commit()
+    await db.refresh(analysis)
+    
+    if queued:
+        # Workers always continue from the checkpoint when one exists
+        logger.info(f"[RESUME] ✓ Requeued analysis {analysis_id} for a worker")
+    else:
+        start_analysis_task(analysis_id, company_name, resume=True)
+        logger.info(f"[RESUME] ✓ Resuming analysis {analysis_id} in this process")
+    return analysis
+
+
+def encode_cursor(created_at: datetime, analysis_id: int) -> str:
+    """Opaque keyset cursor pointing just after the given row"""
+    raw = json.dumps({"created_at": created_at.isoformat(), "id": analysis_id})
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def escape_like(value: str) -> str:
+    """Escape LIKE wildcards so value matches literally (use with escape="\\")"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(raw["created_at"]), int(raw["id"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid cursor: {e}"
+        )
+
+
+@router.get("", response_model=List[AnalysisSummaryResponse])
 async def list_analyses(
-    db: Session = Depends(get_db)
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    status_filter: Optional[AnalysisStatus] = Query(None, alias="status"),
+    company: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """List all analyses"""
-    logger.info("[LIST] Received request to list all analyses")
+    """
+    List analyses, newest first, one page at a time
+    
+    Pages are keyset-paginated on (created_at, id). When more rows exist, the
+    cursor for the next page is returned in the X-Next-Cursor header; pass it
+    back as ?cursor=... to continue. Filter with ?status= and ?company=
+    (case-insensitive substring).
+    """
     try:
-        analyses = db.query(Analysis).order_by(desc(Analysis.created_at)).all()
-        logger.info(f"[LIST] Found {len(analyses)} analyses in database")
-        for a in analyses:
-            logger.info(f"[LIST]   - ID: {a.id}, Company: {a.company_name}, Status: {a.status}")
-        return analyses
+        # Only the summary columns; company_context can be several KB per row
+        query = select(
+            Analysis.id,
+            Analysis.company_name,
+            Analysis.status,
+            Analysis.created_at,
+            Analysis.updated_at
+        )
+        if status_filter is not None:
+            query = query.filter(Analysis.status == status_filter)
+        if company:
+            query = query.filter(Analysis.company_name.ilike(f"%{escape_like(company)}%", escape="\\"))
+        if cursor:
+            cursor_created_at, cursor_id = decode_cursor(cursor)
+            query = query.filter(
+                or_(
+                    Analysis.created_at < cursor_created_at,
+                    and_(Analysis.created_at == cursor_created_at, Analysis.id < cursor_id)
+                )
+            )
+        # One extra row tells us whether there is a next page
+        query = query.order_by(desc(Analysis.created_at), desc(Analysis.id)).limit(limit + 1)
+        
+        rows = (await db.execute(query)).all()
+        page = rows[:limit]
+        if len(rows) > limit:
+            last = page[-1]
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at, last.id)
+        
+        logger.info(f"[LIST] Returning {len(page)} analyses (more: {len(rows) > limit})")
+        return [
+            {
+                "id": row.id,
+                "company_name": row.company_name,
+                "status": row.status.value,
+                "created_at": row.created_at,
+                "updated_at": row.updated_at
+            }
+            for row in page
+        ]
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"[LIST] ERROR listing analyses: {type(e).__name__}: {str(e)}", exc_info=True)
         raise
@@ -452,162 +661,171 @@ async def list_analyses(
 @router.get("/{analysis_id}", response_model=AnalysisDetailResponse)
 async def get_analysis(
     analysis_id: int,
-    db: Session = Depends(get_db)
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get analysis details with scenarios and strategies"""
-    analysis = db.query(Analysis).filter(
-        Analysis.id == analysis_id
-    ).first()
+    """
+    Get analysis details with scenarios and strategies
     
-    if not analysis:
+    Completed analyses are served from their stored JSON snapshot with a
+    strong ETag; a matching If-None-Match gets 304 Not Modified.
+    """
+    row = (await db.execute(
+        select(Analysis.status, Analysis.result_etag, Analysis.result_snapshot).filter(
+            Analysis.id == analysis_id
+        )
+    )).first()
+    
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Analysis not found"
         )
     
-    # Get scenarios
-    scenarios = db.query(Scenario).filter(
-        Scenario.analysis_id == analysis_id
-    ).order_by(Scenario.scenario_number).all()
+    snapshot, etag = row.result_snapshot, row.result_etag
+    if snapshot is None and row.status == AnalysisStatus.COMPLETED:
+        # Completed before snapshots existed (or storing it failed): build it now
+        snapshot, etag = await store_analysis_snapshot(db, analysis_id)
     
-    # Get strategies grouped by scenario
-    strategies_dict = {}
-    for scenario in scenarios:
-        strategies = db.query(Strategy).filter(
-            Strategy.scenario_id == scenario.id
-        ).all()
-        strategies_dict[scenario.title] = strategies
+    if snapshot is not None:
+        headers = {"ETag": etag, "Cache-Control": SNAPSHOT_CACHE_CONTROL}
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(content=snapshot, media_type="application/json", headers=headers)
     
-    return {
-        "id": analysis.id,
-        "company_name": analysis.company_name,
-        "status": analysis.status.value,
-        "company_context": analysis.company_context,
-        "created_at": analysis.created_at,
-        "updated_at": analysis.updated_at,
-        "scenarios": scenarios,
-        "strategies": strategies_dict
-    }
+    analysis = await load_analysis_detail(db, analysis_id)
+    if not analysis:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Analysis not found"
+        )
+    return build_analysis_detail(analysis)
+
+
+def parse_last_event_id(value: Optional[str]) -> Optional[int]:
+    """Read a Last-Event-ID value; anything but an integer means start fresh"""
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+async def _terminal_event_from_status(analysis_id: int) -> Optional[str]:
+    """SSE completion/failure event if the analysis has finished, read with a short-lived session"""
+    async with AsyncSessionLocal() as db:
+        analysis_status = (await db.execute(
+            select(Analysis.status).filter(Analysis.id == analysis_id)
+        )).scalar_one_or_none()
+    if analysis_status == AnalysisStatus.COMPLETED:
+        return format_sse_event("analysis_complete", {"message": "Analysis completed successfully"})
+    if analysis_status in (AnalysisStatus.FAILED, None):
+        return format_sse_event("analysis_failed", {"message": "Analysis failed"})
+    return None
 
 
 @router.get("/{analysis_id}/stream")
 async def stream_analysis_progress(
     analysis_id: int,
-    db: Session = Depends(get_db)
+    last_event_id_header: Annotated[Optional[str], Header(alias="Last-Event-ID")] = None,
+    last_event_id: Annotated[Optional[str], Query()] = None
 ):
-    """SSE endpoint for real-time analysis progress"""
-    # Verify analysis exists
-    analysis = db.query(Analysis).filter(
-        Analysis.id == analysis_id
-    ).first()
+    """
+    SSE endpoint for real-time analysis progress
     
-    if not analysis:
+    Holds no database connection while streaming: the stream subscribes to
+    the progress bus first, reads the current status with a short-lived
+    session, and from then on learns about completion or failure from
+    pipeline events. After SSE_STATUS_CHECK_INTERVAL seconds without events
+    it re-reads the status (again with a short-lived session), so a stream
+    whose analysis finished out of reach of the bus still closes.
+    
+    Bus events carry an SSE id. A client resuming with the Last-Event-ID
+    header (sent by EventSource when it reconnects) or the last_event_id
+    query parameter first receives the buffered events it missed.
+    """
+    resume_from = parse_last_event_id(last_event_id_header or last_event_id)
+    # Subscribe before reading the status so no terminal event can slip in between
+    subscription = await progress_bus.subscribe(analysis_id, last_event_id=resume_from)
+    try:
+        async with AsyncSessionLocal() as db:
+            analysis_status = (await db.execute(
+                select(Analysis.status).filter(Analysis.id == analysis_id)
+            )).scalar_one_or_none()
+    except BaseException:
+        await progress_bus.unsubscribe(subscription)
+        raise
+    
+    if analysis_status is None:
+        await progress_bus.unsubscribe(subscription)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Analysis not found"
         )
     
-    # Get or create event queue
-    if analysis_id not in active_analyses:
-        event_queue = asyncio.Queue()
-        active_analyses[analysis_id] = {
-            "event_queue": event_queue,
-            "analysis": analysis
-        }
-    else:
-        event_queue = active_analyses[analysis_id]["event_queue"]
-    
     async def event_generator():
         """Generate SSE events"""
         try:
-            logger.debug(f"[STREAM {analysis_id}] Starting event generator, analysis status: {analysis.status.value}")
+            logger.debug(f"[STREAM {analysis_id}] Starting event generator, analysis status: {analysis_status.value}")
             
-            # Send initial status
-            yield f"event: status\n"
-            yield f"data: {json.dumps({'status': analysis.status.value, 'message': 'Connected'})}\n\n"
+            # Send initial status (a resumed stream carries on from the replayed events instead)
+            if resume_from is None or analysis_status != AnalysisStatus.PROCESSING:
+                yield format_sse_event("status", {"status": analysis_status.value, "message": "Connected"})
             
             # If analysis is already completed or failed, send completion event immediately
-            if analysis.status == AnalysisStatus.COMPLETED:  # type: ignore
+            if analysis_status == AnalysisStatus.COMPLETED:
                 logger.debug(f"[STREAM {analysis_id}] Analysis already completed, sending immediate completion event")
-                yield f"event: analysis_complete\n"
-                yield f"data: {json.dumps({'message': 'Analysis completed successfully', 'timestamp': datetime.utcnow().isoformat()})}\n\n"
+                yield format_sse_event("analysis_complete", {
+                    "message": "Analysis completed successfully",
+                    "timestamp": datetime.utcnow().isoformat()
+                })
                 return
-            elif analysis.status == AnalysisStatus.FAILED:  # type: ignore
+            elif analysis_status == AnalysisStatus.FAILED:
                 logger.debug(f"[STREAM {analysis_id}] Analysis already failed, sending immediate failure event")
-                yield f"event: analysis_failed\n"
-                yield f"data: {json.dumps({'message': 'Analysis failed', 'timestamp': datetime.utcnow().isoformat()})}\n\n"
+                yield format_sse_event("analysis_failed", {
+                    "message": "Analysis failed",
+                    "timestamp": datetime.utcnow().isoformat()
+                })
                 return
             
-            # Stream events from queue
-            logger.debug(f"[STREAM {analysis_id}] Analysis in progress, streaming events from queue...")
-            last_status_check = datetime.utcnow()
-            consecutive_timeouts = 0
+            # Stream events from the progress bus
+            logger.debug(f"[STREAM {analysis_id}] Analysis in progress, streaming events from the progress bus...")
+            last_status_check = time.monotonic()
             while True:
                 try:
-                    # Wait for event with timeout (reduced to 3 seconds for more responsive status checks)
-                    event_data = await asyncio.wait_for(event_queue.get(), timeout=3.0)
-                    consecutive_timeouts = 0  # Reset timeout counter on successful event
-                    
-                    event_type = event_data.get("event", "message")
-                    data = event_data.get("data", {})
-                    
-                    msg_preview = (data.get('message', '') or '')[:50]
-                    logger.debug(f"[STREAM {analysis_id}] Sending event: {event_type} - {msg_preview}")
-                    yield f"event: {event_type}\n"
-                    yield f"data: {json.dumps(data)}\n\n"
-                    
-                    # Stop on completion or failure
-                    if event_type in ["analysis_complete", "analysis_failed"]:
-                        logger.debug(f"[STREAM {analysis_id}] Received {event_type}, closing stream")
-                        break
-                        
+                    event_data = await subscription.get(timeout=SSE_KEEPALIVE_INTERVAL)
                 except asyncio.TimeoutError:
-                    consecutive_timeouts += 1
-                    # Send keepalive and check if analysis status changed
-                    try:
-                        # Refresh analysis status from database periodically (every 2 seconds)
-                        now = datetime.utcnow()
-                        if (now - last_status_check).total_seconds() >= 2.0:
-                            db.refresh(analysis)
-                            last_status_check = now
-                            
-                            logger.debug(f"[STREAM {analysis_id}] Status check: {analysis.status.value}, consecutive timeouts: {consecutive_timeouts}")
-                            
-                            # Send status update if it changed
-                            if analysis.status == AnalysisStatus.PROCESSING:  # type: ignore
-                                yield f"event: status\n"
-                                yield f"data: {json.dumps({'status': 'processing', 'message': 'Analysis in progress...'})}\n\n"
-                            elif analysis.status == AnalysisStatus.COMPLETED:  # type: ignore
-                                logger.debug(f"[STREAM {analysis_id}] Analysis completed (detected via status check), sending completion event")
-                                yield f"event: analysis_complete\n"
-                                yield f"data: {json.dumps({'message': 'Analysis completed successfully', 'timestamp': datetime.utcnow().isoformat()})}\n\n"
-                                break
-                            elif analysis.status == AnalysisStatus.FAILED:  # type: ignore
-                                logger.debug(f"[STREAM {analysis_id}] Analysis failed (detected via status check), sending failure event")
-                                yield f"event: analysis_failed\n"
-                                yield f"data: {json.dumps({'message': 'Analysis failed', 'timestamp': datetime.utcnow().isoformat()})}\n\n"
-                                break
-                        
-                        yield f": keepalive\n\n"
-                    except Exception as refresh_error:
-                        logger.warning(f"[STREAM {analysis_id}] Error refreshing analysis status: {refresh_error}", exc_info=True)
-                        yield f": keepalive\n\n"
+                    if time.monotonic() - last_status_check >= SSE_STATUS_CHECK_INTERVAL:
+                        last_status_check = time.monotonic()
+                        terminal_event = await _terminal_event_from_status(analysis_id)
+                        if terminal_event:
+                            logger.info(f"[STREAM {analysis_id}] Analysis finished without a bus event, closing stream")
+                            yield terminal_event
+                            break
+                    # Keeps proxies from closing an idle connection
+                    yield f": keepalive\n\n"
+                    continue
+                
+                event_type = event_data.get("event", "message")
+                data = event_data.get("data", {})
+                
+                msg_preview = (data.get('message', '') or '')[:50]
+                logger.debug(f"[STREAM {analysis_id}] Sending event: {event_type} - {msg_preview}")
+                # Bus events come pre-encoded and shared by every stream watching the analysis
+                yield event_data.frame
+                
+                # Stop on completion or failure
+                if event_type in TERMINAL_EVENTS:
+                    logger.debug(f"[STREAM {analysis_id}] Received {event_type}, closing stream")
+                    break
                     
         except Exception as e:
             logger.error(f"[STREAM {analysis_id}] Error in event generator: {type(e).__name__}: {str(e)}", exc_info=True)
-            yield f"event: error\n"
-            yield f"data: {json.dumps({'message': str(e)})}\n\n"
+            yield format_sse_event("error", {"message": str(e)})
         finally:
-            # Only cleanup if analysis is completed or failed
-            # Don't cleanup if client disconnects while analysis is still running
+            if subscription.dropped:
+                logger.info(f"[STREAM {analysis_id}] Slow client: {subscription.dropped} progress events coalesced or dropped")
             try:
-                db.refresh(analysis)
-                if analysis.status in [AnalysisStatus.COMPLETED, AnalysisStatus.FAILED]:
-                    if analysis_id in active_analyses:
-                        del active_analyses[analysis_id]
-                        logger.debug(f"[STREAM {analysis_id}] Cleaned up active_analyses entry (analysis {analysis.status.value})")
-                else:
-                    logger.debug(f"[STREAM {analysis_id}] Keeping active_analyses entry (analysis still {analysis.status.value})")
+                await progress_bus.unsubscribe(subscription)
             except Exception as cleanup_error:
                 logger.warning(f"[STREAM {analysis_id}] Error during cleanup: {cleanup_error}")
     
@@ -625,12 +843,10 @@ async def stream_analysis_progress(
 @router.get("/{analysis_id}/status", response_model=AnalysisResponse)
 async def get_analysis_status(
     analysis_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get current analysis status (polling fallback)"""
-    analysis = db.query(Analysis).filter(
-        Analysis.id == analysis_id
-    ).first()
+    analysis = await db.get(Analysis, analysis_id)
     
     if not analysis:
         raise HTTPException(
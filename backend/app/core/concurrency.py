@@ -0,0 +1,234 @@
+from collections import deque
+from typing import Callable, Deque, Optional
+import asyncio
+import logging
+import time
+import weakref
+
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ConcurrencyLimiter:
+    """
+    FIFO concurrency limiter shared between tasks
+
+    Works like an asyncio.Semaphore whose limit can be changed at runtime,
+    with two differences that matter for module-level instances: waiters are
+    served strictly in arrival order, and no event loop is bound at
+    construction time, so one instance can be shared by every pipeline in
+    the process.
+    """
+
+    def __init__(self, limit: int, name: str = "limiter"):
+        """
+        Initialize the limiter
+
+        Args:
+            limit: Maximum number of holders at once (at least 1)
+            name: Name used in log messages
+        """
+        self.name = name
+        self._limit = max(1, int(limit))
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    def set_limit(self, limit: int):
+        """Change the limit; raising it wakes queued waiters immediately"""
+        self._limit = max(1, int(limit))
+        self._wake_waiters()
+
+    async def acquire(self):
+        """Wait for a free slot"""
+        if self._in_flight < self._limit and not self._waiters:
+            self._in_flight += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        logger.debug(f"[{self.name}] Queued ({self._in_flight}/{self._limit} in flight, {len(self._waiters)} waiting)")
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we were cancelled - give it back
+                self.release()
+            else:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            raise
+
+    def release(self):
+        """Release a slot acquired with acquire()"""
+        self._in_flight = max(0, self._in_flight - 1)
+        self._wake_waiters()
+
+    def _wake_waiters(self):
+        # Slots are handed directly to waiters so late arrivals cannot jump the queue
+        while self._waiters and self._in_flight < self._limit:
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self._in_flight += 1
+            waiter.set_result(None)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+# Live adaptive limiters by name, for the gauges below
+_adaptive_limiters: "weakref.WeakValueDictionary[str, AdaptiveConcurrencyLimiter]" = weakref.WeakValueDictionary()
+
+
+class AdaptiveConcurrencyLimiter(ConcurrencyLimiter):
+    """
+    Concurrency limiter whose limit follows the upstream's capacity (AIMD)
+
+    Callers report each call's outcome. While calls succeed with normal
+    latency and the limit is actually in use, the limit grows by one
+    per limit's worth of successes (additive increase); an overload signal
+    (429, 5xx, timeout) or a latency spike multiplies it by
+    decrease_factor (multiplicative decrease). Only calls started after the
+    last decrease can trigger another, so one burst of errors from calls
+    that were already in flight cuts the limit once, not once per call.
+
+    A latency spike is a short-term average latency above
+    latency_tolerance times the long-term average. Latency is taken per unit
+    of work when callers pass a cost (e.g. tokens generated), so a shift to
+    longer responses is not mistaken for an overloaded upstream. The
+    long-term average learns from every call, so a lasting change in latency
+    becomes the new normal instead of holding the limit down; one spike
+    cuts the limit once, and latency can cut again only after it has come
+    back within tolerance.
+    """
+
+    MIN_LATENCY_SAMPLES = 10  # Successes seen before latency can trigger a decrease
+
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        decrease_factor: float = 0.5,
+        latency_tolerance: float = 2.0,
+        name: str = "adaptive",
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Initialize the limiter
+
+        Args:
+            initial_limit: Starting limit
+            min_limit: Smallest limit a decrease can reach (at least 1)
+            max_limit: Largest limit an increase can reach
+            decrease_factor: Multiplier applied on overload (0 < factor < 1)
+            latency_tolerance: Short-term/long-term latency ratio that counts
+                as a spike (0 disables latency-based decreases)
+            name: Name used in log messages and as the metrics label
+            clock: Monotonic time source (replaceable in tests)
+        """
+        self.min_limit = max(1, int(min_limit))
+        self.max_limit = max(self.min_limit, int(max_limit))
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self._clock = clock
+        self._successes = 0  # Healthy calls at the current limit since the last change
+        self._last_decrease = float("-inf")
+        self._baseline_latency: Optional[float] = None
+        self._recent_latency: Optional[float] = None
+        self._samples = 0
+        self._in_latency_spike = False
+        super().__init__(min(self.max_limit, max(self.min_limit, int(initial_limit))), name=name)
+        _adaptive_limiters[name] = self
+
+    def now(self) -> float:
+        """Current time on the limiter's clock; pass it back as started"""
+        return self._clock()
+
+    def record_success(self, started: float, cost: Optional[float] = None):
+        """
+        Report a call that succeeded
+
+        Args:
+            started: now() when the call started (after acquire())
+            cost: Size of the call's work (e.g. tokens generated); latency is
+                compared per unit of cost. None or 0 compares raw latency.
+        """
+        latency = self._clock() - started
+        if cost:
+            latency /= cost
+        self._samples += 1
+        if self._baseline_latency is None:
+            self._baseline_latency = self._recent_latency = latency
+        else:
+            self._recent_latency += 0.3 * (latency - self._recent_latency)
+            self._baseline_latency += 0.05 * (latency - self._baseline_latency)
+
+        spiking = (
+            self.latency_tolerance > 0
+            and self._samples >= self.MIN_LATENCY_SAMPLES
+            and self._recent_latency > self.latency_tolerance * self._baseline_latency
+        )
+        if spiking:
+            if not self._in_latency_spike:
+                self._in_latency_spike = True
+                self._decrease(started, f"latency {self._recent_latency:.3g} vs usual {self._baseline_latency:.3g}")
+            return
+        self._in_latency_spike = False
+        # Grow only while the limit is the bottleneck, else it would creep up unused
+        if self.in_flight >= self.limit or self.waiting:
+            self._successes += 1
+            if self._successes >= self.limit and self.limit < self.max_limit:
+                self._successes = 0
+                self.set_limit(self.limit + 1)
+                logger.debug(f"[{self.name}] Limit raised to {self.limit}")
+
+    def record_overload(self, started: float, reason: str = "overload"):
+        """
+        Report a call that failed because the upstream is overloaded
+
+        Args:
+            started: now() when the call started
+            reason: Short description for the log (e.g. "429")
+        """
+        self._decrease(started, reason)
+
+    def _decrease(self, started: float, reason: str):
+        if started < self._last_decrease:
+            return  # Already cut for this round of calls
+        self._last_decrease = self._clock()
+        self._successes = 0
+        if self.limit <= self.min_limit:
+            return  # Nothing left to cut
+        self.set_limit(max(self.min_limit, int(self.limit * self.decrease_factor)))
+        logger.warning(f"[{self.name}] {reason}, concurrency limit cut to {self.limit}")
+
+
+metrics.gauge(
+    "adaptive_concurrency_limit", "Current limit of the adaptive upstream concurrency limiters",
+    lambda: [({"limiter": name}, limiter.limit) for name, limiter in list(_adaptive_limiters.items())]
+)
+metrics.gauge(
+    "adaptive_concurrency_in_flight", "Calls holding a slot of the adaptive upstream concurrency limiters",
+    lambda: [({"limiter": name}, limiter.in_flight) for name, limiter in list(_adaptive_limiters.items())]
+)
@@ -8,6 +8,105 @@ class Settings(BaseSettings):
     TAVILY_API_KEY: str
     CORS_ORIGINS: str = "http://localhost:5173,http://localhost:3000"
     
+    # Research phase: how many Tavily searches may run at once, and how long
+    # a single question's search may take before it is given up on
+    RESEARCH_SEARCH_CONCURRENCY: int = 4
+    RESEARCH_SEARCH_TIMEOUT: float = 90.0
+    
+    # Strategies phase: scenarios are generated concurrently, sharing one
+    # process-wide limit; a failed scenario is retried on its own
+    STRATEGY_CONCURRENCY: int = 4
+    STRATEGY_MAX_ATTEMPTS: int = 2
+    STRATEGY_RETRY_DELAY: float = 1.0
+    
+    # Groq response cache: identical requests (model, messages, sampling
+    # parameters, JSON mode) are served from the cache instead of the API
+    GROQ_CACHE_ENABLED: bool = False
+    GROQ_CACHE_BACKEND: str = "memory"  # "memory", "disk" or "postgres"
+    GROQ_CACHE_TTL: float = 86400.0  # seconds
+    GROQ_CACHE_MAX_ENTRIES: int = 1000
+    GROQ_CACHE_DIR: str = ".cache/groq"
+    
+    # Client-side Groq rate limits, shared by all requests in the process
+    # (0 disables a budget). Match these to your Groq plan.
+    GROQ_REQUESTS_PER_MINUTE: int = 30
+    GROQ_TOKENS_PER_MINUTE: int = 0
+    
+    # Adaptive concurrency of Groq calls: the limit grows while calls are
+    # fast and healthy and is halved on 429/5xx/timeouts or latency spikes
+    # (per-token latency above GROQ_LATENCY_TOLERANCE x usual). GROQ_CONCURRENCY_MAX=0 disables
+    GROQ_CONCURRENCY_INITIAL: int = 4
+    GROQ_CONCURRENCY_MIN: int = 1
+    GROQ_CONCURRENCY_MAX: int = 16
+    GROQ_LATENCY_TOLERANCE: float = 2.0
+    
+    # Tavily search cache: queries are case- and whitespace-folded, so the
+    # same question asked about a company again is served from the cache
+    TAVILY_CACHE_ENABLED: bool = True
+    TAVILY_CACHE_BACKEND: str = "memory"  # "memory" or "postgres" (shared across processes)
+    TAVILY_CACHE_TTL: float = 86400.0  # seconds
+    TAVILY_CACHE_MAX_ENTRIES: int = 2000
+    
+    # Connection pools of the Groq and Tavily clients (one pool per API).
+    # Idle keep-alive connections are closed after HTTP_KEEPALIVE_EXPIRY;
+    # HTTP_POOL_TIMEOUT bounds the wait for a free connection, and
+    # HTTP_READ_TIMEOUT the wait between bytes of a (slow) LLM response
+    HTTP_MAX_CONNECTIONS: int = 20
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP_CONNECT_TIMEOUT: float = 10.0
+    HTTP_READ_TIMEOUT: float = 60.0
+    HTTP_WRITE_TIMEOUT: float = 10.0
+    HTTP_POOL_TIMEOUT: float = 30.0
+    HTTP2_ENABLED: bool = True  # Used when the h2 package is installed
+    
+    # Retries of failed Groq/Tavily calls: Retry-After and rate limit reset
+    # headers are followed, otherwise decorrelated jitter between the base and
+    # max delay; one call sleeps at most UPSTREAM_RETRY_BUDGET seconds in total
+    UPSTREAM_RETRY_BASE_DELAY: float = 1.0
+    UPSTREAM_RETRY_MAX_DELAY: float = 20.0
+    UPSTREAM_RETRY_BUDGET: float = 30.0
+    # After this many consecutive 5xx/timeout/connection failures an upstream
+    # is failed fast for CIRCUIT_BREAKER_RESET_TIMEOUT seconds (0 disables)
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_BREAKER_RESET_TIMEOUT: float = 30.0
+    
+    # Where analyses run: "inline" starts the pipeline inside the API process,
+    # "queue" stores a job in analysis_jobs for `python worker.py` to claim
+    ANALYSIS_EXECUTION_MODE: str = "inline"
+    JOB_MAX_ATTEMPTS: int = 3  # Claims per job before a crashed job is marked failed
+    
+    # Worker processes: a claimed job is leased for WORKER_LEASE_SECONDS and the
+    # lease is renewed every WORKER_HEARTBEAT_INTERVAL; jobs whose lease ran out
+    # (worker crashed or was killed) are picked up again by another worker
+    WORKER_CONCURRENCY: int = 2  # Analyses run at once by one worker process
+    WORKER_POLL_INTERVAL: float = 2.0  # seconds between claims when the queue is empty
+    WORKER_LEASE_SECONDS: float = 120.0
+    WORKER_HEARTBEAT_INTERVAL: float = 30.0
+    
+    # Pipeline checkpoints for POST /api/analyses/{id}/resume: "postgres"
+    # (falls back to "memory" on other databases), "memory" or "none"
+    PIPELINE_CHECKPOINTER: str = "postgres"
+    CHECKPOINT_POOL_SIZE: int = 5  # Connections used by the Postgres checkpointer
+    
+    # How progress events reach SSE streams: "memory" only works when the
+    # pipeline runs in the same process as the stream; "postgres" uses
+    # LISTEN/NOTIFY and works across uvicorn workers, worker processes and hosts
+    PROGRESS_BUS_BACKEND: str = "memory"
+    # Recent events kept per analysis so a reconnecting stream (Last-Event-ID)
+    # can replay what it missed, and how many analyses to keep them for
+    PROGRESS_REPLAY_BUFFER_SIZE: int = 200
+    PROGRESS_REPLAY_MAX_ANALYSES: int = 1000
+    # Undelivered events held per SSE connection before a slow client's
+    # progress events are coalesced or dropped
+    PROGRESS_SUBSCRIBER_QUEUE_SIZE: int = 100
+    # Replay buffers are dropped PROGRESS_FINISHED_TTL seconds after an
+    # analysis finished, or after PROGRESS_ABANDONED_TTL seconds without events
+    # (pipeline died without a terminal event); checked every PROGRESS_REAP_INTERVAL
+    PROGRESS_FINISHED_TTL: float = 300.0
+    PROGRESS_ABANDONED_TTL: float = 3600.0
+    PROGRESS_REAP_INTERVAL: float = 60.0
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -19,4 +118,3 @@ class Settings(BaseSettings):
 
 
 settings = Settings()
-
@@ -1,11 +1,36 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 
+# Async drivers used for each sync database URL scheme
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(url: str) -> str:
+    """Convert a sync DATABASE_URL (psycopg2/sqlite) to its async-driver form"""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername)
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+# Sync engine: Alembic, worker bookkeeping (job queue, caches) and scripts
 engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine: request handlers and analysis tasks, so queries never block the event loop
+async_engine = create_async_engine(to_async_url(settings.DATABASE_URL), pool_pre_ping=True)
+# Objects stay usable after commit; reloading them would need an implicit (blocking) query
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 Base = declarative_base()
 
 
@@ -17,3 +42,8 @@ def get_db():
     finally:
         db.close()
 
+
+async def get_async_db():
+    """Dependency for getting an async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,178 @@
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+Labels = Tuple[Tuple[str, str], ...]
+# A gauge callback returns one value, or (labels, value) pairs for labelled series
+GaugeReading = Union[float, Iterable[Tuple[Dict[str, str], float]]]
+
+
+def _labels_key(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class _Metric:
+    """Named series read at scrape time, set explicitly or from a callback"""
+
+    TYPE = "untyped"
+
+    def __init__(self, name: str, documentation: str, function: Optional[Callable[[], GaugeReading]] = None):
+        self.name = name
+        self.documentation = documentation
+        self._function = function
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def _add(self, amount: float, labels: Dict[str, str]):
+        key = _labels_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set_function(self, function: Optional[Callable[[], GaugeReading]]):
+        """Read the metric from function at scrape time (None goes back to recorded values)"""
+        self._function = function
+
+    def value(self, **labels: str) -> float:
+        for series_labels, value in self.collect():
+            if series_labels == _labels_key(labels):
+                return value
+        return 0.0
+
+    def collect(self) -> List[Tuple[Labels, float]]:
+        if self._function is None:
+            with self._lock:
+                return list(self._values.items())
+        reading = self._function()
+        if isinstance(reading, (int, float)):
+            return [((), float(reading))]
+        return [(_labels_key(labels), float(value)) for labels, value in reading]
+
+
+class Gauge(_Metric):
+    """
+    A value that goes up and down, exported in the Prometheus text format
+
+    Either set explicitly (optionally per label set) or read from a callback
+    when /metrics is scraped, which suits values another object already
+    tracks, such as queue lengths.
+    """
+
+    TYPE = "gauge"
+
+    def set(self, value: float, **labels: str):
+        with self._lock:
+            self._values[_labels_key(labels)] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        self._add(amount, labels)
+
+    def dec(self, amount: float = 1.0, **labels: str):
+        self._add(-amount, labels)
+
+
+class Counter(_Metric):
+    """
+    A count that only goes up (from zero when the process starts)
+
+    Exported with the counter type so rate() and increase() handle process
+    restarts. Names end in _total. A callback must return a value that never
+    decreases during the process' lifetime.
+    """
+
+    TYPE = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        self._add(amount, labels)
+
+
+class MetricsRegistry:
+    """Named gauges and counters of this process, rendered for a Prometheus scrape"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, kind, name: str, documentation: str, function):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = kind(name, documentation, function)
+            elif not isinstance(metric, kind):
+                raise ValueError(f"Metric {name} is already registered as a {metric.TYPE}")
+            elif function is not None:
+                metric.set_function(function)
+            return metric
+
+    def gauge(self, name: str, documentation: str, function: Optional[Callable[[], GaugeReading]] = None) -> Gauge:
+        """
+        Get or create a gauge
+
+        Args:
+            name: Metric name (Prometheus naming: snake_case with a unit suffix)
+            documentation: HELP text
+            function: Optional callback read at scrape time; replaces the
+                callback of an existing gauge of the same name
+
+        Returns:
+            The gauge registered under name
+        """
+        return self._get_or_create(Gauge, name, documentation, function)
+
+    def counter(self, name: str, documentation: str, function: Optional[Callable[[], GaugeReading]] = None) -> Counter:
+        """
+        Get or create a counter
+
+        Args:
+            name: Metric name, ending in _total
+            documentation: HELP text
+            function: Optional callback read at scrape time, for counts
+                another object already keeps; replaces the callback of an
+                existing counter of the same name
+
+        Returns:
+            The counter registered under name
+        """
+        return self._get_or_create(Counter, name, documentation, function)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            registered = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        for metric in registered:
+            try:
+                series = metric.collect()
+            except Exception as e:
+                # One broken callback should not take down the whole scrape
+                logger.warning(f"[METRICS] Failed to read {metric.name}: {type(e).__name__}: {e}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.TYPE}")
+            for labels, value in series:
+                lines.append(f"{metric.name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Content type of the text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Global instance
+metrics = MetricsRegistry()
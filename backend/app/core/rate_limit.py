@@ -0,0 +1,139 @@
+from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+import time
+
+from app.core.concurrency import ConcurrencyLimiter
+
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio for English prompts with Llama tokenizers
+CHARS_PER_TOKEN = 4
+# Per-message overhead for role markers and formatting
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(messages: List[Dict[str, Any]], max_tokens: int) -> int:
+    """
+    Estimate how many tokens a chat completion will consume
+
+    The prompt is estimated from its length and the completion is assumed to
+    use all of max_tokens; the limiter corrects the estimate once the
+    response reports its actual usage.
+    """
+    prompt_chars = sum(len(str(message.get("content", ""))) for message in messages)
+    prompt_tokens = prompt_chars // CHARS_PER_TOKEN + MESSAGE_OVERHEAD_TOKENS * len(messages)
+    return prompt_tokens + max_tokens
+
+
+class TokenBucket:
+    """Token bucket that refills continuously up to its capacity"""
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self._updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated_at) * self.refill_per_second)
+        self._updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (0 if available now)"""
+        self._refill()
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.refill_per_second
+
+    def consume(self, amount: float):
+        self._refill()
+        self.tokens -= amount
+
+    def adjust(self, amount: float):
+        """Give back (positive) or take away (negative) tokens; may go below zero"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class RateLimiter:
+    """
+    Client-side requests-per-minute and tokens-per-minute limiter
+
+    Callers reserve one request and an estimated token count before sending.
+    Reservations are granted strictly in arrival order, so a large request at
+    the head of the queue is not starved by a stream of small ones. Once the
+    response arrives, record_usage() replaces the estimate with the real
+    token count; every reservation must be settled this way, with 0 for a
+    request that failed. A limit of 0 disables that budget.
+    """
+
+    def __init__(self, requests_per_minute: int = 0, tokens_per_minute: int = 0, name: str = "RATE"):
+        self.name = name
+        self.request_bucket = (
+            TokenBucket(requests_per_minute, requests_per_minute / 60.0) if requests_per_minute > 0 else None
+        )
+        self.token_bucket = (
+            TokenBucket(tokens_per_minute, tokens_per_minute / 60.0) if tokens_per_minute > 0 else None
+        )
+        # Only the head of the queue waits on the buckets; everyone else waits here
+        self._queue = ConcurrencyLimiter(1, name=name)
+
+    @property
+    def enabled(self) -> bool:
+        return self.request_bucket is not None or self.token_bucket is not None
+
+    @property
+    def waiting(self) -> int:
+        return self._queue.waiting
+
+    async def acquire(self, estimated_tokens: int = 0) -> int:
+        """
+        Wait until one request and `estimated_tokens` tokens fit in the budgets
+
+        Returns:
+            The number of tokens reserved (pass it to record_usage)
+        """
+        if not self.enabled:
+            return 0
+
+        reserved = estimated_tokens
+        if self.token_bucket is not None:
+            # A request larger than the whole budget would otherwise wait forever
+            reserved = min(estimated_tokens, int(self.token_bucket.capacity))
+
+        async with self._queue:
+            while True:
+                wait = 0.0
+                if self.request_bucket is not None:
+                    wait = max(wait, self.request_bucket.wait_time(1))
+                if self.token_bucket is not None:
+                    wait = max(wait, self.token_bucket.wait_time(reserved))
+                if wait <= 0:
+                    break
+                logger.debug(f"[{self.name}] Budget exhausted, waiting {wait:.2f}s before sending")
+                await asyncio.sleep(wait)
+
+            if self.request_bucket is not None:
+                self.request_bucket.consume(1)
+            if self.token_bucket is not None:
+                self.token_bucket.consume(reserved)
+        return reserved
+
+    def record_usage(self, reserved_tokens: int, actual_tokens: Optional[int]):
+        """
+        Correct a reservation with the token count reported by the API
+
+        Pass 0 to refund a failed request; None keeps the estimate.
+        """
+        if self.token_bucket is None or actual_tokens is None:
+            return
+        self.token_bucket.adjust(reserved_tokens - actual_tokens)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests_available": self.request_bucket.tokens if self.request_bucket else None,
+            "tokens_available": self.token_bucket.tokens if self.token_bucket else None,
+            "waiting": self.waiting
+        }
@@ -0,0 +1,263 @@
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Mapping, Optional
+import logging
+import random
+import re
+import time
+import weakref
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Groq (OpenAI-style) reset durations: "7.66s", "2m59.56s", "1h2m3s", "120ms"
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def parse_duration(value: str) -> Optional[float]:
+    """Seconds in a rate limit reset value ("2m59.56s", or plain seconds); None if unparseable"""
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts or "".join(number + unit for number, unit in parts) != value:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+def parse_retry_after(value: str, now: Optional[datetime] = None) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delay in seconds or an HTTP date)"""
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - (now or datetime.now(timezone.utc))).total_seconds())
+
+
+def server_retry_delay(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """
+    How long the server asked us to wait before retrying
+
+    Uses Retry-After when present, otherwise the x-ratelimit-reset-* header
+    of each exhausted budget (x-ratelimit-remaining-* of 0), taking the
+    longest.
+
+    Args:
+        headers: Response headers (case-insensitive mapping, e.g. httpx.Headers)
+
+    Returns:
+        Seconds to wait, or None when the response gives no hint
+    """
+    if not headers:
+        return None
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        delay = parse_retry_after(retry_after)
+        if delay is not None:
+            return delay
+    resets = []
+    for budget in ("requests", "tokens"):
+        reset = headers.get(f"x-ratelimit-reset-{budget}")
+        if reset and headers.get(f"x-ratelimit-remaining-{budget}", "0").strip() == "0":
+            delay = parse_duration(reset)
+            if delay is not None:
+                resets.append(delay)
+    return max(resets) if resets else None
+
+
+class Backoff:
+    """Delays between the attempts of one call (created by RetryPolicy.backoff())"""
+
+    def __init__(self, policy: "RetryPolicy"):
+        self.policy = policy
+        self.slept = 0.0
+        self._previous = policy.base_delay
+
+    def next_delay(self, headers: Optional[Mapping[str, str]] = None) -> Optional[float]:
+        """
+        Delay before the next attempt
+
+        A server hint (Retry-After / rate limit reset) is followed, plus a
+        little jitter so parallel callers do not retry in lockstep; otherwise
+        the delay is decorrelated jitter: random between the base delay and
+        three times the previous delay, capped at max_delay.
+
+        Args:
+            headers: Headers of the failed response, if there was one
+
+        Returns:
+            Seconds to sleep, or None when waiting would exceed the retry
+            budget of the call (give up now instead)
+        """
+        policy = self.policy
+        hint = server_retry_delay(headers)
+        if hint is not None:
+            delay = hint + random.uniform(0, policy.base_delay)
+        else:
+            delay = min(policy.max_delay, random.uniform(policy.base_delay, self._previous * 3))
+            self._previous = delay
+        if self.slept + delay > policy.budget:
+            return None
+        self.slept += delay
+        return delay
+
+
+class RetryPolicy:
+    """
+    Backoff settings shared by the calls to one upstream API
+
+    Each call takes its own Backoff from backoff(); the budget caps the
+    total time one call spends sleeping between attempts.
+    """
+
+    def __init__(self, base_delay: float = 1.0, max_delay: float = 20.0, budget: float = 30.0):
+        """
+        Initialize the policy
+
+        Args:
+            base_delay: Smallest delay between attempts, in seconds
+            max_delay: Largest computed delay (server hints may be longer)
+            budget: Total seconds one call may sleep across its retries
+        """
+        self.base_delay = base_delay
+        self.max_delay = max(max_delay, base_delay)
+        self.budget = budget
+
+    def backoff(self) -> Backoff:
+        return Backoff(self)
+
+
+def build_retry_policy() -> RetryPolicy:
+    """Create a retry policy from the UPSTREAM_RETRY_* settings"""
+    return RetryPolicy(
+        base_delay=settings.UPSTREAM_RETRY_BASE_DELAY,
+        max_delay=settings.UPSTREAM_RETRY_MAX_DELAY,
+        budget=settings.UPSTREAM_RETRY_BUDGET
+    )
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit breaker is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} circuit is open, retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+# Live breakers by name, for the gauge below
+_breakers: "weakref.WeakValueDictionary[str, CircuitBreaker]" = weakref.WeakValueDictionary()
+
+
+class CircuitBreaker:
+    """
+    Fails calls fast while an upstream is clearly down
+
+    After failure_threshold consecutive failures (5xx, timeouts, connection
+    errors) the circuit opens and check() raises CircuitOpenError for
+    reset_timeout seconds. Then it is half-open: one probe call is let
+    through, and its outcome closes the circuit again or re-opens it.
+    Rate limiting (429) and other client errors are not failures: the
+    upstream is up, just busy.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Initialize the breaker
+
+        Args:
+            name: Upstream name, used in log messages and as the metrics label
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds the circuit stays open before a probe
+            clock: Monotonic time source (replaceable in tests)
+        """
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_started: Optional[float] = None
+        _breakers[name] = self
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if self._clock() - self._opened_at < self.reset_timeout:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def check(self):
+        """Raise CircuitOpenError unless a call may go through now"""
+        state = self.state
+        if state == self.CLOSED:
+            return
+        now = self._clock()
+        if state == self.HALF_OPEN:
+            # One probe at a time; a probe that never reported back is replaced
+            if self._probe_started is None or now - self._probe_started >= self.reset_timeout:
+                self._probe_started = now
+                logger.info(f"[CIRCUIT {self.name}] Half-open, letting a probe call through")
+                return
+            raise CircuitOpenError(self.name, self.reset_timeout - (now - self._probe_started))
+        raise CircuitOpenError(self.name, self.reset_timeout - (now - self._opened_at))
+
+    def record_success(self):
+        if self._opened_at is not None:
+            logger.info(f"[CIRCUIT {self.name}] Upstream recovered, circuit closed")
+        self._failures = 0
+        self._opened_at = None
+        self._probe_started = None
+
+    def record_failure(self):
+        self._failures += 1
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self._opened_at is None:
+                logger.warning(
+                    f"[CIRCUIT {self.name}] {self._failures} consecutive failures, "
+                    f"failing fast for {self.reset_timeout:.0f}s"
+                )
+            self._opened_at = self._clock()
+            self._probe_started = None
+
+
+def build_circuit_breaker(name: str) -> Optional[CircuitBreaker]:
+    """Create a breaker from the CIRCUIT_BREAKER_* settings (None when disabled)"""
+    if settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD <= 0:
+        return None
+    return CircuitBreaker(
+        name,
+        failure_threshold=settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+        reset_timeout=settings.CIRCUIT_BREAKER_RESET_TIMEOUT
+    )
+
+
+_STATE_VALUES = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+
+metrics.gauge(
+    "circuit_breaker_state", "Upstream circuit breaker state (0 closed, 1 half-open, 2 open)",
+    lambda: [({"upstream": name}, _STATE_VALUES[breaker.state]) for name, breaker in list(_breakers.items())]
+)
@@ -0,0 +1,188 @@
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypeVar
+import asyncio
+import hashlib
+import json
+import logging
+import weakref
+
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Live groups by name, for the metrics below
+_groups: "weakref.WeakValueDictionary[str, SingleFlight]" = weakref.WeakValueDictionary()
+
+
+def request_key(request: Dict[str, Any]) -> str:
+    """Stable key of a JSON-serializable request (key order does not matter)"""
+    canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class _SharedStream:
+    """One upstream stream fanned out to every subscriber, each from the first chunk"""
+
+    def __init__(self):
+        self.chunks: List[Any] = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self.updated = asyncio.Event()
+
+    def notify(self):
+        # Wake everyone waiting now; later waits use a fresh event
+        self.updated.set()
+        self.updated = asyncio.Event()
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls into one
+
+    The first caller for a key starts the call as a task; callers arriving
+    with the same key while it runs wait for that task and get the same
+    result (or exception). Each caller waits through asyncio.shield, so a
+    cancelled caller only stops waiting: the shared call keeps running for
+    the others, and is cancelled only when its last waiter has gone. Once
+    the call finishes the key is forgotten, so later calls start afresh
+    (results are not cached here).
+
+    stream() does the same for async iterators: one upstream stream, whose
+    items every subscriber receives from the first one on.
+    """
+
+    def __init__(self, name: str = "singleflight"):
+        """
+        Initialize the group
+
+        Args:
+            name: Name used in log messages and as the metrics label
+        """
+        self.name = name
+        self._calls: Dict[str, Any] = {}  # key -> _Call or _SharedStream
+        self.coalesced = 0  # Calls served by another caller's request since start
+        _groups[name] = self
+
+    def in_flight(self) -> int:
+        """Shared calls currently running"""
+        return len(self._calls)
+
+    async def do(self, key: str, function: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run function once per key among concurrent callers
+
+        Args:
+            key: Identity of the request (see request_key)
+            function: Makes the call; only invoked when no call for key is running
+
+        Returns:
+            The result of the shared call
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(function()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _task, call=call: self._forget(key, call))
+        else:
+            self.coalesced += 1
+            logger.info(f"[SINGLEFLIGHT {self.name}] Joined in-flight call ({key[:12]}, {call.waiters + 1} waiting)")
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.task.cancelled():
+                # The shared call itself was cancelled, not just this caller
+                raise
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                logger.debug(f"[SINGLEFLIGHT {self.name}] Last waiter cancelled, cancelling call ({key[:12]})")
+                # Forget it now: a caller arriving before the task has
+                # finished cancelling must start a new call, not join this one
+                self._forget(key, call)
+                call.task.cancel()
+            raise
+
+    async def stream(self, key: str, function: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """
+        Share one async iterator per key among concurrent subscribers
+
+        Items are buffered until the stream ends, so a subscriber joining
+        late first receives everything produced so far. An error raised by
+        the stream reaches every subscriber. The upstream stream is
+        cancelled once its last subscriber has stopped iterating.
+
+        Args:
+            key: Identity of the request (see request_key); use keys distinct
+                from those passed to do()
+            function: Opens the stream; only invoked when none is running for key
+
+        Yields:
+            The stream's items, in order
+        """
+        shared = self._calls.get(key)
+        if shared is None:
+            shared = _SharedStream()
+            shared.task = asyncio.ensure_future(self._pump(key, shared, function()))
+            self._calls[key] = shared
+        else:
+            self.coalesced += 1
+            logger.info(f"[SINGLEFLIGHT {self.name}] Joined in-flight stream ({key[:12]}, {shared.subscribers + 1} subscribers)")
+
+        shared.subscribers += 1
+        position = 0
+        try:
+            while True:
+                while position < len(shared.chunks):
+                    yield shared.chunks[position]
+                    position += 1
+                if shared.finished:
+                    if shared.error is not None:
+                        raise shared.error
+                    return
+                await shared.updated.wait()
+        finally:
+            shared.subscribers -= 1
+            if shared.subscribers == 0 and not shared.finished:
+                logger.debug(f"[SINGLEFLIGHT {self.name}] Last subscriber left, cancelling stream ({key[:12]})")
+                self._forget(key, shared)
+                shared.task.cancel()
+
+    async def _pump(self, key: str, shared: _SharedStream, source: AsyncIterator[Any]):
+        try:
+            async for chunk in source:
+                shared.chunks.append(chunk)
+                shared.notify()
+        except BaseException as e:
+            shared.error = e
+            if isinstance(e, asyncio.CancelledError):
+                raise
+        finally:
+            shared.finished = True
+            self._forget(key, shared)
+            shared.notify()
+
+    def _forget(self, key: str, call: Any):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+
+metrics.gauge(
+    "singleflight_in_flight", "Upstream calls and streams currently shared by concurrent identical requests",
+    lambda: [({"group": name}, group.in_flight()) for name, group in list(_groups.items())]
+)
+metrics.counter(
+    "singleflight_coalesced_calls_total", "Calls served by joining an identical in-flight call or stream",
+    lambda: [({"group": name}, group.coalesced) for name, group in list(_groups.items())]
+)
@@ -2,6 +2,10 @@ from app.models.analysis import Analysis, AnalysisStatus
 from app.models.scenario import Scenario
 from app.models.strategy import Strategy
 from app.models.search_query import SearchQuery
+from app.models.cache_entry import CacheEntry
+from app.models.analysis_job import AnalysisJob, JobStatus
 
-__all__ = ["Analysis", "AnalysisStatus", "Scenario", "Strategy", "SearchQuery"]
-
+__all__ = [
+    "Analysis", "AnalysisStatus", "Scenario", "Strategy", "SearchQuery", "CacheEntry",
+    "AnalysisJob", "JobStatus"
+]
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Enum as SQLEnum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index, LargeBinary, Enum as SQLEnum
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
 import enum
 from app.core.database import Base
@@ -14,6 +14,11 @@ class AnalysisStatus(str, enum.Enum):
 
 class Analysis(Base):
     __tablename__ = "analyses"
+    __table_args__ = (
+        # History listing: latest analyses by status, and keyset pagination order
+        Index("ix_analyses_status_created_at", "status", "created_at"),
+        Index("ix_analyses_created_at_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     company_name = Column(String, nullable=False, index=True)
@@ -21,6 +26,9 @@ class Analysis(Base):
     company_context = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # Serialized detail response, written once the analysis completes (deferred: only the detail endpoint reads it)
+    result_snapshot = deferred(Column(LargeBinary, nullable=True))
+    result_etag = Column(String, nullable=True)
 
     # Relationships
     scenarios = relationship("Scenario", back_populates="analysis", cascade="all, delete-orphan")
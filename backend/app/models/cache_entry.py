@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String, DateTime, JSON
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class CacheEntry(Base):
+    __tablename__ = "cache_entries"
+
+    namespace = Column(String, primary_key=True)  # e.g. "tavily"
+    key = Column(String, primary_key=True)  # SHA-256 of the normalized request
+    value = Column(JSON, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_accessed_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -8,7 +8,7 @@ class Scenario(Base):
     __tablename__ = "scenarios"
 
     id = Column(Integer, primary_key=True, index=True)
-    analysis_id = Column(Integer, ForeignKey("analyses.id"), nullable=False)
+    analysis_id = Column(Integer, ForeignKey("analyses.id"), nullable=False, index=True)
     scenario_number = Column(Integer, nullable=False)  # 1-4
     title = Column(String, nullable=False)
     description = Column(Text, nullable=False)
@@ -8,7 +8,7 @@ class SearchQuery(Base):
     __tablename__ = "search_queries"
 
     id = Column(Integer, primary_key=True, index=True)
-    analysis_id = Column(Integer, ForeignKey("analyses.id"), nullable=False)
+    analysis_id = Column(Integer, ForeignKey("analyses.id"), nullable=False, index=True)
     query = Column(String, nullable=False)
     results = Column(JSON, nullable=True)
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
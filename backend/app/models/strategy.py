@@ -8,7 +8,7 @@ class Strategy(Base):
     __tablename__ = "strategies"
 
     id = Column(Integer, primary_key=True, index=True)
-    scenario_id = Column(Integer, ForeignKey("scenarios.id"), nullable=False)
+    scenario_id = Column(Integer, ForeignKey("scenarios.id"), nullable=False, index=True)
     name = Column(String, nullable=False)
     description = Column(Text, nullable=False)
     expected_impact = Column(Text, nullable=True)
@@ -0,0 +1,89 @@
+from typing import Any, Dict, List
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+import logging
+
+from app.models.scenario import Scenario
+from app.models.search_query import SearchQuery
+from app.models.strategy import Strategy
+
+logger = logging.getLogger(__name__)
+
+
+def scenario_rows(analysis_id: int, scenarios: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "analysis_id": analysis_id,
+            "scenario_number": scenario_data.get("scenario_number", 0),
+            "title": scenario_data.get("title", ""),
+            "description": scenario_data.get("description", ""),
+            "timeline": scenario_data.get("timeline"),
+            "key_assumptions": scenario_data.get("key_assumptions"),
+            "likelihood": scenario_data.get("likelihood")
+        }
+        for scenario_data in scenarios
+    ]
+
+
+def strategy_row(scenario_id: int, strategy_data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "scenario_id": scenario_id,
+        "name": strategy_data.get("name", ""),
+        "description": strategy_data.get("description", ""),
+        "expected_impact": strategy_data.get("expected_impact"),
+        "key_risks": strategy_data.get("key_risks")
+    }
+
+
+async def save_pipeline_results(db: AsyncSession, analysis_id: int, result: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Write an analysis' search queries, scenarios and strategies in bulk
+
+    Uses at most three multi-row INSERT statements whatever the size of the
+    result: search queries, scenarios (with RETURNING to get their ids, in
+    input order), then strategies. Nothing is committed; the caller commits
+    together with the analysis status update so the save stays atomic.
+
+    On SQLite, which cannot order RETURNING rows, SQLAlchemy sends the
+    scenario insert one row at a time; the other two stay single statements.
+
+    Args:
+        db: Session of the caller's transaction
+        analysis_id: Analysis the rows belong to
+        result: Pipeline result (search_results, scenarios, strategies)
+
+    Returns:
+        Row counts per table
+    """
+    search_query_rows = [
+        {"analysis_id": analysis_id, "query": question, "results": results}
+        for question, results in result.get("search_results", {}).items()
+    ]
+    if search_query_rows:
+        await db.execute(insert(SearchQuery), search_query_rows)
+
+    scenarios = result.get("scenarios", [])
+    scenario_ids: List[int] = []
+    if scenarios:
+        inserted = await db.execute(
+            insert(Scenario).returning(Scenario.id, sort_by_parameter_order=True),
+            scenario_rows(analysis_id, scenarios)
+        )
+        scenario_ids = list(inserted.scalars().all())
+
+    strategies_by_scenario = result.get("strategies", {})
+    strategy_rows = []
+    for scenario_id, scenario_data in zip(scenario_ids, scenarios):
+        scenario_key = scenario_data.get("title", f"scenario_{scenario_data.get('scenario_number', 0)}")
+        for strategy_data in strategies_by_scenario.get(scenario_key, []):
+            strategy_rows.append(strategy_row(scenario_id, strategy_data))
+    if strategy_rows:
+        await db.execute(insert(Strategy), strategy_rows)
+
+    counts = {
+        "search_queries": len(search_query_rows),
+        "scenarios": len(scenario_ids),
+        "strategies": len(strategy_rows)
+    }
+    logger.debug(f"[PERSIST {analysis_id}] Inserted {counts}")
+    return counts
@@ -0,0 +1,185 @@
+from typing import Awaitable, Callable, Dict, Optional
+import asyncio
+import logging
+import os
+import socket
+import uuid
+
+from app.core.config import settings
+from app.services.job_queue import ClaimedJob, JobQueue, job_queue
+
+logger = logging.getLogger(__name__)
+
+
+def default_worker_id() -> str:
+    """Identify a worker by host and pid, plus a random suffix for restarts"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+async def _run_analysis(analysis_id: int, company_name: str):
+    # Imported lazily so the worker module does not pull in FastAPI at import time
+    from app.api.routes.analyses import run_analysis_task
+    # A job picked up again after a crash or a resume request continues from the
+    # pipeline checkpoint; a new job has none and runs from the start.
+    # A cancelled run leaves the analysis as it is: the job is either held by
+    # another worker already or goes back to the queue
+    await run_analysis_task(analysis_id, company_name, resume=True, fail_on_cancel=False)
+
+
+class AnalysisWorker:
+    """
+    Claims analysis jobs from the queue and runs them
+
+    Up to `concurrency` analyses run at once. While an analysis runs, its lease
+    is renewed every heartbeat_interval seconds; if a renewal reports that the
+    lease was lost (the worker stalled long enough for another worker to take
+    the job over), the local run is cancelled so the analysis is not saved twice.
+    stop() stops claiming new jobs and lets running ones finish; a second stop()
+    cancels them. Runs cancelled that way or by a hard shutdown put their jobs
+    back in the queue.
+    """
+
+    def __init__(
+        self,
+        queue: Optional[JobQueue] = None,
+        concurrency: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        heartbeat_interval: Optional[float] = None,
+        worker_id: Optional[str] = None,
+        runner: Optional[Callable[[int, str], Awaitable[None]]] = None
+    ):
+        """
+        Initialize the worker
+
+        Args:
+            queue: Job queue to claim from (defaults to the global queue)
+            concurrency: Maximum number of analyses run at once
+            poll_interval: Seconds to wait before polling an empty queue again
+            heartbeat_interval: Seconds between lease renewals
+            worker_id: Identifier stored on claimed jobs
+            runner: Coroutine function run for each job (defaults to run_analysis_task)
+        """
+        self.queue = queue or job_queue
+        self.concurrency = max(1, settings.WORKER_CONCURRENCY if concurrency is None else concurrency)
+        self.poll_interval = settings.WORKER_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.heartbeat_interval = (
+            settings.WORKER_HEARTBEAT_INTERVAL if heartbeat_interval is None else heartbeat_interval
+        )
+        self.worker_id = worker_id or default_worker_id()
+        self.runner = runner or _run_analysis
+        self._running: Dict[int, asyncio.Task] = {}
+        self._stopping: Optional[asyncio.Event] = None
+        self._slot_freed: Optional[asyncio.Event] = None
+
+    @property
+    def running_jobs(self) -> int:
+        return len(self._running)
+
+    def stop(self):
+        """
+        Stop claiming new jobs; run() returns once running jobs finish
+
+        Calling it again while jobs are still running cancels them; their
+        jobs go back to the queue for another worker.
+        """
+        if self._stopping is None:
+            return
+        if self._stopping.is_set():
+            if self._running:
+                logger.warning(f"[WORKER {self.worker_id}] Stopped again, cancelling {len(self._running)} running job(s)")
+                for task in list(self._running.values()):
+                    task.cancel()
+            return
+        self._stopping.set()
+        if self._slot_freed is not None:
+            self._slot_freed.set()
+
+    async def run(self):
+        """Claim and run jobs until stop() is called"""
+        self._stopping = asyncio.Event()
+        self._slot_freed = asyncio.Event()
+        logger.info(f"[WORKER {self.worker_id}] Started (concurrency {self.concurrency})")
+
+        try:
+            while not self._stopping.is_set():
+                if len(self._running) >= self.concurrency:
+                    self._slot_freed.clear()
+                    await self._wait_for(self._slot_freed, None)
+                    continue
+
+                try:
+                    job = await asyncio.to_thread(self.queue.claim, self.worker_id)
+                except Exception as e:
+                    logger.error(f"[WORKER {self.worker_id}] Failed to claim a job: {type(e).__name__}: {e}", exc_info=True)
+                    job = None
+
+                if job is None:
+                    await self._wait_for(self._stopping, self.poll_interval)
+                    continue
+
+                self._running[job.id] = asyncio.create_task(self._process(job))
+        finally:
+            if self._running:
+                logger.info(f"[WORKER {self.worker_id}] Waiting for {len(self._running)} running job(s) to finish")
+                await asyncio.gather(*self._running.values(), return_exceptions=True)
+            logger.info(f"[WORKER {self.worker_id}] Stopped")
+
+    async def _wait_for(self, event: asyncio.Event, timeout: Optional[float]):
+        # Wakes early when the worker is stopped
+        waiters = [asyncio.ensure_future(event.wait())]
+        if event is not self._stopping:
+            waiters.append(asyncio.ensure_future(self._stopping.wait()))  # type: ignore
+        try:
+            await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+
+    async def _process(self, job: ClaimedJob):
+        run_task = asyncio.create_task(self.runner(job.analysis_id, job.company_name))
+        heartbeat_task = asyncio.create_task(self._heartbeat(job, run_task))
+        try:
+            await run_task
+            await asyncio.to_thread(self.queue.complete, job.id, self.worker_id)
+            logger.info(f"[WORKER {self.worker_id}] Job {job.id} (analysis {job.analysis_id}) succeeded")
+        except asyncio.CancelledError:
+            lease_lost = heartbeat_task.done() and not heartbeat_task.cancelled() and heartbeat_task.result()
+            if lease_lost:
+                logger.warning(f"[WORKER {self.worker_id}] Job {job.id} (analysis {job.analysis_id}) cancelled after losing its lease")
+            elif run_task.cancelled():
+                # Shutting down mid-run: hand the job back instead of waiting for the lease to expire
+                logger.warning(f"[WORKER {self.worker_id}] Job {job.id} (analysis {job.analysis_id}) cancelled, returning it to the queue")
+                try:
+                    await asyncio.to_thread(self.queue.release, job.id, self.worker_id)
+                except Exception as db_error:
+                    logger.error(f"[WORKER {self.worker_id}] Failed to release job {job.id}: {db_error}", exc_info=True)
+            else:
+                logger.warning(f"[WORKER {self.worker_id}] Job {job.id} (analysis {job.analysis_id}) cancelled while recording its outcome")
+        except Exception as e:
+            # run_analysis_task has already marked the analysis as failed
+            logger.error(f"[WORKER {self.worker_id}] Job {job.id} (analysis {job.analysis_id}) failed: {type(e).__name__}: {e}")
+            try:
+                await asyncio.to_thread(self.queue.fail, job.id, self.worker_id, f"{type(e).__name__}: {e}")
+            except Exception as db_error:
+                logger.error(f"[WORKER {self.worker_id}] Failed to record failure of job {job.id}: {db_error}", exc_info=True)
+        finally:
+            heartbeat_task.cancel()
+            self._running.pop(job.id, None)
+            if self._slot_freed is not None:
+                self._slot_freed.set()
+
+    async def _heartbeat(self, job: ClaimedJob, run_task: asyncio.Task) -> bool:
+        # Returns True when the lease was lost and the run cancelled
+        while not run_task.done():
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                held = await asyncio.to_thread(self.queue.heartbeat, job.id, self.worker_id)
+            except Exception as e:
+                # A transient database error is not a lost lease; try again next interval
+                logger.warning(f"[WORKER {self.worker_id}] Heartbeat for job {job.id} failed: {type(e).__name__}: {e}")
+                continue
+            if not held:
+                logger.error(f"[WORKER {self.worker_id}] Lost the lease on job {job.id}, cancelling the local run")
+                run_task.cancel()
+                return True
+        return False
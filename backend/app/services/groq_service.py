@@ -1,31 +1,131 @@
 import httpx
 import asyncio
-from typing import Optional, Dict, Any
+import json
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, List, Tuple, AsyncIterator
+from app.core.concurrency import AdaptiveConcurrencyLimiter
 from app.core.config import settings
+from app.core.rate_limit import CHARS_PER_TOKEN, RateLimiter, estimate_tokens
+from app.core.retry import CircuitBreaker, RetryPolicy, build_circuit_breaker, build_retry_policy
+from app.core.singleflight import SingleFlight, request_key
+from app.services.http_clients import build_http_client
+from app.services.response_cache import ResponseCache, build_cache_backend
 import time
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def build_groq_cache() -> Optional[ResponseCache]:
+    """Create the Groq response cache from settings (None when disabled)"""
+    if not settings.GROQ_CACHE_ENABLED:
+        return None
+    backend = build_cache_backend(
+        settings.GROQ_CACHE_BACKEND,
+        max_entries=settings.GROQ_CACHE_MAX_ENTRIES,
+        directory=settings.GROQ_CACHE_DIR,
+        namespace="groq"
+    )
+    logger.info(f"[GROQ] Response cache enabled ({settings.GROQ_CACHE_BACKEND}, TTL {settings.GROQ_CACHE_TTL}s)")
+    return ResponseCache(backend, namespace="groq", ttl=settings.GROQ_CACHE_TTL)
+
+
+def build_groq_rate_limiter() -> RateLimiter:
+    """Create the Groq request/token budget limiter from settings"""
+    return RateLimiter(
+        requests_per_minute=settings.GROQ_REQUESTS_PER_MINUTE,
+        tokens_per_minute=settings.GROQ_TOKENS_PER_MINUTE,
+        name="GROQ RATE"
+    )
+
+
+def build_groq_concurrency_limiter() -> Optional[AdaptiveConcurrencyLimiter]:
+    """Create the adaptive Groq concurrency limiter from settings (None when disabled)"""
+    if settings.GROQ_CONCURRENCY_MAX <= 0:
+        return None
+    return AdaptiveConcurrencyLimiter(
+        settings.GROQ_CONCURRENCY_INITIAL,
+        min_limit=settings.GROQ_CONCURRENCY_MIN,
+        max_limit=settings.GROQ_CONCURRENCY_MAX,
+        latency_tolerance=settings.GROQ_LATENCY_TOLERANCE,
+        name="GROQ CONCURRENCY"
+    )
+
+
 class GroqService:
     """Service for interacting with Groq API (Llama 3.1 8B Instant)"""
     
     BASE_URL = "https://api.groq.com/openai/v1"
     MODEL = "llama-3.1-8b-instant"  # Fast, reliable model - commonly available
     MAX_RETRIES = 5  # Increased for rate limiting
-    RETRY_DELAY = 2  # seconds - increased base delay for rate limits
+    RETRY_DELAY = 2  # seconds - base delay when no retry policy is given
     
-    def __init__(self):
+    def __init__(
+        self,
+        cache: Optional[ResponseCache] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None
+    ):
         self.api_key = settings.GROQ_API_KEY
-        self.client = httpx.AsyncClient(
-            base_url=self.BASE_URL,
-            headers={
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            },
-            timeout=60.0
-        )
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.concurrency_limiter = concurrency_limiter
+        self.retry_policy = retry_policy or RetryPolicy(base_delay=self.RETRY_DELAY)
+        self.breaker = breaker
+        # Identical concurrent requests share one API call
+        self.inflight = SingleFlight("groq")
+        self._client: Optional[httpx.AsyncClient] = None
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The pooled HTTP client, created on first use (or after close())"""
+        if self._client is None or self._client.is_closed:
+            self._client = build_http_client(
+                "groq",
+                self.BASE_URL,
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json"
+                }
+            )
+        return self._client
+    
+    @client.setter
+    def client(self, client: httpx.AsyncClient):
+        self._client = client
+    
+    def _build_request(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        json_mode: bool
+    ) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
+        """Build the chat messages and the request payload"""
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        
+        # Hardcode model name to avoid any caching issues
+        model_name = "llama-3.1-8b-instant"  # Hardcoded to ensure it's used
+        logger.info(f"[GROQ] Using model: {model_name} for request (JSON mode: {json_mode})")
+        
+        payload = {
+            "model": model_name,  # Hardcoded model name
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+        
+        # Enable JSON mode if requested
+        if json_mode:
+            payload["response_format"] = {"type": "json_object"}
+        
+        return messages, payload
     
     async def generate(
         self,
@@ -33,7 +133,8 @@ class GroqService:
         system_prompt: Optional[str] = None,
         temperature: float = 0.7,
         max_tokens: int = 2000,
-        json_mode: bool = False
+        json_mode: bool = False,
+        use_cache: bool = True
     ) -> str:
         """
         Generate text using Groq API with retry logic
@@ -44,37 +145,71 @@ class GroqService:
             temperature: Sampling temperature (0.0 to 1.0)
             max_tokens: Maximum tokens to generate
             json_mode: If True, forces the model to return valid JSON
+            use_cache: If False, skip the response cache for this call (always
+                hits the API and does not store the result); such calls are
+                also never shared with concurrent identical requests
             
         Returns:
             Generated text
         """
-        messages = []
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        messages.append({"role": "user", "content": prompt})
-        
-        # Hardcode model name to avoid any caching issues
-        model_name = "llama-3.1-8b-instant"  # Hardcoded to ensure it's used
-        logger.info(f"[GROQ] Using model: {model_name} for request (JSON mode: {json_mode})")
+        messages, payload = self._build_request(prompt, system_prompt, temperature, max_tokens, json_mode)
         
-        payload = {
-            "model": model_name,  # Hardcoded model name
-            "messages": messages,
-            "temperature": temperature,
-            "max_tokens": max_tokens
-        }
+        cache = self.cache if use_cache else None
+        cache_key = None
+        if cache:
+            cache_key = cache.make_key(payload)
+            cached = await cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"[GROQ] Cache hit ({cache_key[:12]}), skipping API call")
+                return cached
         
-        # Enable JSON mode if requested
-        if json_mode:
-            payload["response_format"] = {"type": "json_object"}
+        if not use_cache:
+            return await self._generate_uncached(messages, payload, cache, cache_key)
+        return await self.inflight.do(
+            request_key(payload),
+            lambda: self._generate_uncached(messages, payload, cache, cache_key)
+        )
+    
+    async def _generate_uncached(
+        self,
+        messages: List[Dict[str, str]],
+        payload: Dict[str, Any],
+        cache: Optional[ResponseCache],
+        cache_key: Optional[str]
+    ) -> str:
+        """Call the API with retries, storing the result in the cache"""
+        model_name = payload["model"]
+        temperature = payload["temperature"]
+        max_tokens = payload["max_tokens"]
+        estimated_tokens = estimate_tokens(messages, max_tokens)
+        backoff = self.retry_policy.backoff()
         
         for attempt in range(self.MAX_RETRIES):
+            if self.breaker:
+                self.breaker.check()
             try:
                 logger.debug(f"[GROQ] Attempt {attempt + 1}/{self.MAX_RETRIES} - Max tokens: {max_tokens}")
-                response = await self.client.post("/chat/completions", json=payload)
-                response.raise_for_status()
-                data = response.json()
-                return data["choices"][0]["message"]["content"]
+                reserved_tokens = 0
+                if self.rate_limiter:
+                    reserved_tokens = await self.rate_limiter.acquire(estimated_tokens)
+                # Every attempt settles its reservation: a failed one is refunded
+                used_tokens: Optional[int] = 0
+                try:
+                    async with self._concurrency_slot() as started:
+                        response = await self.client.post("/chat/completions", json=payload)
+                        response.raise_for_status()
+                        data = response.json()
+                        self._record_latency(started, data.get("usage"))
+                    used_tokens = (data.get("usage") or {}).get("total_tokens")
+                finally:
+                    if self.rate_limiter:
+                        self.rate_limiter.record_usage(reserved_tokens, used_tokens)
+                if self.breaker:
+                    self.breaker.record_success()
+                content = data["choices"][0]["message"]["content"]
+                if cache and cache_key and content:
+                    await cache.set(cache_key, content)
+                return content
             except httpx.HTTPStatusError as e:
                 # Log the actual error response from Groq
                 error_detail = ""
@@ -87,28 +222,31 @@ class GroqService:
                     error_detail = f"Could not parse error response: {parse_error}"
                 
                 status_code = e.response.status_code
+                if self.breaker:
+                    if status_code >= 500:
+                        self.breaker.record_failure()
+                    else:
+                        self.breaker.record_success()
                 
-                if status_code == 429:  # Rate limit
-                    wait_time = self.RETRY_DELAY * (2 ** attempt)
-                    logger.warning(f"[GROQ] Rate limited (429), waiting {wait_time}s before retry {attempt + 1}/{self.MAX_RETRIES}")
-                    logger.debug(f"[GROQ] Rate limit response: {error_detail}")
+                if status_code == 429 or status_code >= 500:
+                    wait_time = backoff.next_delay(e.response.headers) if attempt < self.MAX_RETRIES - 1 else None
+                    if wait_time is None:
+                        logger.error(f"[GROQ] HTTP error ({status_code}) after {attempt + 1} attempts, giving up: {error_detail}")
+                        raise
+                    if status_code == 429:
+                        logger.warning(f"[GROQ] Rate limited (429), waiting {wait_time:.1f}s before retry {attempt + 2}/{self.MAX_RETRIES}")
+                        logger.debug(f"[GROQ] Rate limit response: {error_detail}")
+                    else:
+                        logger.warning(f"[GROQ] Server error ({status_code}), retrying in {wait_time:.1f}s")
+                        logger.debug(f"[GROQ] Server error response: {error_detail}")
                     await asyncio.sleep(wait_time)
                     continue
-                elif status_code >= 500:  # Server error
-                    if attempt < self.MAX_RETRIES - 1:
-                        wait_time = self.RETRY_DELAY * (2 ** attempt)
-                        logger.warning(f"[GROQ] Server error ({status_code}), retrying in {wait_time}s")
-                        logger.debug(f"[GROQ] Server error response: {error_detail}")
-                        await asyncio.sleep(wait_time)
-                        continue
-                    else:
-                        logger.error(f"[GROQ] Server error ({status_code}) after all retries: {error_detail}")
                 elif status_code >= 400:  # Client error (400-499)
                     # For 400 errors, log detailed info and don't retry
                     logger.error(f"[GROQ] Client error ({status_code}): {error_detail}")
                     logger.error(f"[GROQ] Request payload: model={model_name}, temperature={temperature}, max_tokens={max_tokens}")
-                    logger.error(f"[GROQ] Messages count: {len(messages)}, System prompt: {'Yes' if system_prompt else 'No'}")
-                    logger.error(f"[GROQ] User prompt length: {len(prompt)} chars")
+                    logger.error(f"[GROQ] Messages count: {len(messages)}, System prompt: {'Yes' if messages[0]['role'] == 'system' else 'No'}")
+                    logger.error(f"[GROQ] User prompt length: {len(messages[-1]['content'])} chars")
                     # Don't retry client errors (400-499) as they won't succeed on retry
                     raise
                 
@@ -117,18 +255,218 @@ class GroqService:
                 raise
             except Exception as e:
                 logger.error(f"[GROQ] Unexpected error calling Groq API: {type(e).__name__}: {str(e)}", exc_info=True)
-                if attempt < self.MAX_RETRIES - 1:
-                    await asyncio.sleep(self.RETRY_DELAY * (2 ** attempt))
+                if self.breaker and isinstance(e, httpx.TransportError):
+                    self.breaker.record_failure()
+                wait_time = backoff.next_delay() if attempt < self.MAX_RETRIES - 1 else None
+                if wait_time is not None:
+                    await asyncio.sleep(wait_time)
                     continue
                 raise
         
         raise Exception("Failed to generate after all retries")
     
+    @asynccontextmanager
+    async def _concurrency_slot(self) -> AsyncIterator[Optional[float]]:
+        """
+        Hold a slot of the adaptive concurrency limiter around one API request
+        
+        Yields the limiter time the request started (None without a limiter),
+        for _record_latency(). 429/5xx responses and timeouts raised inside
+        are reported to the limiter as overload.
+        """
+        limiter = self.concurrency_limiter
+        if limiter is None:
+            yield None
+            return
+        
+        await limiter.acquire()
+        started = limiter.now()
+        try:
+            yield started
+        except httpx.HTTPStatusError as e:
+            status_code = e.response.status_code
+            if status_code == 429 or status_code >= 500:
+                limiter.record_overload(started, f"Groq returned {status_code}")
+            raise
+        except httpx.TimeoutException:
+            limiter.record_overload(started, "Groq request timed out")
+            raise
+        finally:
+            limiter.release()
+    
+    def _record_latency(self, started: Optional[float], usage: Optional[Dict[str, Any]]):
+        """Report a successful request to the concurrency limiter, per generated token"""
+        if self.concurrency_limiter is None or started is None:
+            return
+        completion_tokens = (usage or {}).get("completion_tokens")
+        cost = completion_tokens if isinstance(completion_tokens, (int, float)) else None
+        self.concurrency_limiter.record_success(started, cost=cost)
+    
+    async def generate_stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        json_mode: bool = False,
+        use_cache: bool = True
+    ) -> AsyncIterator[str]:
+        """
+        Generate text using Groq's streaming mode, yielding text as it arrives
+        
+        Takes the same arguments as generate(). Failures before the first
+        chunk are retried like generate(); once text has been yielded an
+        error is raised to the caller, since the partial output cannot be
+        taken back. A cache hit yields the whole cached text at once.
+        Identical concurrent streams (unless use_cache=False) share one API
+        call; a stream joining late first receives the text produced so far.
+        
+        Yields:
+            Text deltas, in order; their concatenation equals generate()'s result
+        """
+        messages, payload = self._build_request(prompt, system_prompt, temperature, max_tokens, json_mode)
+        payload["stream"] = True
+        
+        cache = self.cache if use_cache else None
+        cache_key = None
+        if cache:
+            # Keyed without the stream flag so streamed and non-streamed calls share entries
+            cache_key = cache.make_key({k: v for k, v in payload.items() if k != "stream"})
+            cached = await cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"[GROQ] Cache hit ({cache_key[:12]}), skipping API call")
+                yield cached
+                return
+        
+        if not use_cache:
+            stream = self._stream_uncached(messages, payload, cache, cache_key)
+        else:
+            # Keyed with the stream flag, so it never collides with generate()'s calls
+            stream = self.inflight.stream(
+                request_key(payload),
+                lambda: self._stream_uncached(messages, payload, cache, cache_key)
+            )
+        try:
+            async for delta in stream:
+                yield delta
+        finally:
+            # Close it right away when our consumer stops early, so the API call
+            # ends and its rate-limit reservation is settled
+            await stream.aclose()  # type: ignore
+    
+    async def _stream_uncached(
+        self,
+        messages: List[Dict[str, str]],
+        payload: Dict[str, Any],
+        cache: Optional[ResponseCache],
+        cache_key: Optional[str]
+    ) -> AsyncIterator[str]:
+        """Stream a completion from the API with retries, storing the result in the cache"""
+        max_tokens = payload["max_tokens"]
+        estimated_tokens = estimate_tokens(messages, max_tokens)
+        backoff = self.retry_policy.backoff()
+        
+        for attempt in range(self.MAX_RETRIES):
+            yielded = False
+            if self.breaker:
+                self.breaker.check()
+            try:
+                reserved_tokens = 0
+                if self.rate_limiter:
+                    reserved_tokens = await self.rate_limiter.acquire(estimated_tokens)
+                logger.debug(f"[GROQ] Stream attempt {attempt + 1}/{self.MAX_RETRIES} - Max tokens: {max_tokens}")
+                # Every attempt settles its reservation: a failed one is refunded,
+                # one cut short after some text (an error, or the last consumer
+                # going away) is charged for the prompt and the text so far
+                parts: List[str] = []
+                generated_chars = 0
+                used_tokens: Optional[int] = 0
+                try:
+                    # The slot is held until the stream ends, including time the
+                    # consumer spends between chunks
+                    async with self._concurrency_slot() as started, \
+                            self.client.stream("POST", "/chat/completions", json=payload) as response:
+                        if response.status_code >= 400:
+                            await response.aread()
+                            response.raise_for_status()
+                        if self.breaker:
+                            self.breaker.record_success()
+                        
+                        usage: Dict[str, Any] = {}
+                        async for line in response.aiter_lines():
+                            if not line.startswith("data:"):
+                                continue
+                            data_str = line[len("data:"):].strip()
+                            if data_str == "[DONE]":
+                                break
+                            chunk = json.loads(data_str)
+                            # Groq reports usage on the final chunk under x_groq
+                            usage = chunk.get("usage") or (chunk.get("x_groq") or {}).get("usage") or usage
+                            choices = chunk.get("choices") or []
+                            delta = (choices[0].get("delta") or {}).get("content") if choices else None
+                            if delta:
+                                parts.append(delta)
+                                yielded = True
+                                generated_chars += len(delta)
+                                used_tokens = estimated_tokens - max_tokens + generated_chars // CHARS_PER_TOKEN
+                                yield delta
+                        self._record_latency(started, usage)
+                    used_tokens = usage.get("total_tokens")
+                finally:
+                    if self.rate_limiter:
+                        self.rate_limiter.record_usage(reserved_tokens, used_tokens)
+                
+                content = "".join(parts)
+                if cache and cache_key and content:
+                    await cache.set(cache_key, content)
+                return
+            except httpx.HTTPStatusError as e:
+                status_code = e.response.status_code
+                if self.breaker:
+                    if status_code >= 500:
+                        self.breaker.record_failure()
+                    else:
+                        self.breaker.record_success()
+                retryable = status_code == 429 or status_code >= 500
+                wait_time = None
+                if retryable and not yielded and attempt < self.MAX_RETRIES - 1:
+                    wait_time = backoff.next_delay(e.response.headers)
+                if wait_time is None:
+                    logger.error(f"[GROQ] Streaming request failed ({status_code}): {e.response.text}")
+                    raise
+                logger.warning(f"[GROQ] Streaming request got {status_code}, retrying in {wait_time:.1f}s")
+                await asyncio.sleep(wait_time)
+            except (httpx.TransportError, json.JSONDecodeError) as e:
+                if self.breaker and isinstance(e, httpx.TransportError):
+                    self.breaker.record_failure()
+                wait_time = None
+                if not yielded and attempt < self.MAX_RETRIES - 1:
+                    wait_time = backoff.next_delay()
+                if wait_time is None:
+                    logger.error(f"[GROQ] Streaming request failed: {type(e).__name__}: {str(e)}", exc_info=True)
+                    raise
+                logger.warning(f"[GROQ] Streaming request error ({type(e).__name__}), retrying in {wait_time:.1f}s")
+                await asyncio.sleep(wait_time)
+        
+        raise Exception("Failed to stream after all retries")
+    
+    def open(self):
+        """Create the HTTP client up front (called on startup)"""
+        return self.client
+    
     async def close(self):
-        """Close the HTTP client"""
-        await self.client.aclose()
+        """Close the HTTP client; the next request opens a new one"""
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
 
 
 # Global instance
-groq_service = GroqService()
+groq_service = GroqService(
+    cache=build_groq_cache(),
+    rate_limiter=build_groq_rate_limiter(),
+    retry_policy=build_retry_policy(),
+    breaker=build_circuit_breaker("groq"),
+    concurrency_limiter=build_groq_concurrency_limiter()
+)
 
@@ -0,0 +1,150 @@
+from typing import Any, Dict, Mapping, Optional
+import importlib.util
+import logging
+import time
+
+import httpx
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Clients built by build_http_client, by name, for the pool gauges
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+connections_opened = metrics.counter(
+    "http_client_connections_opened_total", "TCP connections opened by the upstream API clients"
+)
+requests_sent = metrics.counter(
+    "http_client_requests_sent_total", "Requests sent by the upstream API clients"
+)
+connection_wait_seconds = metrics.counter(
+    "http_client_connection_wait_seconds_total",
+    "Time requests spent acquiring a connection (pool wait, connect, TLS)"
+)
+
+
+def http2_available() -> bool:
+    """True when HTTP/2 is enabled and the h2 package (httpx[http2]) is installed"""
+    return settings.HTTP2_ENABLED and importlib.util.find_spec("h2") is not None
+
+
+def build_limits() -> httpx.Limits:
+    """Connection pool limits from settings"""
+    return httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
+    )
+
+
+def build_timeout() -> httpx.Timeout:
+    """Split connect/read/write/pool timeouts from settings"""
+    return httpx.Timeout(
+        connect=settings.HTTP_CONNECT_TIMEOUT,
+        read=settings.HTTP_READ_TIMEOUT,
+        write=settings.HTTP_WRITE_TIMEOUT,
+        pool=settings.HTTP_POOL_TIMEOUT
+    )
+
+
+def _trace_hook(name: str):
+    """
+    Request hook that attaches an httpcore trace callback to each request
+
+    The callback counts new TCP connections (churn) and the time from
+    sending a request to writing its headers, which is spent waiting for a
+    free pooled connection plus any connect/TLS handshake.
+    """
+    async def on_request(request: httpx.Request):
+        started = time.perf_counter()
+        previous = request.extensions.get("trace")
+        requests_sent.inc(client=name)
+
+        async def trace(event_name: str, info: Mapping[str, Any]):
+            if event_name == "connection.connect_tcp.complete":
+                connections_opened.inc(client=name)
+            elif event_name in ("http11.send_request_headers.started", "http2.send_request_headers.started"):
+                connection_wait_seconds.inc(time.perf_counter() - started, client=name)
+            if previous is not None:
+                await previous(event_name, info)
+
+        request.extensions["trace"] = trace
+
+    return on_request
+
+
+def build_http_client(
+    name: str,
+    base_url: str,
+    headers: Optional[Dict[str, str]] = None
+) -> httpx.AsyncClient:
+    """
+    Create a pooled client for one upstream API
+
+    Pool limits, keep-alive expiry and timeouts come from the HTTP_* settings;
+    HTTP/2 is negotiated when enabled and h2 is installed. The client is
+    registered under name for the http_client_* metrics on /metrics.
+
+    Args:
+        name: Short label of the upstream ("groq", "tavily")
+        base_url: Base URL of the API
+        headers: Default request headers
+
+    Returns:
+        A new httpx.AsyncClient; the caller owns it and must close it
+    """
+    http2 = http2_available()
+    if settings.HTTP2_ENABLED and not http2:
+        logger.info(f"[HTTP] h2 is not installed, {name} client uses HTTP/1.1")
+    client = httpx.AsyncClient(
+        base_url=base_url,
+        headers=headers,
+        limits=build_limits(),
+        timeout=build_timeout(),
+        http2=http2,
+        event_hooks={"request": [_trace_hook(name)]}
+    )
+    _clients[name] = client
+    return client
+
+
+def _pool(client: httpx.AsyncClient):
+    # httpx does not expose its httpcore pool; read it defensively so a
+    # mock transport (tests) or a future httpx simply reports nothing
+    return getattr(getattr(client, "_transport", None), "_pool", None)
+
+
+def pool_stats(client: httpx.AsyncClient) -> Dict[str, int]:
+    """
+    Occupancy of a client's connection pool
+
+    Returns:
+        Counts of active (serving a request) and idle keep-alive connections,
+        and of requests queued waiting for a connection
+    """
+    pool = _pool(client)
+    if pool is None or client.is_closed:
+        return {"active": 0, "idle": 0, "queued": 0}
+    connections = list(pool.connections)
+    idle = sum(1 for connection in connections if connection.is_idle())
+    queued = sum(1 for request in list(pool._requests) if request.is_queued())
+    return {"active": len(connections) - idle, "idle": idle, "queued": queued}
+
+
+def _pool_connections():
+    for name, client in list(_clients.items()):
+        stats = pool_stats(client)
+        yield {"client": name, "state": "active"}, stats["active"]
+        yield {"client": name, "state": "idle"}, stats["idle"]
+
+
+metrics.gauge(
+    "http_client_pool_connections", "Pooled connections of the upstream API clients, by state",
+    lambda: _pool_connections()
+)
+metrics.gauge(
+    "http_client_pool_queued_requests", "Requests waiting for a free pooled connection",
+    lambda: [({"client": name}, pool_stats(client)["queued"]) for name, client in list(_clients.items())]
+)
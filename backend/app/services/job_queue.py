@@ -0,0 +1,252 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+from sqlalchemy import Update, and_, or_, update
+from sqlalchemy.orm import Session
+import logging
+
+from app.core.config import settings
+from app.models.analysis import Analysis, AnalysisStatus
+from app.models.analysis_job import AnalysisJob, JobStatus
+from app.services.progress_bus import notify_in_transaction
+
+logger = logging.getLogger(__name__)
+
+# Keep stored error messages readable in the jobs table
+MAX_ERROR_LENGTH = 2000
+
+
+@dataclass
+class ClaimedJob:
+    """A job leased to one worker"""
+    id: int
+    analysis_id: int
+    company_name: str
+    attempt: int
+
+
+class JobQueue:
+    """
+    Analysis job queue stored in the analysis_jobs table
+
+    Workers claim the oldest queued job with SELECT ... FOR UPDATE SKIP LOCKED,
+    so any number of worker processes can poll the same table without handing
+    out a job twice. A claimed job carries a lease that its worker renews with
+    heartbeat(); when a worker dies the lease runs out and the next claim picks
+    the job up again, until it has been attempted max_attempts times.
+
+    Every operation uses its own short session and commits immediately, except
+    enqueue(), which joins the caller's transaction so the analysis row and its
+    job are created together.
+    """
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], Session]] = None,
+        lease_seconds: Optional[float] = None,
+        max_attempts: Optional[int] = None
+    ):
+        """
+        Initialize the queue
+
+        Args:
+            session_factory: Callable returning a new Session (defaults to SessionLocal)
+            lease_seconds: Lease length granted on claim and on every heartbeat
+            max_attempts: Claims allowed per job before an expired lease fails it
+        """
+        self._session_factory = session_factory
+        self.lease_seconds = settings.WORKER_LEASE_SECONDS if lease_seconds is None else lease_seconds
+        self.max_attempts = settings.JOB_MAX_ATTEMPTS if max_attempts is None else max_attempts
+
+    def _session(self) -> Session:
+        if self._session_factory is None:
+            # Imported lazily so the queue can be imported without a database
+            from app.core.database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    @staticmethod
+    def _now() -> datetime:
+        return datetime.now(timezone.utc)
+
+    def enqueue(self, db: Session, analysis_id: int, company_name: str) -> AnalysisJob:
+        """
+        Add a job for an analysis to the caller's transaction (the caller commits)
+
+        Only adds the object, so it works with both Session and AsyncSession.
+        """
+        job = AnalysisJob(
+            analysis_id=analysis_id,
+            company_name=company_name,
+            status=JobStatus.QUEUED,
+            attempts=0,
+            max_attempts=self.max_attempts
+        )
+        db.add(job)
+        logger.info(f"[JOBS] Enqueued analysis {analysis_id} ({company_name})")
+        return job
+
+    def requeue_statement(self, analysis_id: int) -> Update:
+        """
+        UPDATE putting an analysis' finished job back in the queue
+
+        The job gets a fresh attempt budget. Queued and running jobs are left
+        alone. The caller executes it in its own transaction (a rowcount of 0
+        means there was no finished job to requeue), so it works with both
+        Session and AsyncSession.
+        """
+        return update(AnalysisJob).where(
+            AnalysisJob.analysis_id == analysis_id,
+            AnalysisJob.status.in_([JobStatus.SUCCEEDED, JobStatus.FAILED])
+        ).values(
+            status=JobStatus.QUEUED,
+            attempts=0,
+            worker_id=None,
+            heartbeat_at=None,
+            lease_expires_at=None,
+            last_error=None
+        )
+
+    def claim(self, worker_id: str) -> Optional[ClaimedJob]:
+        """
+        Lease the oldest available job to a worker
+
+        Available means queued, or running with an expired lease. Jobs whose
+        lease expired on their last allowed attempt are failed (along with
+        their analysis) instead of being handed out again.
+
+        Returns:
+            The claimed job, or None if the queue is empty
+        """
+        db = self._session()
+        try:
+            while True:
+                now = self._now()
+                job = db.query(AnalysisJob).filter(
+                    or_(
+                        AnalysisJob.status == JobStatus.QUEUED,
+                        and_(
+                            AnalysisJob.status == JobStatus.RUNNING,
+                            AnalysisJob.lease_expires_at < now
+                        )
+                    )
+                ).order_by(
+                    AnalysisJob.created_at, AnalysisJob.id
+                ).with_for_update(skip_locked=True).first()
+
+                if job is None:
+                    db.commit()
+                    return None
+
+                if job.status == JobStatus.RUNNING:
+                    logger.warning(
+                        f"[JOBS] Lease of job {job.id} (analysis {job.analysis_id}) held by {job.worker_id} expired "
+                        f"after attempt {job.attempts}/{job.max_attempts}"
+                    )
+                    if job.attempts >= job.max_attempts:
+                        self._mark_failed(db, job, f"Lease expired on attempt {job.attempts}; giving up")
+                        db.commit()
+                        continue
+
+                job.status = JobStatus.RUNNING  # type: ignore
+                job.worker_id = worker_id  # type: ignore
+                job.attempts = job.attempts + 1  # type: ignore
+                job.heartbeat_at = now  # type: ignore
+                job.lease_expires_at = now + timedelta(seconds=self.lease_seconds)  # type: ignore
+                claimed = ClaimedJob(
+                    id=job.id,  # type: ignore
+                    analysis_id=job.analysis_id,  # type: ignore
+                    company_name=job.company_name,  # type: ignore
+                    attempt=job.attempts  # type: ignore
+                )
+                db.commit()
+                logger.info(
+                    f"[JOBS] {worker_id} claimed job {claimed.id} (analysis {claimed.analysis_id}, "
+                    f"attempt {claimed.attempt})"
+                )
+                return claimed
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def heartbeat(self, job_id: int, worker_id: str) -> bool:
+        """
+        Extend a job's lease
+
+        Returns:
+            False if the worker no longer holds the job (its lease expired and
+            another worker claimed it, or the job already finished)
+        """
+        now = self._now()
+        return self._update_held(job_id, worker_id, {
+            AnalysisJob.heartbeat_at: now,
+            AnalysisJob.lease_expires_at: now + timedelta(seconds=self.lease_seconds)
+        })
+
+    def complete(self, job_id: int, worker_id: str) -> bool:
+        """Mark a held job as succeeded"""
+        return self._update_held(job_id, worker_id, {
+            AnalysisJob.status: JobStatus.SUCCEEDED,
+            AnalysisJob.lease_expires_at: None
+        })
+
+    def fail(self, job_id: int, worker_id: str, error: str) -> bool:
+        """Mark a held job as failed, keeping the error for inspection"""
+        return self._update_held(job_id, worker_id, {
+            AnalysisJob.status: JobStatus.FAILED,
+            AnalysisJob.lease_expires_at: None,
+            AnalysisJob.last_error: error[:MAX_ERROR_LENGTH]
+        })
+
+    def release(self, job_id: int, worker_id: str) -> bool:
+        """
+        Put a held job back in the queue without using up an attempt
+
+        Used by a worker shutting down mid-run, so the job is picked up again
+        right away rather than once its lease expires.
+        """
+        return self._update_held(job_id, worker_id, {
+            AnalysisJob.status: JobStatus.QUEUED,
+            AnalysisJob.attempts: AnalysisJob.attempts - 1,
+            AnalysisJob.worker_id: None,
+            AnalysisJob.heartbeat_at: None,
+            AnalysisJob.lease_expires_at: None
+        })
+
+    def _update_held(self, job_id: int, worker_id: str, values: dict) -> bool:
+        # Guarded by worker_id and status so a worker that lost its lease cannot
+        # overwrite the state written by the job's new owner
+        db = self._session()
+        try:
+            updated = db.query(AnalysisJob).filter(
+                AnalysisJob.id == job_id,
+                AnalysisJob.worker_id == worker_id,
+                AnalysisJob.status == JobStatus.RUNNING
+            ).update(values, synchronize_session=False)
+            db.commit()
+            return updated == 1
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _mark_failed(self, db: Session, job: AnalysisJob, error: str):
+        job.status = JobStatus.FAILED  # type: ignore
+        job.lease_expires_at = None  # type: ignore
+        job.last_error = error  # type: ignore
+        analysis = db.query(Analysis).filter(Analysis.id == job.analysis_id).first()
+        if analysis and analysis.status != AnalysisStatus.COMPLETED:
+            analysis.status = AnalysisStatus.FAILED  # type: ignore
+            # Open SSE streams only learn about terminal states through events
+            notify_in_transaction(db, job.analysis_id, {
+                "event": "analysis_failed",
+                "data": {"message": f"Analysis failed: {error}", "timestamp": datetime.utcnow().isoformat()}
+            })
+        logger.error(f"[JOBS] Job {job.id} (analysis {job.analysis_id}) failed: {error}")
+
+
+# Global instance
+job_queue = JobQueue()
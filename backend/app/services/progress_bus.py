@@ -0,0 +1,511 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Set
+import asyncio
+import json
+import logging
+import threading
+import time
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+MAX_NOTIFY_PAYLOAD_BYTES = 7900
+NOTIFY_CHANNEL = "analysis_progress"
+
+_event_id_lock = threading.Lock()
+_last_event_id = 0
+
+
+def next_event_id() -> int:
+    """
+    Return a new progress event id
+
+    Ids are microsecond timestamps, bumped by one when two events fall in the
+    same microsecond, so they increase strictly within a process and, with
+    clocks in sync, across the processes a job moves between. Stream clients
+    send the last id they saw to resume after a reconnect.
+    """
+    global _last_event_id
+    with _event_id_lock:
+        _last_event_id = max(_last_event_id + 1, time.time_ns() // 1000)
+        return _last_event_id
+
+
+TERMINAL_EVENTS = ("analysis_complete", "analysis_failed")
+
+
+def _merge_text_delta(older: Dict[str, Any], newer: Dict[str, Any]) -> Dict[str, Any]:
+    return {**newer, "message": (older.get("message") or "") + (newer.get("message") or "")}
+
+
+def _keep_latest(older: Dict[str, Any], newer: Dict[str, Any]) -> Dict[str, Any]:
+    return newer
+
+
+# How a slow subscriber folds an event into a queued one of the same type
+# instead of queueing it: streamed text is concatenated, status-style
+# progress messages only need the latest
+COALESCERS = {
+    "research_context_delta": _merge_text_delta,
+    "strategy_progress": _keep_latest,
+}
+
+
+def format_sse_event(event_type: str, data: Dict[str, Any], event_id: Optional[int] = None) -> str:
+    """Encode one server-sent event frame"""
+    lines = f"event: {event_type}\n"
+    if event_id is not None:
+        lines += f"id: {event_id}\n"
+    return lines + f"data: {json.dumps(data, default=str)}\n\n"
+
+
+class BroadcastEvent(dict):
+    """
+    A dispatched event, shared by every subscription it is delivered to
+
+    The SSE frame is encoded on first use and cached, so an event watched by
+    many streams is serialized once.
+    """
+
+    __slots__ = ("_frame",)
+
+    @property
+    def frame(self) -> str:
+        try:
+            return self._frame
+        except AttributeError:
+            self._frame = format_sse_event(self.get("event", "message"), self.get("data", {}), self.get("id"))
+            return self._frame
+
+
+class Subscription:
+    """
+    Events published for one analysis, as seen by one listener
+
+    Holds at most max_pending undelivered events. When a slow listener falls
+    that far behind, a new progress event is first coalesced into the newest
+    queued event if it has the same type (see COALESCERS); otherwise the oldest queued
+    non-terminal event is dropped to make room. Terminal events are never
+    dropped. The dropped count is kept for logging.
+    """
+
+    def __init__(self, analysis_id: int, max_pending: Optional[int] = None):
+        self.analysis_id = analysis_id
+        self.max_pending = max_pending or settings.PROGRESS_SUBSCRIBER_QUEUE_SIZE
+        self.dropped = 0
+        self._events: Deque[Dict[str, Any]] = deque()
+        self._ready = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """Undelivered events, oldest first"""
+        return list(self._events)
+
+    def put(self, event: Dict[str, Any]):
+        if len(self._events) >= self.max_pending and not self._make_room(event):
+            return
+        self._events.append(event)
+        self._ready.set()
+
+    def _make_room(self, event: Dict[str, Any]) -> bool:
+        """Apply the overflow policy; False when the event was folded into a queued one"""
+        coalesce = COALESCERS.get(event.get("event"))
+        # Only the newest queued event, so ids still reach the listener in order
+        if coalesce is not None and self._events[-1].get("event") == event.get("event"):
+            queued = self._events[-1]
+            self._events[-1] = BroadcastEvent(event, data=coalesce(queued.get("data") or {}, event.get("data") or {}))
+            self.dropped += 1
+            return False
+        for index, queued in enumerate(self._events):
+            if queued.get("event") not in TERMINAL_EVENTS:
+                del self._events[index]
+                self.dropped += 1
+                return True
+        return True
+
+    async def get(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Wait for the next event
+
+        Raises:
+            asyncio.TimeoutError: If no event arrives within timeout seconds
+        """
+        while not self._events:
+            self._ready.clear()
+            if timeout is None:
+                await self._ready.wait()
+            else:
+                await asyncio.wait_for(self._ready.wait(), timeout=timeout)
+        return self._events.popleft()
+
+
+class ReplayBuffer:
+    """The most recent events of one analysis, kept for reconnecting listeners"""
+
+    __slots__ = ("events", "updated_at", "finished")
+
+    def __init__(self, size: int):
+        self.events: Deque[Dict[str, Any]] = deque(maxlen=size)
+        self.updated_at = time.monotonic()
+        self.finished = False
+
+    def append(self, event: Dict[str, Any]):
+        self.events.append(event)
+        self.updated_at = time.monotonic()
+        self.finished = event.get("event") in TERMINAL_EVENTS
+
+
+class ProgressBus(ABC):
+    """
+    Publish/subscribe channel for analysis progress events
+
+    Events are dicts of the form {"id": <int>, "event": <type>, "data": {...}};
+    publishing assigns the id. Each event is wrapped once in a BroadcastEvent
+    and the same object is handed to every subscriber, so fan-out costs no
+    copies and the SSE frame is encoded once. The last replay_buffer_size events of each
+    analysis are kept (for at most replay_max_analyses analyses, least
+    recently updated dropped first) so a listener that reconnects can ask for
+    everything after the last id it received.
+
+    Buffers are also evicted by reap(): once an analysis has finished and
+    its buffer has been quiet for finished_ttl seconds, or when nothing has
+    been published for it in abandoned_ttl seconds (a pipeline that died
+    without a terminal event). run_reaper() calls it periodically.
+    """
+
+    def __init__(
+        self,
+        replay_buffer_size: Optional[int] = None,
+        replay_max_analyses: Optional[int] = None,
+        subscriber_queue_size: Optional[int] = None,
+        finished_ttl: Optional[float] = None,
+        abandoned_ttl: Optional[float] = None
+    ):
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        self.subscriber_queue_size = subscriber_queue_size or settings.PROGRESS_SUBSCRIBER_QUEUE_SIZE
+        self.replay_buffer_size = replay_buffer_size or settings.PROGRESS_REPLAY_BUFFER_SIZE
+        self.replay_max_analyses = replay_max_analyses or settings.PROGRESS_REPLAY_MAX_ANALYSES
+        self.finished_ttl = finished_ttl if finished_ttl is not None else settings.PROGRESS_FINISHED_TTL
+        self.abandoned_ttl = abandoned_ttl if abandoned_ttl is not None else settings.PROGRESS_ABANDONED_TTL
+        self._history: "OrderedDict[int, ReplayBuffer]" = OrderedDict()
+
+    @abstractmethod
+    async def publish(self, analysis_id: int, event: Dict[str, Any]):
+        """Deliver an event to the analysis's subscribers, assigning its id"""
+
+    async def subscribe(self, analysis_id: int, last_event_id: Optional[int] = None) -> Subscription:
+        """
+        Start receiving events for an analysis
+
+        Args:
+            analysis_id: Analysis to follow
+            last_event_id: Id of the last event the listener saw; buffered
+                events after it are queued on the subscription first
+
+        Returns:
+            The subscription to read events from
+        """
+        subscription = Subscription(analysis_id, self.subscriber_queue_size)
+        if last_event_id is not None:
+            for event in self.replay(analysis_id, last_event_id):
+                subscription.put(event)
+        self._subscribers.setdefault(analysis_id, set()).add(subscription)
+        return subscription
+
+    def replay(self, analysis_id: int, last_event_id: int):
+        """Buffered events of an analysis published after last_event_id, oldest first"""
+        history = self._history.get(analysis_id)
+        if history is None:
+            return []
+        return [event for event in history.events if event["id"] > last_event_id]
+
+    async def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.analysis_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.analysis_id]
+
+    def subscriber_count(self, analysis_id: Optional[int] = None) -> int:
+        if analysis_id is not None:
+            return len(self._subscribers.get(analysis_id, ()))
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def _remember(self, analysis_id: int, event: Dict[str, Any]):
+        history = self._history.get(analysis_id)
+        if history is None:
+            history = self._history[analysis_id] = ReplayBuffer(self.replay_buffer_size)
+            while len(self._history) > self.replay_max_analyses:
+                self._history.popitem(last=False)
+        else:
+            self._history.move_to_end(analysis_id)
+        history.append(event)
+
+    def reap(self, now: Optional[float] = None) -> int:
+        """
+        Evict replay buffers of finished or abandoned analyses
+
+        Args:
+            now: time.monotonic() reading to judge ages against
+
+        Returns:
+            Number of buffers evicted
+        """
+        now = time.monotonic() if now is None else now
+        expired = [
+            analysis_id for analysis_id, history in self._history.items()
+            if now - history.updated_at >= (self.finished_ttl if history.finished else self.abandoned_ttl)
+        ]
+        for analysis_id in expired:
+            del self._history[analysis_id]
+        if expired:
+            logger.debug(f"[PROGRESS BUS] Reaped {len(expired)} replay buffers")
+        return len(expired)
+
+    async def run_reaper(self, interval: Optional[float] = None):
+        """Call reap() every interval seconds until cancelled"""
+        interval = interval or settings.PROGRESS_REAP_INTERVAL
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.reap()
+            except Exception as e:
+                logger.error(f"[PROGRESS BUS] Reaper failed: {type(e).__name__}: {e}", exc_info=True)
+
+    def buffered_analyses(self) -> int:
+        return len(self._history)
+
+    def queued_events(self) -> int:
+        """Events held in replay buffers and undelivered in subscriptions"""
+        buffered = sum(len(history.events) for history in self._history.values())
+        pending = sum(len(subscription) for subscribers in self._subscribers.values() for subscription in subscribers)
+        return buffered + pending
+
+    def queued_bytes(self) -> int:
+        """Encoded size of the events counted by queued_events() (shared events counted once)"""
+        events = {id(event): event for history in self._history.values() for event in history.events}
+        for subscribers in self._subscribers.values():
+            for subscription in subscribers:
+                events.update((id(event), event) for event in subscription.pending())
+        return sum(len(event.frame) for event in events.values() if isinstance(event, BroadcastEvent))
+
+    def _dispatch(self, analysis_id: int, event: Dict[str, Any]):
+        event = BroadcastEvent(event)
+        if event.get("id") is not None:
+            self._remember(analysis_id, event)
+        for subscription in list(self._subscribers.get(analysis_id, ())):
+            subscription.put(event)
+
+    async def close(self):
+        self._subscribers.clear()
+        self._history.clear()
+
+
+class InMemoryProgressBus(ProgressBus):
+    """Progress bus for a single process (pipelines run inline in the API)"""
+
+    async def publish(self, analysis_id: int, event: Dict[str, Any]):
+        self._dispatch(analysis_id, {"id": next_event_id(), **event})
+
+
+class PostgresProgressBus(ProgressBus):
+    """
+    Progress bus over Postgres LISTEN/NOTIFY
+
+    Publishing sends NOTIFY on a single channel, with the analysis id in the
+    payload; every process with subscribers holds one LISTEN connection and
+    routes notifications to its local subscribers. This lets an SSE stream
+    served by any API worker follow a pipeline running in any other process.
+
+    Payloads over the NOTIFY size limit are sent without their extra data
+    fields (message and timestamp are kept), flagged with "truncated": True.
+
+    Event ids are assigned by the publishing process and travel in the
+    payload, so every listening process buffers the same ids and a stream
+    can resume on a different API worker than the one it started on. Only
+    events heard while a process was listening can be replayed there.
+    """
+
+    def __init__(
+        self,
+        dsn: Optional[str] = None,
+        reconnect_delay: float = 2.0,
+        **kwargs
+    ):
+        super().__init__(**kwargs)
+        self.dsn = dsn or settings.DATABASE_URL
+        self.reconnect_delay = reconnect_delay
+        self._listen_conn = None
+        self._listen_lock = asyncio.Lock()
+        self._publish_lock = asyncio.Lock()
+        self._publish_engine = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+
+    def _psycopg2_dsn(self) -> str:
+        # SQLAlchemy URLs carry a driver suffix that libpq does not understand
+        return self.dsn.replace("postgresql+psycopg2://", "postgresql://", 1)
+
+    @staticmethod
+    def encode(analysis_id: int, event: Dict[str, Any]) -> str:
+        payload = json.dumps({"analysis_id": analysis_id, **event}, default=str)
+        if len(payload.encode("utf-8")) <= MAX_NOTIFY_PAYLOAD_BYTES:
+            return payload
+        data = event.get("data") or {}
+        slim = {
+            "analysis_id": analysis_id,
+            "id": event.get("id"),
+            "event": event.get("event"),
+            "data": {
+                "message": str(data.get("message", ""))[:1000],
+                "timestamp": data.get("timestamp"),
+                "truncated": True
+            }
+        }
+        return json.dumps(slim, default=str)
+
+    def _notify(self, payload: str):
+        from sqlalchemy import text
+        if self._publish_engine is None:
+            from app.core.database import engine
+            self._publish_engine = engine
+        with self._publish_engine.connect() as conn:
+            conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": NOTIFY_CHANNEL, "payload": payload})
+            conn.commit()
+
+    async def publish(self, analysis_id: int, event: Dict[str, Any]):
+        payload = self.encode(analysis_id, {"id": next_event_id(), **event})
+        # Serialized so events from one process are notified in the order published
+        async with self._publish_lock:
+            await asyncio.to_thread(self._notify, payload)
+
+    async def subscribe(self, analysis_id: int, last_event_id: Optional[int] = None) -> Subscription:
+        await self._ensure_listening()
+        return await super().subscribe(analysis_id, last_event_id)
+
+    async def _ensure_listening(self):
+        async with self._listen_lock:
+            if self._listen_conn is not None:
+                return
+            import psycopg2
+            import psycopg2.extensions
+
+            conn = await asyncio.to_thread(psycopg2.connect, self._psycopg2_dsn())
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+            asyncio.get_running_loop().add_reader(conn.fileno(), self._on_readable)
+            self._listen_conn = conn
+            logger.info(f"[PROGRESS BUS] Listening on '{NOTIFY_CHANNEL}'")
+
+    def _on_readable(self):
+        conn = self._listen_conn
+        if conn is None:
+            return
+        try:
+            conn.poll()
+        except Exception as e:
+            logger.error(f"[PROGRESS BUS] LISTEN connection lost: {type(e).__name__}: {e}")
+            self._drop_listener()
+            if self._reconnect_task is None or self._reconnect_task.done():
+                self._reconnect_task = asyncio.get_running_loop().create_task(self._reconnect())
+            return
+        while conn.notifies:
+            notification = conn.notifies.pop(0)
+            try:
+                message = json.loads(notification.payload)
+                analysis_id = int(message.pop("analysis_id"))
+                if message.get("id") is not None:
+                    message["id"] = int(message["id"])
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning(f"[PROGRESS BUS] Ignoring malformed notification: {e}")
+                continue
+            self._dispatch(analysis_id, message)
+
+    def _drop_listener(self):
+        conn = self._listen_conn
+        self._listen_conn = None
+        if conn is None:
+            return
+        try:
+            asyncio.get_running_loop().remove_reader(conn.fileno())
+        except Exception:
+            pass
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    async def _reconnect(self):
+        while self._subscribers and self._listen_conn is None:
+            await asyncio.sleep(self.reconnect_delay)
+            try:
+                await self._ensure_listening()
+            except Exception as e:
+                logger.warning(f"[PROGRESS BUS] Reconnect failed: {type(e).__name__}: {e}")
+
+    async def close(self):
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+        self._drop_listener()
+        await super().close()
+
+
+def notify_in_transaction(db, analysis_id: int, event: Dict[str, Any]):
+    """
+    Queue a progress event on a sync session's transaction (Postgres only)
+
+    The notification is delivered when the transaction commits, so listeners
+    never hear about a state change that was rolled back. Used by code that
+    runs outside the event loop, such as the job queue. A no-op on other
+    databases, where no cross-process bus exists.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    from sqlalchemy import text
+    db.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": NOTIFY_CHANNEL, "payload": PostgresProgressBus.encode(analysis_id, {"id": next_event_id(), **event})}
+    )
+
+
+def build_progress_bus(backend: Optional[str] = None) -> ProgressBus:
+    """
+    Create the progress bus selected by PROGRESS_BUS_BACKEND
+
+    Args:
+        backend: "memory" or "postgres" (defaults to the setting)
+    """
+    backend = backend or settings.PROGRESS_BUS_BACKEND
+    if backend == "memory":
+        return InMemoryProgressBus()
+    if backend == "postgres":
+        return PostgresProgressBus()
+    raise ValueError(f"Unknown progress bus backend: {backend}")
+
+
+# Global instance
+progress_bus = build_progress_bus()
+
+metrics.gauge(
+    "progress_bus_subscriptions", "Open progress subscriptions (SSE streams) in this process",
+    lambda: progress_bus.subscriber_count()
+)
+metrics.gauge(
+    "progress_bus_buffered_analyses", "Analyses with a replay buffer in this process",
+    lambda: progress_bus.buffered_analyses()
+)
+metrics.gauge(
+    "progress_bus_queued_events", "Progress events held in replay buffers and subscriber queues",
+    lambda: progress_bus.queued_events()
+)
+metrics.gauge(
+    "progress_bus_queued_bytes", "Encoded size of the progress events held in memory",
+    lambda: progress_bus.queued_bytes()
+)
@@ -0,0 +1,393 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+from sqlalchemy import bindparam, select, update
+from abc import ABC, abstractmethod
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend(ABC):
+    """Storage interface for ResponseCache; values must be JSON-serializable"""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]:
+        """Stored value of key, or None when missing or expired"""
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: float):
+        """Store value under key for ttl seconds"""
+
+    @abstractmethod
+    async def delete(self, key: str):
+        """Remove key if present"""
+
+    @abstractmethod
+    async def clear(self):
+        """Remove every entry"""
+
+
+class MemoryCacheBackend(CacheBackend):
+    """In-process LRU cache with per-entry expiry"""
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: float):
+        self._entries[key] = (time.time() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    async def clear(self):
+        self._entries.clear()
+
+
+class DiskCacheBackend(CacheBackend):
+    """
+    On-disk cache storing one JSON file per key
+
+    Survives restarts and can be shared by processes on the same host. When
+    the directory holds more than max_entries files, the least recently
+    written ones are removed down to 90% of max_entries. The file count is
+    tracked between those sweeps (and re-synced by each sweep), so writes
+    only scan the directory once per tenth of its capacity.
+    """
+
+    def __init__(self, directory: str, max_entries: int = 10000):
+        self.directory = Path(directory)
+        self.max_entries = max(1, max_entries)
+        self._count: Optional[int] = None  # Files in the directory, counted on first write
+        self._count_lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _read(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"[CACHE] Discarding unreadable cache file {path}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+        if entry.get("expires_at", 0) <= time.time():
+            path.unlink(missing_ok=True)
+            return None
+        return entry.get("value")
+
+    def _write(self, key: str, value: Any, ttl: float):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        is_new = not path.exists()
+        # Write to a uniquely named temp file first so readers never see a
+        # partial entry and concurrent writers of one key never share a file
+        tmp = tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=path.parent, prefix=f"{key}.", suffix=".tmp", delete=False
+        )
+        try:
+            with tmp:
+                json.dump({"expires_at": time.time() + ttl, "value": value}, tmp)
+            os.replace(tmp.name, path)
+        except BaseException:
+            Path(tmp.name).unlink(missing_ok=True)
+            raise
+
+        with self._count_lock:
+            if self._count is None:
+                self._count = sum(1 for _ in self.directory.glob("*/*.json"))
+            elif is_new:
+                self._count += 1
+            if self._count > self.max_entries:
+                self._evict()
+
+    def _evict(self):
+        files = list(self.directory.glob("*/*.json"))
+        excess = len(files) - (self.max_entries - self.max_entries // 10)
+        if len(files) > self.max_entries:
+            files.sort(key=lambda p: p.stat().st_mtime)
+            for path in files[:excess]:
+                path.unlink(missing_ok=True)
+            logger.debug(f"[CACHE] Evicted {excess} cache files from {self.directory}")
+        else:
+            excess = 0
+        self._count = len(files) - excess
+
+    async def get(self, key: str) -> Optional[Any]:
+        return await asyncio.to_thread(self._read, key)
+
+    async def set(self, key: str, value: Any, ttl: float):
+        await asyncio.to_thread(self._write, key, value, ttl)
+
+    async def delete(self, key: str):
+        await asyncio.to_thread(self._path(key).unlink, True)
+
+    async def clear(self):
+        def _clear():
+            for path in self.directory.glob("*/*.json"):
+                path.unlink(missing_ok=True)
+            with self._count_lock:
+                self._count = 0
+        await asyncio.to_thread(_clear)
+
+
+class PostgresCacheBackend(CacheBackend):
+    """
+    Cache stored in the shared cache_entries table
+
+    Lets every API process and worker reuse the same entries. Reads do not
+    write: the access times they record are kept in memory. At most once
+    per sweep_interval seconds, a read or write sweeps the namespace: it
+    saves those access times in one batched UPDATE, deletes expired rows
+    and, once more than max_entries rows remain, the least recently used
+    ones. Between sweeps the table may exceed max_entries, and expired rows
+    are skipped by reads but stay until the next sweep.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        max_entries: int = 10000,
+        session_factory: Optional[Callable[[], Any]] = None,
+        sweep_interval: float = 60.0
+    ):
+        self.namespace = namespace
+        self.max_entries = max(1, max_entries)
+        self.sweep_interval = sweep_interval
+        self._session_factory = session_factory
+        self._last_sweep: Optional[float] = None
+        self._touched: Dict[str, datetime] = {}  # key -> last read, not yet written
+        self._lock = threading.Lock()
+
+    def _session(self):
+        if self._session_factory is None:
+            # Imported lazily so services can be imported without a database
+            from app.core.database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    def _read(self, key: str) -> Optional[Any]:
+        from app.models.cache_entry import CacheEntry
+        now = datetime.now(timezone.utc)
+        db = self._session()
+        try:
+            row = db.query(CacheEntry.value, CacheEntry.expires_at).filter(
+                CacheEntry.namespace == self.namespace,
+                CacheEntry.key == key
+            ).first()
+        finally:
+            db.close()
+        if row is None:
+            return None
+        expires_at = row.expires_at
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        if expires_at <= now:
+            return None
+        with self._lock:
+            self._touched[key] = now
+        self._maybe_sweep()
+        return row.value
+
+    def _write(self, key: str, value: Any, ttl: float):
+        from app.models.cache_entry import CacheEntry
+        now = datetime.now(timezone.utc)
+        db = self._session()
+        try:
+            if db.get_bind().dialect.name == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            values = {
+                "namespace": self.namespace,
+                "key": key,
+                "value": value,
+                "expires_at": now + timedelta(seconds=ttl),
+                "created_at": now,
+                "last_accessed_at": now
+            }
+            stmt = insert(CacheEntry).values(**values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["namespace", "key"],
+                set_={k: values[k] for k in ("value", "expires_at", "created_at", "last_accessed_at")}
+            )
+            db.execute(stmt)
+            db.commit()
+        finally:
+            db.close()
+        with self._lock:
+            self._touched.pop(key, None)
+        self._maybe_sweep()
+
+    def _maybe_sweep(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._last_sweep is not None and now - self._last_sweep < self.sweep_interval:
+                return
+            self._last_sweep = now
+            touched, self._touched = self._touched, {}
+        db = self._session()
+        try:
+            self._sweep(db, touched)
+            db.commit()
+        except Exception as e:
+            # The read or write that triggered the sweep has already succeeded
+            logger.warning(f"[CACHE {self.namespace}] Sweep failed: {type(e).__name__}: {e}")
+        finally:
+            db.close()
+
+    def _sweep(self, db, touched: Dict[str, datetime]):
+        from app.models.cache_entry import CacheEntry
+        now = datetime.now(timezone.utc)
+        if touched:
+            table = CacheEntry.__table__
+            # One batched UPDATE; never moves an access time backwards
+            db.execute(
+                update(table).where(
+                    table.c.namespace == self.namespace,
+                    table.c.key == bindparam("touched_key"),
+                    table.c.last_accessed_at < bindparam("touched_at")
+                ).values(last_accessed_at=bindparam("touched_at")),
+                [{"touched_key": key, "touched_at": at} for key, at in touched.items()]
+            )
+        namespace_rows = db.query(CacheEntry).filter(CacheEntry.namespace == self.namespace)
+        namespace_rows.filter(CacheEntry.expires_at <= now).delete(synchronize_session=False)
+        excess = namespace_rows.count() - self.max_entries
+        if excess > 0:
+            oldest = select(CacheEntry.key).where(
+                CacheEntry.namespace == self.namespace
+            ).order_by(CacheEntry.last_accessed_at).limit(excess)
+            namespace_rows.filter(CacheEntry.key.in_(oldest)).delete(synchronize_session=False)
+            logger.debug(f"[CACHE {self.namespace}] Evicted {excess} least recently used entries")
+
+    def _delete(self, key: Optional[str]):
+        from app.models.cache_entry import CacheEntry
+        db = self._session()
+        try:
+            query = db.query(CacheEntry).filter(CacheEntry.namespace == self.namespace)
+            if key is not None:
+                query = query.filter(CacheEntry.key == key)
+            query.delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    async def get(self, key: str) -> Optional[Any]:
+        return await asyncio.to_thread(self._read, key)
+
+    async def set(self, key: str, value: Any, ttl: float):
+        await asyncio.to_thread(self._write, key, value, ttl)
+
+    async def delete(self, key: str):
+        await asyncio.to_thread(self._delete, key)
+
+    async def clear(self):
+        await asyncio.to_thread(self._delete, None)
+
+
+class ResponseCache:
+    """
+    Content-addressed cache for upstream API responses
+
+    Keys are SHA-256 hashes of the canonical JSON form of the request, so any
+    change to the request (prompt, model, sampling parameters...) is a miss.
+    Backend errors are logged and treated as misses; the cache never fails
+    the call it sits in front of.
+    """
+
+    def __init__(self, backend: CacheBackend, namespace: str, ttl: float):
+        self.backend = backend
+        self.namespace = namespace
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, request: Dict[str, Any]) -> str:
+        canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(f"{self.namespace}:{canonical}".encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[Any]:
+        try:
+            value = await self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"[CACHE {self.namespace}] Lookup failed, treating as miss: {type(e).__name__}: {e}")
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        try:
+            await self.backend.set(key, value, self.ttl if ttl is None else ttl)
+        except Exception as e:
+            logger.warning(f"[CACHE {self.namespace}] Store failed: {type(e).__name__}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "namespace": self.namespace,
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0
+        }
+
+
+def build_cache_backend(
+    backend: str,
+    max_entries: int,
+    directory: Optional[str] = None,
+    namespace: Optional[str] = None
+) -> CacheBackend:
+    """
+    Create a cache backend by name
+
+    Args:
+        backend: "memory", "disk" or "postgres"
+        max_entries: Maximum number of entries before eviction
+        directory: Cache directory (disk backend only)
+        namespace: Row namespace in the cache_entries table (postgres backend only)
+    """
+    if backend == "memory":
+        return MemoryCacheBackend(max_entries=max_entries)
+    if backend == "disk":
+        if not directory:
+            raise ValueError("The disk cache backend requires a directory")
+        return DiskCacheBackend(directory, max_entries=max_entries)
+    if backend == "postgres":
+        if not namespace:
+            raise ValueError("The postgres cache backend requires a namespace")
+        return PostgresCacheBackend(namespace, max_entries=max_entries)
+    raise ValueError(f"Unknown cache backend: {backend}")
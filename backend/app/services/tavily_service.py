@@ -2,33 +2,77 @@ import httpx
 import asyncio
 from typing import List, Dict, Any, Optional
 from app.core.config import settings
+from app.core.retry import CircuitBreaker, RetryPolicy, build_circuit_breaker, build_retry_policy
+from app.core.singleflight import SingleFlight, request_key
+from app.services.http_clients import build_http_client
+from app.services.response_cache import ResponseCache, build_cache_backend
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def normalize_query(query: str) -> str:
+    """Fold case and collapse whitespace so trivially different queries share a cache entry"""
+    return " ".join(query.split()).casefold()
+
+
+def build_tavily_cache() -> Optional[ResponseCache]:
+    """Create the Tavily search cache from settings (None when disabled)"""
+    if not settings.TAVILY_CACHE_ENABLED:
+        return None
+    backend = build_cache_backend(
+        settings.TAVILY_CACHE_BACKEND,
+        max_entries=settings.TAVILY_CACHE_MAX_ENTRIES,
+        namespace="tavily"
+    )
+    logger.info(f"[TAVILY] Search cache enabled ({settings.TAVILY_CACHE_BACKEND}, TTL {settings.TAVILY_CACHE_TTL}s)")
+    return ResponseCache(backend, namespace="tavily", ttl=settings.TAVILY_CACHE_TTL)
+
+
 class TavilyService:
     """Service for interacting with Tavily Search API"""
     
     BASE_URL = "https://api.tavily.com"
     MAX_RETRIES = 3
-    RETRY_DELAY = 1  # seconds
+    RETRY_DELAY = 1  # seconds - base delay when no retry policy is given
     
-    def __init__(self):
+    def __init__(
+        self,
+        cache: Optional[ResponseCache] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        breaker: Optional[CircuitBreaker] = None
+    ):
         self.api_key = settings.TAVILY_API_KEY
-        self.client = httpx.AsyncClient(
-            base_url=self.BASE_URL,
-            headers={
-                "Content-Type": "application/json"
-            },
-            timeout=60.0  # Increase timeout to 60 seconds
-        )
+        self.cache = cache
+        self.retry_policy = retry_policy or RetryPolicy(base_delay=self.RETRY_DELAY)
+        self.breaker = breaker
+        # Identical concurrent searches share one API call
+        self.inflight = SingleFlight("tavily")
+        self._client: Optional[httpx.AsyncClient] = None
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The pooled HTTP client, created on first use (or after close())"""
+        if self._client is None or self._client.is_closed:
+            self._client = build_http_client(
+                "tavily",
+                self.BASE_URL,
+                headers={
+                    "Content-Type": "application/json"
+                }
+            )
+        return self._client
+    
+    @client.setter
+    def client(self, client: httpx.AsyncClient):
+        self._client = client
     
     async def search(
         self,
         query: str,
         max_results: int = 5,
-        search_depth: str = "advanced"
+        search_depth: str = "advanced",
+        use_cache: bool = True
     ) -> List[Dict[str, Any]]:
         """
         Search the web using Tavily API
@@ -37,6 +81,8 @@ class TavilyService:
             query: Search query
             max_results: Maximum number of results to return
             search_depth: "basic" or "advanced"
+            use_cache: If False, skip the search cache for this call, and do not
+                share the call with concurrent identical searches
             
         Returns:
             List of search results with title, url, content, score
@@ -48,50 +94,100 @@ class TavilyService:
             "search_depth": search_depth
         }
         
+        request = {
+            "query": normalize_query(query),
+            "max_results": max_results,
+            "search_depth": search_depth
+        }
+        cache = self.cache if use_cache else None
+        cache_key = None
+        if cache:
+            cache_key = cache.make_key(request)
+            cached = await cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"[TAVILY] Cache hit for query: {query}")
+                return cached
+        
+        if not use_cache:
+            return await self._search_uncached(payload, cache, cache_key)
+        return await self.inflight.do(
+            request_key(request),
+            lambda: self._search_uncached(payload, cache, cache_key)
+        )
+    
+    async def _search_uncached(
+        self,
+        payload: Dict[str, Any],
+        cache: Optional[ResponseCache],
+        cache_key: Optional[str]
+    ) -> List[Dict[str, Any]]:
+        """Call the API with retries, storing non-empty results in the cache"""
+        backoff = self.retry_policy.backoff()
         for attempt in range(self.MAX_RETRIES):
+            if self.breaker:
+                self.breaker.check()
+            last_attempt = attempt == self.MAX_RETRIES - 1
             try:
                 response = await self.client.post("/search", json=payload)
                 response.raise_for_status()
+                if self.breaker:
+                    self.breaker.record_success()
                 data = response.json()
-                return data.get("results", [])
+                results = data.get("results", [])
+                # Empty result sets are not cached so a transient gap can be retried
+                if cache and cache_key and results:
+                    await cache.set(cache_key, results)
+                return results
             except httpx.HTTPStatusError as e:
-                if e.response.status_code == 429:  # Rate limit
-                    logger.warning(f"Tavily rate limited, attempt {attempt + 1}/{self.MAX_RETRIES}")
-                    if attempt < self.MAX_RETRIES - 1:
-                        await asyncio.sleep(self.RETRY_DELAY * (2 ** attempt))
-                        continue
-                elif e.response.status_code >= 500:  # Server error
-                    if attempt < self.MAX_RETRIES - 1:
-                        logger.warning(f"Tavily server error, retrying in {self.RETRY_DELAY * (2 ** attempt)}s")
-                        await asyncio.sleep(self.RETRY_DELAY * (2 ** attempt))
+                status_code = e.response.status_code
+                if self.breaker:
+                    if status_code >= 500:
+                        self.breaker.record_failure()
+                    else:
+                        self.breaker.record_success()
+                if status_code == 429 or status_code >= 500:
+                    wait_time = None if last_attempt else backoff.next_delay(e.response.headers)
+                    if wait_time is not None:
+                        reason = "rate limited" if status_code == 429 else "server error"
+                        logger.warning(f"Tavily {reason}, retrying in {wait_time:.1f}s (attempt {attempt + 2}/{self.MAX_RETRIES})")
+                        await asyncio.sleep(wait_time)
                         continue
-                logger.error(f"Tavily API error: {e.response.status_code} - {e.response.text}")
+                logger.error(f"Tavily API error: {status_code} - {e.response.text}")
                 raise
             except asyncio.CancelledError as e:
                 logger.error(f"Tavily API request cancelled (timeout?): {e}", exc_info=True)
                 raise
-            except httpx.TimeoutException as e:
-                logger.error(f"Tavily API timeout after {self.client.timeout}s: {e}", exc_info=True)
-                if attempt < self.MAX_RETRIES - 1:
-                    logger.info(f"Retrying Tavily search (attempt {attempt + 2}/{self.MAX_RETRIES})")
-                    await asyncio.sleep(self.RETRY_DELAY * (2 ** attempt))
-                    continue
-                raise
             except Exception as e:
-                logger.error(f"Error calling Tavily API: {type(e).__name__}: {str(e)}", exc_info=True)
-                if attempt < self.MAX_RETRIES - 1:
-                    logger.info(f"Retrying Tavily search (attempt {attempt + 2}/{self.MAX_RETRIES})")
-                    await asyncio.sleep(self.RETRY_DELAY * (2 ** attempt))
+                if isinstance(e, httpx.TimeoutException):
+                    logger.error(f"Tavily API timeout ({type(e).__name__}): {e}", exc_info=True)
+                else:
+                    logger.error(f"Error calling Tavily API: {type(e).__name__}: {str(e)}", exc_info=True)
+                if self.breaker and isinstance(e, httpx.TransportError):
+                    self.breaker.record_failure()
+                wait_time = None if last_attempt else backoff.next_delay()
+                if wait_time is not None:
+                    logger.info(f"Retrying Tavily search in {wait_time:.1f}s (attempt {attempt + 2}/{self.MAX_RETRIES})")
+                    await asyncio.sleep(wait_time)
                     continue
                 raise
         
         raise Exception("Failed to search after all retries")
     
+    def open(self):
+        """Create the HTTP client up front (called on startup)"""
+        return self.client
+    
     async def close(self):
-        """Close the HTTP client"""
-        await self.client.aclose()
+        """Close the HTTP client; the next request opens a new one"""
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
 
 
 # Global instance
-tavily_service = TavilyService()
+tavily_service = TavilyService(
+    cache=build_tavily_cache(),
+    retry_policy=build_retry_policy(),
+    breaker=build_circuit_breaker("tavily")
+)
 
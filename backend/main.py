@@ -1,11 +1,15 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.core.config import settings
+from app.core.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, metrics
 # Import analyses lazily to avoid dependency issues at startup
 # analyses will be imported when needed
 import logging
 import logging.handlers
 from pathlib import Path
+import asyncio
 import time
 
 # Set up logging configuration
@@ -50,10 +54,37 @@ except Exception as e:
     logger.error(f"Database connection failed: {str(e)}", exc_info=True)
     logger.warning("Application will continue, but database operations may fail")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background housekeeping with the app and release shared resources on shutdown"""
+    from app.services.progress_bus import progress_bus
+    from app.services.groq_service import groq_service
+    from app.services.tavily_service import tavily_service
+    groq_service.open()
+    tavily_service.open()
+    reaper = asyncio.create_task(progress_bus.run_reaper())
+    logger.info("[LIFESPAN] HTTP clients opened, progress bus reaper started")
+    try:
+        yield
+    finally:
+        reaper.cancel()
+        try:
+            await reaper
+        except asyncio.CancelledError:
+            pass
+        await progress_bus.close()
+        await groq_service.close()
+        await tavily_service.close()
+        from app.agents.checkpointing import close_checkpointer
+        await close_checkpointer()
+        logger.info("[LIFESPAN] Shutdown complete")
+
+
 app = FastAPI(
     title="Strategic Futures AI API",
     description="API for strategic futures analysis using LangGraph and AI agents",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -63,6 +94,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # History pagination cursor
 )
 
 # Request error logging middleware (only logs errors, not every request)
@@ -111,6 +143,12 @@ async def health():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Process gauges in the Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -2,8 +2,9 @@ import pytest
 import asyncio
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from fastapi.testclient import TestClient
-from app.core.database import Base, get_db
+from app.core.database import Base, get_db, get_async_db, to_async_url
 from app.main import app
 from app.core.config import settings
 import os
@@ -41,7 +42,16 @@ def client(db_session):
         finally:
             pass
     
+    # The analyses routes use the async session; point it at the same test database
+    async_engine = create_async_engine(to_async_url(TEST_DATABASE_URL))
+    TestingAsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+    
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as session:
+            yield session
+    
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
@@ -0,0 +1,634 @@
+"""
+Unit tests for the analyses routes on the async database layer
+"""
+import pytest
+import asyncio
+import httpx
+import json
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from fastapi import FastAPI, HTTPException
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from unittest.mock import AsyncMock, patch
+
+from app.api.routes import analyses
+from app.core.database import Base, get_async_db, to_async_url
+from app.models.analysis import Analysis, AnalysisStatus
+from app.models.analysis_job import AnalysisJob, JobStatus
+from app.models.scenario import Scenario
+from app.models.strategy import Strategy
+from app.services.analysis_worker import AnalysisWorker
+from app.services.job_queue import ClaimedJob
+from app.services.progress_bus import InMemoryProgressBus
+
+
+@pytest.fixture
+async def engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'routes.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine):
+    return async_sessionmaker(engine, expire_on_commit=False)
+
+
+@contextmanager
+def count_statements(engine):
+    """Collect the SQL statements executed on an engine"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.fixture
+async def client(session_factory):
+    app = FastAPI()
+    app.include_router(analyses.router)
+
+    async def override_get_async_db():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as test_client:
+        yield test_client
+
+
+async def _seed_analysis(
+    session_factory, company_name="Acme", scenarios=2, strategies=2, status=AnalysisStatus.COMPLETED
+):
+    async with session_factory() as db:
+        analysis = Analysis(company_name=company_name, status=status, company_context="Context")
+        db.add(analysis)
+        await db.flush()
+        for number in range(1, scenarios + 1):
+            scenario = Scenario(
+                analysis_id=analysis.id, scenario_number=number,
+                title=f"Scenario {number}", description="Description"
+            )
+            db.add(scenario)
+            await db.flush()
+            for index in range(strategies):
+                db.add(Strategy(scenario_id=scenario.id, name=f"Strategy {number}.{index}", description="Do it"))
+        await db.commit()
+        return analysis.id
+
+
+@pytest.mark.unit
+class TestDatabaseUrls:
+    """Test cases for to_async_url"""
+
+    def test_maps_sync_drivers_to_async_drivers(self):
+        """Test that sync URLs are rewritten to their async drivers"""
+        assert to_async_url("postgresql://u:p@db:5432/app") == "postgresql+asyncpg://u:p@db:5432/app"
+        assert to_async_url("postgresql+psycopg2://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+        assert to_async_url("sqlite:///./test.db") == "sqlite+aiosqlite:///./test.db"
+        assert to_async_url("postgresql+asyncpg://u@db/app") == "postgresql+asyncpg://u@db/app"
+
+
+@pytest.mark.unit
+class TestAnalysesRoutes:
+    """Test cases for the analyses routes"""
+
+    @pytest.mark.asyncio
+    async def test_create_analysis_starts_task(self, client, session_factory):
+        """Test that creating an analysis stores it and starts the pipeline task"""
+        with patch.object(analyses, "run_analysis_task", new=AsyncMock()) as mock_task:
+            response = await client.post("/api/analyses", json={"company_name": "Acme"})
+
+        assert response.status_code == 201
+        body = response.json()
+        assert body["company_name"] == "Acme"
+        assert body["status"] == "pending"
+        mock_task.assert_awaited_once_with(body["id"], "Acme")
+        async with session_factory() as db:
+            assert (await db.get(Analysis, body["id"])) is not None
+
+    @pytest.mark.asyncio
+    async def test_list_and_get_analysis(self, client, session_factory):
+        """Test listing analyses and reading one with its scenarios and strategies"""
+        analysis_id = await _seed_analysis(session_factory)
+
+        listing = await client.get("/api/analyses")
+        detail = await client.get(f"/api/analyses/{analysis_id}")
+
+        assert listing.status_code == 200
+        assert [item["id"] for item in listing.json()] == [analysis_id]
+        assert detail.status_code == 200
+        body = detail.json()
+        assert [s["title"] for s in body["scenarios"]] == ["Scenario 1", "Scenario 2"]
+        assert [s["name"] for s in body["strategies"]["Scenario 2"]] == ["Strategy 2.0", "Strategy 2.1"]
+
+    @pytest.mark.asyncio
+    async def test_get_analysis_runs_one_statement(self, client, session_factory, engine):
+        """Test that the detail endpoint does not issue a query per scenario"""
+        # Not completed, so there is no snapshot and the eager-loaded query runs
+        small_id = await _seed_analysis(
+            session_factory, "Small", scenarios=1, strategies=1, status=AnalysisStatus.PROCESSING
+        )
+        large_id = await _seed_analysis(
+            session_factory, "Large", scenarios=4, strategies=5, status=AnalysisStatus.PROCESSING
+        )
+
+        with count_statements(engine) as small_statements:
+            small = await client.get(f"/api/analyses/{small_id}")
+        with count_statements(engine) as large_statements:
+            large = await client.get(f"/api/analyses/{large_id}")
+
+        assert small.status_code == large.status_code == 200
+        assert len(large.json()["scenarios"]) == 4
+        assert sum(len(items) for items in large.json()["strategies"].values()) == 20
+        selects = [s for s in large_statements if s.lstrip().upper().startswith("SELECT")]
+        # Snapshot lookup by primary key, then the single eager-loaded query
+        assert len(selects) == 2
+        assert len(large_statements) == len(small_statements)
+
+    @pytest.mark.asyncio
+    async def test_completed_analysis_served_from_snapshot(self, client, session_factory, engine):
+        """Test that completed analyses are served from a stored snapshot with an ETag"""
+        analysis_id = await _seed_analysis(session_factory, scenarios=3, strategies=2)
+
+        first = await client.get(f"/api/analyses/{analysis_id}")
+        with count_statements(engine) as statements:
+            repeat = await client.get(f"/api/analyses/{analysis_id}")
+        not_modified = await client.get(
+            f"/api/analyses/{analysis_id}", headers={"If-None-Match": first.headers["ETag"]}
+        )
+
+        assert first.status_code == repeat.status_code == 200
+        assert first.headers["ETag"].startswith('"') and first.headers["ETag"] == repeat.headers["ETag"]
+        assert "immutable" in first.headers["Cache-Control"]
+        assert repeat.content == first.content
+        assert [s["title"] for s in repeat.json()["scenarios"]] == ["Scenario 1", "Scenario 2", "Scenario 3"]
+        # Repeat views are a single primary-key lookup
+        assert len(statements) == 1
+        assert not_modified.status_code == 304
+        assert not_modified.content == b""
+
+    @pytest.mark.asyncio
+    async def test_snapshot_matches_live_payload(self, client, session_factory):
+        """Test that the snapshot has the same content as the live response"""
+        analysis_id = await _seed_analysis(session_factory, status=AnalysisStatus.PROCESSING)
+        live = (await client.get(f"/api/analyses/{analysis_id}")).json()
+
+        async with session_factory() as db:
+            analysis = await db.get(Analysis, analysis_id)
+            analysis.status = AnalysisStatus.COMPLETED
+            await db.commit()
+        async with session_factory() as db:
+            snapshot, etag = await analyses.store_analysis_snapshot(db, analysis_id)
+
+        stored = json.loads(snapshot)
+        live["status"] = "completed"
+        assert {k: v for k, v in stored.items() if not k.endswith("_at")} == \
+            {k: v for k, v in live.items() if not k.endswith("_at")}
+        assert stored["scenarios"] == live["scenarios"]
+
+    @pytest.mark.asyncio
+    async def test_list_paginates_with_cursor(self, client, session_factory, engine):
+        """Test keyset pagination, including rows that share a created_at"""
+        created_at = datetime(2026, 1, 1, 12, 0, 0)
+        async with session_factory() as db:
+            for index in range(5):
+                db.add(Analysis(
+                    company_name=f"Company {index}",
+                    status=AnalysisStatus.COMPLETED,
+                    company_context="x" * 5000,
+                    # Two pairs of rows share a timestamp; ties are broken by id
+                    created_at=created_at + timedelta(minutes=index // 2),
+                    updated_at=created_at
+                ))
+            await db.commit()
+
+        seen = []
+        cursor = None
+        with count_statements(engine) as statements:
+            for _ in range(5):
+                params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+                response = await client.get("/api/analyses", params=params)
+                assert response.status_code == 200
+                assert all("company_context" not in item for item in response.json())
+                seen.extend(item["company_name"] for item in response.json())
+                cursor = response.headers.get("X-Next-Cursor")
+                if cursor is None:
+                    break
+
+        assert seen == [f"Company {index}" for index in (4, 3, 2, 1, 0)]
+        assert not any("company_context" in statement for statement in statements)
+
+    @pytest.mark.asyncio
+    async def test_list_filters_and_rejects_bad_cursor(self, client, session_factory):
+        """Test status and company filters and cursor validation"""
+        async with session_factory() as db:
+            db.add_all([
+                Analysis(company_name="Acme Corp", status=AnalysisStatus.COMPLETED),
+                Analysis(company_name="Acme Labs", status=AnalysisStatus.FAILED),
+                Analysis(company_name="Globex", status=AnalysisStatus.COMPLETED),
+                Analysis(company_name="100% Pure_Co", status=AnalysisStatus.COMPLETED)
+            ])
+            await db.commit()
+
+        completed = await client.get("/api/analyses", params={"status": "completed"})
+        acme = await client.get("/api/analyses", params={"company": "acme"})
+        both = await client.get("/api/analyses", params={"company": "ACME", "status": "failed"})
+        # LIKE wildcards in the filter match literally
+        percent = await client.get("/api/analyses", params={"company": "%"})
+        underscore = await client.get("/api/analyses", params={"company": "me_c"})
+
+        assert sorted(item["company_name"] for item in completed.json()) == ["100% Pure_Co", "Acme Corp", "Globex"]
+        assert sorted(item["company_name"] for item in acme.json()) == ["Acme Corp", "Acme Labs"]
+        assert [item["company_name"] for item in both.json()] == ["Acme Labs"]
+        assert [item["company_name"] for item in percent.json()] == ["100% Pure_Co"]
+        assert underscore.json() == []
+        assert (await client.get("/api/analyses", params={"cursor": "garbage"})).status_code == 400
+        assert (await client.get("/api/analyses", params={"limit": 1000})).status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_resume_failed_analysis(self, client, session_factory):
+        """Test that only failed analyses resume, continuing from their checkpoint"""
+        failed_id = await _seed_analysis(session_factory, status=AnalysisStatus.FAILED)
+        completed_id = await _seed_analysis(session_factory)
+        with patch.object(analyses, "run_analysis_task", new=AsyncMock()) as mock_task:
+            response = await client.post(f"/api/analyses/{failed_id}/resume")
+            conflict = await client.post(f"/api/analyses/{completed_id}/resume")
+            missing = await client.post("/api/analyses/999/resume")
+
+        assert response.status_code == 202
+        assert response.json()["status"] == "pending"
+        mock_task.assert_awaited_once_with(failed_id, "Acme", resume=True)
+        assert conflict.status_code == 409
+        assert missing.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_concurrent_resume_starts_one_pipeline(self, session_factory):
+        """Test a resume that read FAILED after another resume claimed the analysis gets 409"""
+        analysis_id = await _seed_analysis(session_factory, status=AnalysisStatus.FAILED)
+        with patch.object(analyses, "run_analysis_task", new=AsyncMock()) as mock_task:
+            async with session_factory() as stale, session_factory() as winner:
+                # The loser has already read the analysis as FAILED
+                assert (await stale.get(Analysis, analysis_id)).status == AnalysisStatus.FAILED
+                await analyses.resume_analysis(analysis_id, db=winner)
+                with pytest.raises(HTTPException) as conflict:
+                    await analyses.resume_analysis(analysis_id, db=stale)
+            await asyncio.sleep(0)
+
+        assert conflict.value.status_code == 409
+        mock_task.assert_awaited_once_with(analysis_id, "Acme", resume=True)
+
+    @pytest.mark.asyncio
+    async def test_resume_requeues_job_in_queue_mode(self, client, session_factory):
+        """Test that resuming in queue mode puts the failed job back with a fresh attempt budget"""
+        analysis_id = await _seed_analysis(session_factory, status=AnalysisStatus.FAILED)
+        async with session_factory() as db:
+            db.add(AnalysisJob(
+                analysis_id=analysis_id, company_name="Acme", status=JobStatus.FAILED,
+                attempts=3, max_attempts=3, worker_id="w1", last_error="boom"
+            ))
+            await db.commit()
+
+        with patch.object(analyses.settings, "ANALYSIS_EXECUTION_MODE", "queue"):
+            response = await client.post(f"/api/analyses/{analysis_id}/resume")
+            again = await client.post(f"/api/analyses/{analysis_id}/resume")
+
+        assert response.status_code == 202
+        assert again.status_code == 409
+        async with session_factory() as db:
+            job = (await db.execute(select(AnalysisJob))).scalar_one()
+            assert (job.status, job.attempts, job.worker_id, job.last_error) == (JobStatus.QUEUED, 0, None, None)
+
+    @pytest.mark.asyncio
+    async def test_missing_analysis_returns_404(self, client):
+        """Test that unknown analysis ids return 404"""
+        assert (await client.get("/api/analyses/999")).status_code == 404
+        assert (await client.get("/api/analyses/999/status")).status_code == 404
+
+
+class FakePipeline:
+    """Stands in for AnalysisPipeline; run() waits until the test lets it finish"""
+
+    def __init__(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.running = asyncio.Event()
+        self.release = asyncio.Event()
+
+    def __call__(self, progress_callback=None, checkpointer=None):
+        return self
+
+    async def run(self, company_name, thread_id=None):
+        self.running.set()
+        await self.release.wait()
+        if self.error:
+            raise self.error
+        return self.result
+
+    async def resume(self, company_name, thread_id=None):
+        return await self.run(company_name, thread_id)
+
+    async def discard_checkpoints(self, thread_id):
+        pass
+
+
+@pytest.mark.unit
+class TestRunAnalysisTask:
+    """Test cases for the background analysis task"""
+
+    @contextmanager
+    def _track_checkouts(self, engine):
+        checked_out = {"now": 0}
+
+        def on_checkout(*args):
+            checked_out["now"] += 1
+
+        def on_checkin(*args):
+            checked_out["now"] -= 1
+
+        event.listen(engine.sync_engine, "checkout", on_checkout)
+        event.listen(engine.sync_engine, "checkin", on_checkin)
+        try:
+            yield checked_out
+        finally:
+            event.remove(engine.sync_engine, "checkout", on_checkout)
+            event.remove(engine.sync_engine, "checkin", on_checkin)
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("fails", [False, True])
+    async def test_no_connection_held_while_pipeline_runs(self, session_factory, engine, fails):
+        """Test that the pipeline runs without a checked-out connection, then results or failure are saved"""
+        analysis_id = await _seed_analysis(session_factory, scenarios=0, status=AnalysisStatus.PENDING)
+        result = {
+            "company_context": "Fresh context",
+            "search_results": {"Question?": [{"title": "Result"}]},
+            "scenarios": [{"scenario_number": 1, "title": "Scenario 1", "description": "D"}],
+            "strategies": {"Scenario 1": [{"name": "Strategy", "description": "Do it"}]}
+        }
+        pipeline = FakePipeline(result=result, error=RuntimeError("Groq down") if fails else None)
+
+        with self._track_checkouts(engine) as checked_out, \
+                patch.object(analyses, "AsyncSessionLocal", session_factory), \
+                patch.object(analyses, "progress_bus", InMemoryProgressBus()), \
+                patch("app.agents.pipeline.AnalysisPipeline", pipeline), \
+                patch("app.agents.checkpointing.get_checkpointer", new=AsyncMock(return_value=None)):
+            task = asyncio.create_task(analyses.run_analysis_task(analysis_id, "Acme"))
+            await asyncio.wait_for(pipeline.running.wait(), timeout=5)
+            async with session_factory() as db:
+                assert (await db.get(Analysis, analysis_id)).status == AnalysisStatus.PROCESSING
+            held_while_running = checked_out["now"]
+            pipeline.release.set()
+            if fails:
+                with pytest.raises(RuntimeError):
+                    await task
+            else:
+                await task
+
+        assert held_while_running == 0
+        assert checked_out["now"] == 0
+        async with session_factory() as db:
+            analysis = await db.get(Analysis, analysis_id)
+            scenarios = (await db.execute(select(Scenario))).scalars().all()
+        if fails:
+            assert analysis.status == AnalysisStatus.FAILED
+            assert scenarios == []
+        else:
+            assert analysis.status == AnalysisStatus.COMPLETED
+            assert analysis.company_context == "Fresh context"
+            assert [scenario.title for scenario in scenarios] == ["Scenario 1"]
+            assert analysis.result_etag is not None
+
+    @pytest.mark.asyncio
+    async def test_completion_published_once_after_save(self, session_factory):
+        """Test that a real pipeline run publishes a single analysis_complete, after the results are stored"""
+        analysis_id = await _seed_analysis(session_factory, scenarios=0, status=AnalysisStatus.PENDING)
+        completions = []
+
+        class RecordingBus(InMemoryProgressBus):
+            async def publish(self, analysis_id, event):
+                if event["event"] == "analysis_complete":
+                    async with session_factory() as db:
+                        completions.append((await db.get(Analysis, analysis_id)).status)
+                await super().publish(analysis_id, event)
+
+        research_result = {
+            "research_questions": ["Question?"],
+            "search_results": {"Question?": [{"title": "Result"}]},
+            "company_context": "Context"
+        }
+        scenarios = [{"scenario_number": 1, "title": "Scenario 1", "description": "D", "likelihood": 0.25}]
+        strategies = [{"name": "Strategy", "description": "Do it"}]
+
+        with patch.object(analyses, "AsyncSessionLocal", session_factory), \
+                patch.object(analyses, "progress_bus", RecordingBus()), \
+                patch("app.agents.checkpointing.get_checkpointer", new=AsyncMock(return_value=None)), \
+                patch("app.agents.pipeline.research_agent", new=AsyncMock(return_value=research_result)), \
+                patch("app.agents.pipeline.scenario_agent", new=AsyncMock(return_value=scenarios)), \
+                patch("app.agents.pipeline.strategy_agent", new=AsyncMock(return_value=strategies)):
+            await analyses.run_analysis_task(analysis_id, "Acme")
+
+        assert completions == [AnalysisStatus.COMPLETED]
+
+    @pytest.mark.asyncio
+    async def test_lost_lease_leaves_analysis_to_new_owner(self, session_factory):
+        """Test that a worker cancelled by a lost lease writes no status and publishes no event"""
+        analysis_id = await _seed_analysis(session_factory, scenarios=0, status=AnalysisStatus.PENDING)
+        pipeline = FakePipeline()
+        published = []
+
+        class RecordingBus(InMemoryProgressBus):
+            async def publish(self, analysis_id, event):
+                published.append(event["event"])
+                await super().publish(analysis_id, event)
+
+        class LostLeaseQueue:
+            """Hands out one job, then reports the lease lost on the first heartbeat"""
+
+            def __init__(self):
+                self.job = ClaimedJob(id=1, analysis_id=analysis_id, company_name="Acme", attempt=1)
+                self.calls = []
+
+            def claim(self, worker_id):
+                job, self.job = self.job, None
+                return job
+
+            def heartbeat(self, job_id, worker_id):
+                return False
+
+            def complete(self, job_id, worker_id):
+                self.calls.append("complete")
+
+            def fail(self, job_id, worker_id, error):
+                self.calls.append("fail")
+
+            def release(self, job_id, worker_id):
+                self.calls.append("release")
+
+        queue = LostLeaseQueue()
+        worker = AnalysisWorker(
+            queue=queue, concurrency=1, poll_interval=0.01,  # type: ignore
+            heartbeat_interval=0.05, worker_id="worker-a"
+        )
+        with patch.object(analyses, "AsyncSessionLocal", session_factory), \
+                patch.object(analyses, "progress_bus", RecordingBus()), \
+                patch("app.agents.pipeline.AnalysisPipeline", pipeline), \
+                patch("app.agents.checkpointing.get_checkpointer", new=AsyncMock(return_value=None)):
+            run = asyncio.create_task(worker.run())
+            await asyncio.wait_for(pipeline.running.wait(), timeout=5)
+            events_before = list(published)
+            for _ in range(200):
+                if worker.running_jobs == 0:
+                    break
+                await asyncio.sleep(0.01)
+            worker.stop()
+            await asyncio.wait_for(run, timeout=2)
+
+        assert worker.running_jobs == 0
+        assert published == events_before
+        assert "analysis_failed" not in published
+        assert queue.calls == []
+        async with session_factory() as db:
+            assert (await db.get(Analysis, analysis_id)).status == AnalysisStatus.PROCESSING
+
+
+async def _read_event(body_iterator):
+    """Read one SSE event (or keepalive comment) from a streaming response body"""
+    chunk = ""
+    while not chunk.endswith("\n\n"):
+        chunk += await body_iterator.__anext__()
+    return chunk
+
+
+@pytest.mark.unit
+class TestStreamAnalysisProgress:
+    """Test cases for the SSE progress stream"""
+
+    @pytest.mark.asyncio
+    async def test_idle_streams_hold_no_database_connections(self, session_factory, engine):
+        """Test that hundreds of open streams keep pool checkout at zero"""
+        analysis_id = await _seed_analysis(session_factory, status=AnalysisStatus.PROCESSING)
+        bus = InMemoryProgressBus()
+        checked_out = 0
+        max_checked_out_while_idle = 0
+
+        def on_checkout(*args):
+            nonlocal checked_out
+            checked_out += 1
+
+        def on_checkin(*args):
+            nonlocal checked_out
+            checked_out -= 1
+
+        event.listen(engine.sync_engine, "checkout", on_checkout)
+        event.listen(engine.sync_engine, "checkin", on_checkin)
+        with patch.object(analyses, "AsyncSessionLocal", session_factory), \
+                patch.object(analyses, "progress_bus", bus), \
+                patch.object(analyses, "SSE_KEEPALIVE_INTERVAL", 0.05):
+            streams = []
+            for _ in range(300):
+                response = await analyses.stream_analysis_progress(analysis_id)
+                body = response.body_iterator
+                assert '"status": "processing"' in await _read_event(body)
+                streams.append(body)
+
+            # Idle for a few keepalive intervals
+            for body in streams[:10]:
+                assert (await _read_event(body)).startswith(": keepalive")
+            max_checked_out_while_idle = checked_out
+            assert bus.subscriber_count(analysis_id) == 300
+
+            await bus.publish(analysis_id, {"event": "analysis_complete", "data": {"message": "done"}})
+            for body in streams:
+                chunk = await _read_event(body)
+                while chunk.startswith(": keepalive"):
+                    chunk = await _read_event(body)
+                assert chunk.startswith("event: analysis_complete")
+                with pytest.raises(StopAsyncIteration):
+                    await body.__anext__()
+
+        assert max_checked_out_while_idle == 0
+        assert engine.pool.checkedout() == 0
+        assert bus.subscriber_count() == 0
+
+    @pytest.mark.asyncio
+    async def test_silent_stream_closes_when_status_finished(self, session_factory):
+        """Test a stream closes from the status check when no terminal event reaches the bus"""
+        analysis_id = await _seed_analysis(session_factory, status=AnalysisStatus.PROCESSING)
+        bus = InMemoryProgressBus()
+        with patch.object(analyses, "AsyncSessionLocal", session_factory), \
+                patch.object(analyses, "progress_bus", bus), \
+                patch.object(analyses, "SSE_KEEPALIVE_INTERVAL", 0.01), \
+                patch.object(analyses, "SSE_STATUS_CHECK_INTERVAL", 0.03):
+            response = await analyses.stream_analysis_progress(analysis_id)
+            body = response.body_iterator
+            await _read_event(body)
+            assert (await _read_event(body)).startswith(": keepalive")
+
+            # Finished in another process whose progress never reached this bus
+            async with session_factory() as db:
+                (await db.get(Analysis, analysis_id)).status = AnalysisStatus.COMPLETED
+                await db.commit()
+
+            chunk = await _read_event(body)
+            while chunk.startswith(": keepalive"):
+                chunk = await _read_event(body)
+            with pytest.raises(StopAsyncIteration):
+                await body.__anext__()
+
+        assert chunk.startswith("event: analysis_complete")
+        assert bus.subscriber_count() == 0
+
+    @pytest.mark.asyncio
+    async def test_finished_and_missing_analyses(self, session_factory):
+        """Test that finished analyses close immediately and unknown ones 404 without leaking"""
+        analysis_id = await _seed_analysis(session_factory, status=AnalysisStatus.FAILED)
+        bus = InMemoryProgressBus()
+        with patch.object(analyses, "AsyncSessionLocal", session_factory), \
+                patch.object(analyses, "progress_bus", bus):
+            response = await analyses.stream_analysis_progress(analysis_id)
+            chunks = [chunk async for chunk in response.body_iterator]
+            with pytest.raises(HTTPException) as missing:
+                await analyses.stream_analysis_progress(999)
+
+        # One complete frame per chunk, the same encoding as bus events
+        assert [chunk.split("\n")[0] for chunk in chunks] == ["event: status", "event: analysis_failed"]
+        assert all(chunk.endswith("\n\n") for chunk in chunks)
+        assert missing.value.status_code == 404
+        assert bus.subscriber_count() == 0
+
+
+    @pytest.mark.asyncio
+    async def test_reconnect_replays_missed_events(self, session_factory):
+        """Test that a stream resumed with Last-Event-ID picks up after the last event it sent"""
+        analysis_id = await _seed_analysis(session_factory, status=AnalysisStatus.PROCESSING)
+        bus = InMemoryProgressBus()
+        with patch.object(analyses, "AsyncSessionLocal", session_factory), \
+                patch.object(analyses, "progress_bus", bus):
+            response = await analyses.stream_analysis_progress(analysis_id)
+            body = response.body_iterator
+            await _read_event(body)
+            await bus.publish(analysis_id, {"event": "research_start", "data": {"message": "research"}})
+            first = await _read_event(body)
+            await body.aclose()
+
+            # Published while the client was disconnected
+            await bus.publish(analysis_id, {"event": "research_complete", "data": {"message": "missed"}})
+            await bus.publish(analysis_id, {"event": "analysis_complete", "data": {"message": "done"}})
+
+            last_id = first.split("id: ")[1].split("\n")[0]
+            response = await analyses.stream_analysis_progress(analysis_id, last_event_id_header=last_id)
+            chunks = [chunk async for chunk in response.body_iterator]
+
+        assert first.startswith("event: research_start\nid: ")
+        assert [chunk.split("\n")[0] for chunk in chunks] == ["event: research_complete", "event: analysis_complete"]
+        assert int(chunks[0].split("id: ")[1].split("\n")[0]) > int(last_id)
+        assert bus.subscriber_count() == 0
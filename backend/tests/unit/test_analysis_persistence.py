@@ -0,0 +1,89 @@
+"""
+Unit tests for bulk persistence of pipeline results
+"""
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.database import Base
+from app.models.analysis import Analysis, AnalysisStatus
+from app.models.scenario import Scenario
+from app.models.search_query import SearchQuery
+from app.models.strategy import Strategy
+from app.services.analysis_persistence import save_pipeline_results
+
+
+@pytest.fixture
+async def engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'persist.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+def _result(scenarios, strategies_per_scenario):
+    return {
+        "search_results": {f"Question {i}?": [{"title": f"Result {i}"}] for i in range(3)},
+        "scenarios": [
+            {"scenario_number": n, "title": f"Scenario {n}", "description": "D", "likelihood": 0.25}
+            for n in range(1, scenarios + 1)
+        ],
+        "strategies": {
+            f"Scenario {n}": [
+                {"name": f"Strategy {n}.{i}", "description": "Do it"} for i in range(strategies_per_scenario)
+            ]
+            for n in range(1, scenarios + 1)
+        }
+    }
+
+
+@pytest.mark.unit
+class TestSavePipelineResults:
+    """Test cases for save_pipeline_results"""
+
+    @pytest.mark.asyncio
+    async def test_writes_everything_in_three_statements(self, engine):
+        """Test that the number of INSERTs does not grow with the result size"""
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        statements = []
+        event.listen(
+            engine.sync_engine, "before_cursor_execute",
+            lambda conn, cursor, statement, *args: statements.append(statement)
+        )
+
+        async with session_factory() as db:
+            analysis = Analysis(company_name="Acme", status=AnalysisStatus.PROCESSING)
+            db.add(analysis)
+            await db.commit()
+            statements.clear()
+
+            counts = await save_pipeline_results(db, analysis.id, _result(scenarios=6, strategies_per_scenario=7))
+            await db.commit()
+
+        inserts = [s for s in statements if s.lstrip().upper().startswith("INSERT")]
+        assert sum("INTO search_queries" in s for s in inserts) == 1
+        assert sum("INTO strategies" in s for s in inserts) == 1
+        # Postgres batches the ordered RETURNING insert into one statement; SQLite
+        # cannot order RETURNING rows, so SQLAlchemy sends one row per statement there
+        assert sum("INTO scenarios" in s for s in inserts) <= 6
+        assert counts == {"search_queries": 3, "scenarios": 6, "strategies": 42}
+
+        async with session_factory() as db:
+            scenarios = (await db.execute(select(Scenario).order_by(Scenario.scenario_number))).scalars().all()
+            strategies = (await db.execute(select(Strategy))).scalars().all()
+            queries = (await db.execute(select(SearchQuery))).scalars().all()
+
+        by_scenario = {scenario.id: scenario.title for scenario in scenarios}
+        assert all(strategy.name.startswith(by_scenario[strategy.scenario_id].replace("Scenario", "Strategy"))
+                   for strategy in strategies)
+        assert queries[0].results == [{"title": "Result 0"}]
+
+    @pytest.mark.asyncio
+    async def test_empty_result_writes_nothing(self, engine):
+        """Test that an empty result issues no statements"""
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        async with session_factory() as db:
+            counts = await save_pipeline_results(db, 1, {})
+
+        assert counts == {"search_queries": 0, "scenarios": 0, "strategies": 0}
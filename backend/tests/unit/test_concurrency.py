@@ -0,0 +1,216 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from app.core.concurrency import AdaptiveConcurrencyLimiter, ConcurrencyLimiter
+
+
+@pytest.mark.unit
+class TestConcurrencyLimiter:
+    """Unit tests for the shared concurrency limiter"""
+    
+    @pytest.mark.asyncio
+    async def test_limits_in_flight(self):
+        """Test no more than `limit` holders run at once"""
+        limiter = ConcurrencyLimiter(2)
+        in_flight = 0
+        peak = 0
+        
+        async def worker():
+            nonlocal in_flight, peak
+            async with limiter:
+                in_flight += 1
+                peak = max(peak, in_flight)
+                await asyncio.sleep(0.01)
+                in_flight -= 1
+        
+        await asyncio.gather(*[worker() for _ in range(6)])
+        
+        assert peak == 2
+        assert limiter.in_flight == 0
+    
+    @pytest.mark.asyncio
+    async def test_waiters_served_in_order(self):
+        """Test queued waiters acquire in arrival order"""
+        limiter = ConcurrencyLimiter(1)
+        order = []
+        
+        async def worker(i):
+            async with limiter:
+                order.append(i)
+                await asyncio.sleep(0)
+        
+        await asyncio.gather(*[worker(i) for i in range(5)])
+        
+        assert order == [0, 1, 2, 3, 4]
+    
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_leak_slot(self):
+        """Test cancelling a queued waiter leaves the limiter consistent"""
+        limiter = ConcurrencyLimiter(1)
+        await limiter.acquire()
+        
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        
+        limiter.release()
+        assert limiter.in_flight == 0
+        assert limiter.waiting == 0
+    
+    @pytest.mark.asyncio
+    async def test_raising_limit_wakes_waiters(self):
+        """Test set_limit admits queued waiters immediately"""
+        limiter = ConcurrencyLimiter(1)
+        await limiter.acquire()
+        
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        
+        limiter.set_limit(2)
+        await asyncio.wait_for(waiter, timeout=1)
+        assert limiter.in_flight == 2
+
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.unit
+class TestAdaptiveConcurrencyLimiter:
+    """Unit tests for the AIMD concurrency limiter"""
+    
+    async def _call(self, limiter, clock, latency=1.0, cost=None):
+        """Run one successful call of the given latency"""
+        await limiter.acquire()
+        started = limiter.now()
+        clock.now += latency
+        limiter.record_success(started, cost=cost)
+        limiter.release()
+    
+    @pytest.mark.asyncio
+    async def test_increases_additively_while_saturated(self):
+        """Test a limit's worth of healthy calls at the limit raises it by one"""
+        clock = FakeClock()
+        limiter = AdaptiveConcurrencyLimiter(2, max_limit=3, clock=clock)
+        await limiter.acquire()  # Keep the limit in use
+        
+        await self._call(limiter, clock)
+        assert limiter.limit == 2
+        await self._call(limiter, clock)
+        assert limiter.limit == 3
+        
+        for _ in range(10):
+            await limiter.acquire()
+            await self._call(limiter, clock)
+            limiter.release()
+        assert limiter.limit == 3  # Capped at max_limit
+    
+    @pytest.mark.asyncio
+    async def test_does_not_grow_when_unused(self):
+        """Test successes below the limit leave it unchanged"""
+        clock = FakeClock()
+        limiter = AdaptiveConcurrencyLimiter(4, clock=clock)
+        
+        for _ in range(20):
+            await self._call(limiter, clock)
+        
+        assert limiter.limit == 4
+    
+    @pytest.mark.asyncio
+    async def test_overload_cuts_once_per_round(self):
+        """Test errors from calls started before a cut do not cut again"""
+        clock = FakeClock()
+        limiter = AdaptiveConcurrencyLimiter(16, min_limit=2, clock=clock)
+        started = [limiter.now() for _ in range(3)]
+        
+        clock.now += 1
+        for start in started:
+            limiter.record_overload(start, "429")
+        assert limiter.limit == 8
+        
+        clock.now += 1
+        limiter.record_overload(limiter.now(), "429")
+        assert limiter.limit == 4
+        for _ in range(5):
+            clock.now += 1
+            limiter.record_overload(limiter.now(), "429")
+        assert limiter.limit == 2  # Floored at min_limit
+    
+    @pytest.mark.asyncio
+    async def test_latency_spike_cuts_limit_once(self):
+        """Test calls much slower than usual cut the limit once per spike"""
+        clock = FakeClock()
+        limiter = AdaptiveConcurrencyLimiter(8, latency_tolerance=2.0, clock=clock)
+        
+        for _ in range(AdaptiveConcurrencyLimiter.MIN_LATENCY_SAMPLES):
+            await self._call(limiter, clock, latency=1.0)
+        assert limiter.limit == 8
+        
+        await self._call(limiter, clock, latency=10.0)
+        assert limiter.limit == 4
+        # Still slow: the same spike does not cut again
+        for _ in range(3):
+            await self._call(limiter, clock, latency=10.0)
+        assert limiter.limit == 4
+    
+    @pytest.mark.asyncio
+    async def test_lasting_latency_shift_becomes_normal(self):
+        """Test a permanent latency change is learned instead of pinning the limit at min"""
+        clock = FakeClock()
+        limiter = AdaptiveConcurrencyLimiter(8, min_limit=1, latency_tolerance=2.0, clock=clock)
+        
+        with patch("app.core.concurrency.logger") as mock_logger:
+            for _ in range(20):
+                await self._call(limiter, clock, latency=1.0)
+            for _ in range(200):
+                await self._call(limiter, clock, latency=5.0)
+        
+        assert limiter.limit == 4
+        assert mock_logger.warning.call_count == 1
+        
+        # Once learned, calls at the new latency let the limit grow again
+        for _ in range(3):
+            await limiter.acquire()  # Keep the limit in use
+        for _ in range(4):
+            await self._call(limiter, clock, latency=5.0)
+        assert limiter.limit > 4
+    
+    @pytest.mark.asyncio
+    async def test_latency_is_compared_per_unit_of_cost(self):
+        """Test longer responses at the same per-token speed are not a spike"""
+        clock = FakeClock()
+        limiter = AdaptiveConcurrencyLimiter(8, latency_tolerance=2.0, clock=clock)
+        
+        for _ in range(AdaptiveConcurrencyLimiter.MIN_LATENCY_SAMPLES):
+            await self._call(limiter, clock, latency=1.0, cost=500)
+        for _ in range(5):
+            await self._call(limiter, clock, latency=8.0, cost=4000)
+        
+        assert limiter.limit == 8
+    
+    def test_no_cut_below_min(self):
+        """Test overload at the minimum limit neither cuts nor warns"""
+        limiter = AdaptiveConcurrencyLimiter(1, min_limit=1)
+        
+        with patch("app.core.concurrency.logger") as mock_logger:
+            limiter.record_overload(limiter.now(), "429")
+        
+        assert limiter.limit == 1
+        mock_logger.warning.assert_not_called()
+    
+    def test_limit_gauge(self):
+        """Test the current limit is exported on /metrics"""
+        from app.core.metrics import metrics
+        
+        limiter = AdaptiveConcurrencyLimiter(5, name="gauge-test")
+        assert 'adaptive_concurrency_limit{limiter="gauge-test"} 5' in metrics.render()
+        limiter.record_overload(limiter.now())
+        assert 'adaptive_concurrency_limit{limiter="gauge-test"} 2' in metrics.render()
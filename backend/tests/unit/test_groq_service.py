@@ -96,3 +96,251 @@ class TestGroqService:
                 assert result == "Success after retry"
                 assert mock_post.call_count == 2
 
+    
+    @pytest.mark.asyncio
+    async def test_generate_uses_response_cache(self, groq_service):
+        """Test identical requests are served from the cache and bypass skips it"""
+        from unittest.mock import MagicMock
+        from app.services.response_cache import ResponseCache, MemoryCacheBackend
+        
+        groq_service.cache = ResponseCache(MemoryCacheBackend(), namespace="groq", ttl=60)
+        api_response = MagicMock()
+        api_response.json.return_value = {"choices": [{"message": {"content": "Cached text"}}]}
+        api_response.raise_for_status = lambda: None
+        
+        with patch.object(groq_service.client, 'post', new_callable=AsyncMock) as mock_post:
+            mock_post.return_value = api_response
+            
+            first = await groq_service.generate("Same prompt", max_tokens=100)
+            second = await groq_service.generate("Same prompt", max_tokens=100)
+            assert first == second == "Cached text"
+            assert mock_post.call_count == 1
+            
+            # Different parameters miss, and use_cache=False always calls the API
+            await groq_service.generate("Same prompt", max_tokens=200)
+            await groq_service.generate("Same prompt", max_tokens=100, use_cache=False)
+            assert mock_post.call_count == 3
+            assert groq_service.cache.stats()["hits"] == 1
+    
+    @staticmethod
+    def _sse_body(*deltas, usage=None):
+        """Build an OpenAI-compatible streaming response body"""
+        import json
+        lines = []
+        for delta in deltas:
+            lines.append("data: " + json.dumps({"choices": [{"delta": {"content": delta}}]}))
+        final = {"choices": [{"delta": {}, "finish_reason": "stop"}]}
+        if usage:
+            final["x_groq"] = {"usage": usage}
+        lines.append("data: " + json.dumps(final))
+        lines.append("data: [DONE]")
+        return ("\n\n".join(lines) + "\n\n").encode()
+    
+    @pytest.mark.asyncio
+    async def test_generate_stream_yields_deltas(self, groq_service):
+        """Test streaming yields text as it arrives and records usage"""
+        import httpx
+        from app.core.rate_limit import RateLimiter
+        
+        requests = []
+        
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200, content=self._sse_body("Hello", ", ", "world", usage={"total_tokens": 42}))
+        
+        groq_service.client = httpx.AsyncClient(base_url=GroqService.BASE_URL, transport=httpx.MockTransport(handler))
+        groq_service.rate_limiter = RateLimiter(tokens_per_minute=10000)
+        
+        chunks = [chunk async for chunk in groq_service.generate_stream("Test prompt", max_tokens=500)]
+        
+        assert chunks == ["Hello", ", ", "world"]
+        import json
+        assert json.loads(requests[0].content)["stream"] is True
+        # Reservation was corrected down to the reported 42 tokens
+        assert groq_service.rate_limiter.token_bucket.tokens > 10000 - 100
+    
+    @pytest.mark.asyncio
+    async def test_generate_stream_retries_before_first_chunk(self, groq_service):
+        """Test a 429 before any text is retried"""
+        import httpx
+        
+        responses = [
+            httpx.Response(429, json={"error": "rate limited"}),
+            httpx.Response(200, content=self._sse_body("Recovered"))
+        ]
+        groq_service.client = httpx.AsyncClient(
+            base_url=GroqService.BASE_URL,
+            transport=httpx.MockTransport(lambda request: responses.pop(0))
+        )
+        
+        with patch('app.services.groq_service.asyncio.sleep', new_callable=AsyncMock):
+            chunks = [chunk async for chunk in groq_service.generate_stream("Test prompt")]
+        
+        assert chunks == ["Recovered"]
+    
+    @pytest.mark.asyncio
+    async def test_identical_streams_share_one_call(self, groq_service):
+        """Test concurrent identical streams make a single API request"""
+        import asyncio
+        import httpx
+        
+        requests = []
+        
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200, content=self._sse_body("Shared", " text"))
+        
+        groq_service.client = httpx.AsyncClient(base_url=GroqService.BASE_URL, transport=httpx.MockTransport(handler))
+        
+        async def consume():
+            return [chunk async for chunk in groq_service.generate_stream("Same prompt")]
+        
+        results = await asyncio.gather(consume(), consume())
+        
+        assert results == [["Shared", " text"], ["Shared", " text"]]
+        assert len(requests) == 1
+        assert groq_service.inflight.coalesced == 1
+    
+    @pytest.mark.asyncio
+    async def test_generate_follows_retry_after(self, groq_service):
+        """Test a 429 waits for the server's Retry-After instead of a fixed backoff"""
+        import httpx
+        from unittest.mock import AsyncMock
+        
+        responses = [
+            httpx.Response(429, headers={"Retry-After": "7"}, json={"error": "rate limited"}),
+            httpx.Response(200, json={"choices": [{"message": {"content": "After the wait"}}]})
+        ]
+        groq_service.client = httpx.AsyncClient(
+            base_url=GroqService.BASE_URL,
+            transport=httpx.MockTransport(lambda request: responses.pop(0))
+        )
+        
+        with patch('app.services.groq_service.asyncio.sleep', new_callable=AsyncMock) as mock_sleep:
+            result = await groq_service.generate("Test prompt", use_cache=False)
+        
+        assert result == "After the wait"
+        wait = mock_sleep.await_args.args[0]
+        assert 7 <= wait <= 7 + GroqService.RETRY_DELAY
+    
+    @pytest.mark.asyncio
+    async def test_retried_attempts_refund_their_reservation(self, groq_service):
+        """Test a failed attempt gives its tokens back and the success is charged its real usage"""
+        import httpx
+        from app.core.rate_limit import RateLimiter
+        
+        responses = [
+            httpx.Response(503, json={"error": "unavailable"}),
+            httpx.Response(200, json={
+                "choices": [{"message": {"content": "Recovered"}}],
+                "usage": {"total_tokens": 42}
+            })
+        ]
+        groq_service.client = httpx.AsyncClient(
+            base_url=GroqService.BASE_URL,
+            transport=httpx.MockTransport(lambda request: responses.pop(0))
+        )
+        groq_service.rate_limiter = RateLimiter(tokens_per_minute=10000)
+        
+        with patch('app.services.groq_service.asyncio.sleep', new_callable=AsyncMock):
+            result = await groq_service.generate("Test prompt", max_tokens=2000, use_cache=False)
+        
+        assert result == "Recovered"
+        # Only the successful call's 42 tokens are spent (plus a few refilled since)
+        assert 10000 - 42 <= groq_service.rate_limiter.token_bucket.tokens <= 10000 - 42 + 20
+    
+    @pytest.mark.asyncio
+    async def test_abandoned_stream_settles_its_reservation(self, groq_service):
+        """Test a stream closed early is charged for the text so far, not for max_tokens"""
+        import httpx
+        from app.core.rate_limit import RateLimiter
+        
+        groq_service.client = httpx.AsyncClient(
+            base_url=GroqService.BASE_URL,
+            transport=httpx.MockTransport(lambda request: httpx.Response(200, content=self._sse_body("First", " second")))
+        )
+        groq_service.rate_limiter = RateLimiter(tokens_per_minute=10000)
+        
+        stream = groq_service.generate_stream("Test prompt", max_tokens=2000, use_cache=False)
+        assert await stream.__anext__() == "First"
+        await stream.aclose()
+        
+        assert groq_service.rate_limiter.token_bucket.tokens > 10000 - 100
+    
+    @pytest.mark.asyncio
+    async def test_generate_fails_fast_when_circuit_open(self, groq_service):
+        """Test repeated server errors open the circuit and later calls skip the API"""
+        import httpx
+        from unittest.mock import AsyncMock
+        from app.core.retry import CircuitBreaker, CircuitOpenError
+        
+        calls = []
+        
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(503, json={"error": "unavailable"})
+        
+        groq_service.client = httpx.AsyncClient(base_url=GroqService.BASE_URL, transport=httpx.MockTransport(handler))
+        groq_service.breaker = CircuitBreaker("groq-test", failure_threshold=2, reset_timeout=60)
+        
+        with patch('app.services.groq_service.asyncio.sleep', new_callable=AsyncMock):
+            with pytest.raises(CircuitOpenError):
+                await groq_service.generate("Test prompt", use_cache=False)
+            assert len(calls) == 2
+            
+            with pytest.raises(CircuitOpenError):
+                await groq_service.generate("Another prompt", use_cache=False)
+        assert len(calls) == 2
+    
+    @pytest.mark.asyncio
+    async def test_generate_rate_limit_cuts_concurrency(self, groq_service):
+        """Test a 429 halves the adaptive concurrency limit and the slot is released"""
+        import httpx
+        from unittest.mock import AsyncMock
+        from app.core.concurrency import AdaptiveConcurrencyLimiter
+        
+        responses = [
+            httpx.Response(429, json={"error": "rate limited"}),
+            httpx.Response(200, json={"choices": [{"message": {"content": "Recovered"}}]})
+        ]
+        groq_service.client = httpx.AsyncClient(
+            base_url=GroqService.BASE_URL,
+            transport=httpx.MockTransport(lambda request: responses.pop(0))
+        )
+        groq_service.concurrency_limiter = AdaptiveConcurrencyLimiter(8, name="groq-test")
+        
+        with patch('app.services.groq_service.asyncio.sleep', new_callable=AsyncMock):
+            result = await groq_service.generate("Test prompt", use_cache=False)
+        
+        assert result == "Recovered"
+        assert groq_service.concurrency_limiter.limit == 4
+        assert groq_service.concurrency_limiter.in_flight == 0
+    
+    @pytest.mark.asyncio
+    async def test_generate_stream_holds_concurrency_slot(self, groq_service):
+        """Test streaming requests go through the adaptive limiter and report overload"""
+        import httpx
+        from unittest.mock import AsyncMock
+        from app.core.concurrency import AdaptiveConcurrencyLimiter
+        
+        limiter = AdaptiveConcurrencyLimiter(8, name="groq-stream-test")
+        in_flight = []
+        responses = [
+            httpx.Response(503, json={"error": "unavailable"}),
+            httpx.Response(200, content=self._sse_body("Hi", usage={"completion_tokens": 2, "total_tokens": 10}))
+        ]
+        
+        def handler(request):
+            in_flight.append(limiter.in_flight)
+            return responses.pop(0)
+        
+        groq_service.client = httpx.AsyncClient(base_url=GroqService.BASE_URL, transport=httpx.MockTransport(handler))
+        groq_service.concurrency_limiter = limiter
+        
+        with patch('app.services.groq_service.asyncio.sleep', new_callable=AsyncMock):
+            chunks = [chunk async for chunk in groq_service.generate_stream("Test prompt", use_cache=False)]
+        
+        assert chunks == ["Hi"]
+        assert in_flight == [1, 1]
+        assert limiter.limit == 4
+        assert limiter.in_flight == 0
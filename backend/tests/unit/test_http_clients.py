@@ -0,0 +1,102 @@
+"""
+Unit tests for the pooled upstream API clients
+"""
+import asyncio
+import pytest
+from unittest.mock import patch
+
+from app.services import http_clients
+from app.services.http_clients import build_http_client, pool_stats
+
+
+async def _start_server():
+    """Minimal keep-alive HTTP/1.1 server answering every request with 200"""
+    async def handle(reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                if not head:
+                    break
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\nContent-Type: text/plain\r\n\r\nok")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    return server, f"http://127.0.0.1:{port}"
+
+
+@pytest.mark.unit
+class TestHttpClients:
+    """Test cases for build_http_client and the pool gauges"""
+
+    @pytest.mark.asyncio
+    async def test_client_uses_pool_settings(self):
+        """Test limits and split timeouts come from settings, HTTP/2 only with h2"""
+        with patch.object(http_clients, "settings") as mock_settings, \
+                patch("app.services.http_clients.importlib.util.find_spec", return_value=None):
+            mock_settings.HTTP_MAX_CONNECTIONS = 7
+            mock_settings.HTTP_MAX_KEEPALIVE_CONNECTIONS = 3
+            mock_settings.HTTP_KEEPALIVE_EXPIRY = 12.0
+            mock_settings.HTTP_CONNECT_TIMEOUT = 2.0
+            mock_settings.HTTP_READ_TIMEOUT = 45.0
+            mock_settings.HTTP_WRITE_TIMEOUT = 4.0
+            mock_settings.HTTP_POOL_TIMEOUT = 5.0
+            mock_settings.HTTP2_ENABLED = True
+            assert http_clients.http2_available() is False
+            client = build_http_client("test-settings", "http://example.invalid")
+
+        try:
+            assert client.timeout.connect == 2.0
+            assert client.timeout.read == 45.0
+            assert client.timeout.write == 4.0
+            assert client.timeout.pool == 5.0
+            pool = http_clients._pool(client)
+            assert pool._max_connections == 7
+            assert pool._max_keepalive_connections == 3
+            assert pool._keepalive_expiry == 12.0
+            assert pool._http2 is False
+        finally:
+            await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_connections_are_reused_and_counted(self):
+        """Test keep-alive reuse shows up as one connection opened for several requests"""
+        server, base_url = await _start_server()
+        client = build_http_client("test-reuse", base_url)
+        try:
+            for _ in range(3):
+                response = await client.get("/")
+                assert response.text == "ok"
+
+            assert http_clients.requests_sent.value(client="test-reuse") == 3
+            assert http_clients.connections_opened.value(client="test-reuse") == 1
+            assert http_clients.connection_wait_seconds.value(client="test-reuse") > 0
+            assert pool_stats(client) == {"active": 0, "idle": 1, "queued": 0}
+
+            rendered = http_clients.metrics.render()
+            assert 'http_client_pool_connections{client="test-reuse",state="idle"} 1' in rendered
+            assert "# TYPE http_client_connections_opened_total counter" in rendered
+            assert 'http_client_connections_opened_total{client="test-reuse"} 1' in rendered
+        finally:
+            await client.aclose()
+            server.close()
+            await server.wait_closed()
+
+        assert pool_stats(client) == {"active": 0, "idle": 0, "queued": 0}
+
+    @pytest.mark.asyncio
+    async def test_service_reopens_client_after_close(self):
+        """Test a closed service client is replaced on next use"""
+        from app.services.tavily_service import TavilyService
+
+        service = TavilyService()
+        first = service.open()
+        await service.close()
+        assert first.is_closed
+        second = service.client
+        assert second is not first and not second.is_closed
+        await service.close()
@@ -0,0 +1,254 @@
+"""
+Unit tests for the analysis job queue and worker
+"""
+import pytest
+import asyncio
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.models.analysis import Analysis, AnalysisStatus
+from app.models.analysis_job import AnalysisJob, JobStatus
+from app.services.analysis_worker import AnalysisWorker
+from app.services.job_queue import JobQueue
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def _create_analysis(session_factory, queue, company_name="Acme"):
+    db = session_factory()
+    try:
+        analysis = Analysis(company_name=company_name, status=AnalysisStatus.PENDING)
+        db.add(analysis)
+        db.flush()
+        queue.enqueue(db, analysis.id, company_name)
+        db.commit()
+        return analysis.id
+    finally:
+        db.close()
+
+
+def _job(session_factory, analysis_id):
+    db = session_factory()
+    try:
+        return db.query(AnalysisJob).filter(AnalysisJob.analysis_id == analysis_id).one()
+    finally:
+        db.close()
+
+
+def _expire_lease(session_factory, job_id):
+    db = session_factory()
+    try:
+        job = db.query(AnalysisJob).filter(AnalysisJob.id == job_id).one()
+        job.lease_expires_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+        db.commit()
+    finally:
+        db.close()
+
+
+@pytest.mark.unit
+class TestJobQueue:
+    """Test cases for JobQueue"""
+
+    def test_claims_jobs_in_order_once(self, session_factory):
+        """Test that each queued job is handed out to a single worker, oldest first"""
+        queue = JobQueue(session_factory=session_factory, lease_seconds=60)
+        first = _create_analysis(session_factory, queue, "First")
+        second = _create_analysis(session_factory, queue, "Second")
+
+        job_a = queue.claim("worker-a")
+        job_b = queue.claim("worker-b")
+
+        assert job_a.analysis_id == first
+        assert job_a.company_name == "First"
+        assert job_a.attempt == 1
+        assert job_b.analysis_id == second
+        assert queue.claim("worker-c") is None
+        assert _job(session_factory, first).worker_id == "worker-a"
+
+    def test_heartbeat_and_completion_require_lease(self, session_factory):
+        """Test that only the worker holding a job can renew or finish it"""
+        queue = JobQueue(session_factory=session_factory, lease_seconds=60)
+        analysis_id = _create_analysis(session_factory, queue)
+        job = queue.claim("worker-a")
+
+        assert queue.heartbeat(job.id, "worker-a") is True
+        assert queue.heartbeat(job.id, "worker-b") is False
+        assert queue.complete(job.id, "worker-b") is False
+        assert queue.complete(job.id, "worker-a") is True
+        assert _job(session_factory, analysis_id).status == JobStatus.SUCCEEDED
+        assert queue.heartbeat(job.id, "worker-a") is False
+
+    def test_expired_lease_is_reclaimed(self, session_factory):
+        """Test that a job whose worker stopped heartbeating goes to another worker"""
+        queue = JobQueue(session_factory=session_factory, lease_seconds=60, max_attempts=3)
+        _create_analysis(session_factory, queue)
+        job = queue.claim("worker-a")
+        assert queue.claim("worker-b") is None
+
+        _expire_lease(session_factory, job.id)
+        reclaimed = queue.claim("worker-b")
+
+        assert reclaimed.id == job.id
+        assert reclaimed.attempt == 2
+        # The original worker can no longer touch the job
+        assert queue.heartbeat(job.id, "worker-a") is False
+
+    def test_expired_lease_on_last_attempt_fails_job(self, session_factory):
+        """Test that a job that keeps losing its worker is eventually failed"""
+        queue = JobQueue(session_factory=session_factory, lease_seconds=60, max_attempts=1)
+        analysis_id = _create_analysis(session_factory, queue)
+        job = queue.claim("worker-a")
+        _expire_lease(session_factory, job.id)
+
+        assert queue.claim("worker-b") is None
+
+        stored = _job(session_factory, analysis_id)
+        assert stored.status == JobStatus.FAILED
+        assert "Lease expired" in stored.last_error
+        db = session_factory()
+        try:
+            assert db.query(Analysis).filter(Analysis.id == analysis_id).one().status == AnalysisStatus.FAILED
+        finally:
+            db.close()
+
+
+@pytest.mark.unit
+class TestAnalysisWorker:
+    """Test cases for AnalysisWorker"""
+
+    @pytest.mark.asyncio
+    async def test_runs_claimed_jobs_and_records_outcome(self, session_factory):
+        """Test that the worker runs jobs with bounded concurrency and records results"""
+        queue = JobQueue(session_factory=session_factory, lease_seconds=60)
+        ok_id = _create_analysis(session_factory, queue, "Good")
+        bad_id = _create_analysis(session_factory, queue, "Bad")
+        active = 0
+        max_active = 0
+        finished = []
+
+        async def runner(analysis_id, company_name):
+            nonlocal active, max_active
+            active += 1
+            max_active = max(max_active, active)
+            await asyncio.sleep(0.05)
+            active -= 1
+            finished.append(analysis_id)
+            if company_name == "Bad":
+                raise ValueError("pipeline exploded")
+
+        worker = AnalysisWorker(
+            queue=queue, concurrency=1, poll_interval=0.01,
+            heartbeat_interval=10, worker_id="worker-a", runner=runner
+        )
+        run = asyncio.create_task(worker.run())
+        for _ in range(200):
+            if len(finished) == 2 and worker.running_jobs == 0:
+                break
+            await asyncio.sleep(0.01)
+        worker.stop()
+        await asyncio.wait_for(run, timeout=2)
+
+        assert finished == [ok_id, bad_id]
+        assert max_active == 1
+        assert _job(session_factory, ok_id).status == JobStatus.SUCCEEDED
+        failed = _job(session_factory, bad_id)
+        assert failed.status == JobStatus.FAILED
+        assert "pipeline exploded" in failed.last_error
+
+    @pytest.mark.asyncio
+    async def test_lost_lease_cancels_run(self, session_factory):
+        """Test that a worker stops its run when another worker has taken the job"""
+        queue = JobQueue(session_factory=session_factory, lease_seconds=60)
+        _create_analysis(session_factory, queue)
+        cancelled = asyncio.Event()
+
+        async def runner(analysis_id, company_name):
+            # Simulate the job being reclaimed by another worker mid-run
+            job = _job(session_factory, analysis_id)
+            _expire_lease(session_factory, job.id)
+            assert queue.claim("worker-b") is not None
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        worker = AnalysisWorker(
+            queue=queue, concurrency=1, poll_interval=0.01,
+            heartbeat_interval=0.02, worker_id="worker-a", runner=runner
+        )
+        run = asyncio.create_task(worker.run())
+        await asyncio.wait_for(cancelled.wait(), timeout=2)
+        worker.stop()
+        await asyncio.wait_for(run, timeout=2)
+
+        assert cancelled.is_set()
+
+    @pytest.mark.asyncio
+    async def test_hard_shutdown_returns_job_to_queue(self, session_factory):
+        """Test that a run cancelled by shutdown releases its job without using up an attempt"""
+        queue = JobQueue(session_factory=session_factory, lease_seconds=60)
+        analysis_id = _create_analysis(session_factory, queue)
+        started = asyncio.Event()
+
+        async def runner(analysis_id, company_name):
+            started.set()
+            await asyncio.sleep(10)
+
+        worker = AnalysisWorker(
+            queue=queue, concurrency=1, poll_interval=0.01,
+            heartbeat_interval=10, worker_id="worker-a", runner=runner
+        )
+        run = asyncio.create_task(worker.run())
+        await asyncio.wait_for(started.wait(), timeout=2)
+        # Drain, then cancel the worker while it waits for the running job
+        worker.stop()
+        await asyncio.sleep(0.05)
+        run.cancel()
+        await asyncio.wait_for(asyncio.gather(run, return_exceptions=True), timeout=2)
+
+        job = _job(session_factory, analysis_id)
+        assert job.status == JobStatus.QUEUED
+        assert job.attempts == 0
+        assert job.worker_id is None
+        assert queue.claim("worker-b") is not None
+
+    @pytest.mark.asyncio
+    async def test_second_stop_cancels_running_jobs(self, session_factory):
+        """Test that stopping a draining worker again cancels its runs and requeues their jobs"""
+        queue = JobQueue(session_factory=session_factory, lease_seconds=60)
+        analysis_id = _create_analysis(session_factory, queue)
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def runner(analysis_id, company_name):
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        worker = AnalysisWorker(
+            queue=queue, concurrency=1, poll_interval=0.01,
+            heartbeat_interval=10, worker_id="worker-a", runner=runner
+        )
+        run = asyncio.create_task(worker.run())
+        await asyncio.wait_for(started.wait(), timeout=2)
+        worker.stop()
+        await asyncio.sleep(0.05)
+        assert not run.done()
+        worker.stop()
+        await asyncio.wait_for(run, timeout=2)
+
+        assert cancelled.is_set()
+        job = _job(session_factory, analysis_id)
+        assert job.status == JobStatus.QUEUED
+        assert job.attempts == 0
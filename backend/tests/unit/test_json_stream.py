@@ -0,0 +1,66 @@
+import json
+import pytest
+from app.agents.json_stream import IncrementalArrayParser
+
+
+def feed_in_chunks(parser, text, size):
+    """Feed text in fixed-size chunks, recording after which chunk each element appeared"""
+    emitted = []
+    for start in range(0, len(text), size):
+        for element in parser.feed(text[start:start + size]):
+            emitted.append((start + size, element))
+    return emitted
+
+
+@pytest.mark.unit
+class TestIncrementalArrayParser:
+    """Unit tests for the streaming JSON array parser"""
+    
+    def test_scenarios_emitted_as_each_completes(self):
+        """Test each scenario is emitted once its closing brace arrives"""
+        scenarios = [
+            {"title": f"Scenario {i}", "description": "Line one\nLine two {with braces} and [brackets]", "likelihood": 0.25}
+            for i in range(4)
+        ]
+        text = json.dumps({"scenarios": scenarios}, indent=2)
+        parser = IncrementalArrayParser("scenarios")
+        
+        emitted = feed_in_chunks(parser, text, size=7)
+        
+        assert [element for _, element in emitted] == scenarios
+        # The first scenario is available long before the document ends
+        assert emitted[0][0] < len(text) / 3
+        assert parser.done
+    
+    def test_strategies_shape(self):
+        """Test the strategies shape and escaped quotes inside strings"""
+        text = '{"strategies": [{"name": "Say \\"hi\\"", "description": "x"}, {"name": "B", "description": "}"}]}'
+        parser = IncrementalArrayParser("strategies")
+        
+        elements = [e for chunk in text for e in parser.feed(chunk)]
+        
+        assert elements == [{"name": 'Say "hi"', "description": "x"}, {"name": "B", "description": "}"}]
+    
+    def test_other_keys_are_ignored(self):
+        """Test arrays under other keys or nested deeper are not emitted"""
+        text = json.dumps({
+            "notes": [{"title": "not a scenario"}],
+            "scenarios": [{"title": "A", "tags": [{"nested": True}]}]
+        })
+        parser = IncrementalArrayParser("scenarios")
+        
+        assert parser.feed(text) == [{"title": "A", "tags": [{"nested": True}]}]
+    
+    def test_bare_array(self):
+        """Test a top-level array is accepted"""
+        parser = IncrementalArrayParser("scenarios")
+        
+        assert parser.feed('[{"title": "A"}, {"title": "B"}]') == [{"title": "A"}, {"title": "B"}]
+    
+    def test_raw_control_characters_tolerated(self):
+        """Test raw newlines inside strings (common in LLM output) still decode"""
+        parser = IncrementalArrayParser("scenarios")
+        
+        assert parser.feed('{"scenarios": [{"title": "A", "description": "line\none"}]}') == [
+            {"title": "A", "description": "line\none"}
+        ]
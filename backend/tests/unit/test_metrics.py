@@ -0,0 +1,69 @@
+"""
+Unit tests for the metrics registry
+"""
+import pytest
+
+from app.core.metrics import MetricsRegistry
+
+
+@pytest.mark.unit
+class TestMetricsRegistry:
+    """Test cases for MetricsRegistry"""
+
+    def test_renders_set_and_callback_gauges(self):
+        """Test the Prometheus text output for plain, labelled and callback gauges"""
+        registry = MetricsRegistry()
+        registry.gauge("queue_depth", "Jobs waiting").set(3)
+        pool = registry.gauge("pool_connections", "Connections by state")
+        pool.set(2, state="idle")
+        pool.set(5, state='in "use"')
+        registry.gauge("queued_bytes", "Bytes held", lambda: 1234567)
+
+        assert registry.render() == (
+            "# HELP pool_connections Connections by state\n"
+            "# TYPE pool_connections gauge\n"
+            'pool_connections{state="idle"} 2\n'
+            'pool_connections{state="in \\"use\\""} 5\n'
+            "# HELP queue_depth Jobs waiting\n"
+            "# TYPE queue_depth gauge\n"
+            "queue_depth 3\n"
+            "# HELP queued_bytes Bytes held\n"
+            "# TYPE queued_bytes gauge\n"
+            "queued_bytes 1234567\n"
+        )
+
+    def test_gauge_is_shared_by_name(self):
+        """Test that registering a name twice returns the same gauge"""
+        registry = MetricsRegistry()
+        first = registry.gauge("in_flight", "Requests in flight")
+        first.inc(2)
+        first.dec()
+
+        assert registry.gauge("in_flight", "Requests in flight") is first
+        assert first.value() == 1.0
+
+    def test_labelled_callback_and_broken_callback(self):
+        """Test labelled callback readings, and that a failing callback is skipped"""
+        registry = MetricsRegistry()
+        gauge = registry.gauge("limit", "Concurrency limit", lambda: [({"name": "groq"}, 4), ({"name": "tavily"}, 2.5)])
+        registry.gauge("broken", "Always fails", lambda: 1 / 0)
+
+        output = registry.render()
+
+        assert gauge.value(name="tavily") == 2.5
+        assert 'limit{name="groq"} 4\n' in output
+        assert "broken" not in output
+
+    def test_counter(self):
+        """Test counters render with the counter type and refuse to go down"""
+        registry = MetricsRegistry()
+        counter = registry.counter("requests_total", "Requests sent")
+        counter.inc(client="groq")
+        counter.inc(2, client="groq")
+
+        assert 'requests_total{client="groq"} 3\n' in registry.render()
+        assert "# TYPE requests_total counter\n" in registry.render()
+        with pytest.raises(ValueError):
+            counter.inc(-1)
+        with pytest.raises(ValueError):
+            registry.gauge("requests_total", "Same name, other type")
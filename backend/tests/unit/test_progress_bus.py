@@ -0,0 +1,239 @@
+"""
+Unit tests for the progress bus
+"""
+import pytest
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from app.services.progress_bus import (
+    InMemoryProgressBus, PostgresProgressBus, ProgressBus, Subscription, MAX_NOTIFY_PAYLOAD_BYTES, build_progress_bus,
+    next_event_id
+)
+
+
+@pytest.mark.unit
+class TestInMemoryProgressBus:
+    """Test cases for InMemoryProgressBus"""
+
+    @pytest.mark.asyncio
+    async def test_publish_reaches_every_subscriber_of_the_analysis(self):
+        """Test that events fan out to all subscribers of one analysis only"""
+        bus = InMemoryProgressBus()
+        first = await bus.subscribe(1)
+        second = await bus.subscribe(1)
+        other = await bus.subscribe(2)
+
+        await bus.publish(1, {"event": "status", "data": {"message": "hello"}})
+
+        assert (await first.get(timeout=1))["data"]["message"] == "hello"
+        assert (await second.get(timeout=1))["event"] == "status"
+        with pytest.raises(asyncio.TimeoutError):
+            await other.get(timeout=0.05)
+
+    def test_base_bus_requires_publish(self):
+        """Test a bus without publish() cannot be created"""
+        with pytest.raises(TypeError):
+            ProgressBus()
+
+    @pytest.mark.asyncio
+    async def test_unsubscribe_stops_delivery(self):
+        """Test that unsubscribed listeners are dropped"""
+        bus = InMemoryProgressBus()
+        subscription = await bus.subscribe(1)
+        assert bus.subscriber_count(1) == 1
+
+        await bus.unsubscribe(subscription)
+        await bus.publish(1, {"event": "status", "data": {}})
+
+        assert bus.subscriber_count() == 0
+        with pytest.raises(asyncio.TimeoutError):
+            await subscription.get(timeout=0.05)
+
+    @pytest.mark.asyncio
+    async def test_resubscribing_replays_events_after_last_id(self):
+        """Test that a listener resuming from an event id gets only what it missed, in order"""
+        bus = InMemoryProgressBus()
+        first = await bus.subscribe(1)
+        for step in range(3):
+            await bus.publish(1, {"event": "progress", "data": {"step": step}})
+        seen = await first.get(timeout=1)
+        await bus.unsubscribe(first)
+
+        resumed = await bus.subscribe(1, last_event_id=seen["id"])
+        await bus.publish(1, {"event": "analysis_complete", "data": {}})
+
+        events = [await resumed.get(timeout=1) for _ in range(3)]
+        assert [event["data"].get("step") for event in events] == [1, 2, None]
+        assert seen["id"] < events[0]["id"] < events[1]["id"] < events[2]["id"]
+
+    @pytest.mark.asyncio
+    async def test_replay_buffer_is_bounded(self):
+        """Test that only the newest events of the newest analyses are kept"""
+        bus = InMemoryProgressBus(replay_buffer_size=3, replay_max_analyses=2)
+        for step in range(10):
+            await bus.publish(1, {"event": "progress", "data": {"step": step}})
+        assert [event["data"]["step"] for event in bus.replay(1, 0)] == [7, 8, 9]
+
+        await bus.publish(2, {"event": "progress", "data": {}})
+        await bus.publish(3, {"event": "progress", "data": {}})
+
+        assert bus.replay(1, 0) == []
+        assert len(bus.replay(3, 0)) == 1
+
+    @pytest.mark.asyncio
+    async def test_reap_evicts_finished_and_abandoned_buffers(self):
+        """Test that finished analyses go after finished_ttl and silent ones after abandoned_ttl"""
+        bus = InMemoryProgressBus(finished_ttl=10, abandoned_ttl=100)
+        await bus.publish(1, {"event": "analysis_complete", "data": {}})
+        await bus.publish(2, {"event": "research_start", "data": {}})
+        now = bus._history[2].updated_at
+
+        assert bus.reap(now + 5) == 0
+        assert bus.reap(now + 50) == 1
+        assert bus.replay(1, 0) == [] and len(bus.replay(2, 0)) == 1
+        assert bus.reap(now + 150) == 1
+        assert bus.buffered_analyses() == 0
+
+    @pytest.mark.asyncio
+    async def test_memory_gauges(self):
+        """Test that queued events and bytes cover buffers and undelivered subscriber events"""
+        bus = InMemoryProgressBus()
+        subscription = await bus.subscribe(1)
+        await bus.publish(1, {"event": "status", "data": {"message": "x" * 100}})
+        frame = bus.replay(1, 0)[0].frame
+
+        assert bus.queued_events() == 2
+        # The buffered and the queued event are the same object
+        assert bus.queued_bytes() == len(frame)
+
+        await subscription.get(timeout=1)
+        await bus.close()
+        assert bus.queued_events() == 0
+        assert bus.queued_bytes() == 0
+
+    def test_event_ids_increase(self):
+        """Test that event ids are strictly increasing"""
+        ids = [next_event_id() for _ in range(1000)]
+        assert ids == sorted(set(ids))
+
+    def test_build_rejects_unknown_backend(self):
+        """Test that an unknown backend name fails loudly"""
+        assert isinstance(build_progress_bus("memory"), InMemoryProgressBus)
+        with pytest.raises(ValueError):
+            build_progress_bus("redis")
+
+
+@pytest.mark.unit
+class TestBroadcast:
+    """Test cases for fan-out and slow subscribers"""
+
+    @pytest.mark.asyncio
+    async def test_subscribers_share_one_encoded_event(self):
+        """Test that every subscriber gets the same event object and SSE frame"""
+        bus = InMemoryProgressBus()
+        subscriptions = [await bus.subscribe(1) for _ in range(3)]
+
+        await bus.publish(1, {"event": "scenario_ready", "data": {"message": "Scenario 1"}})
+
+        events = [await subscription.get(timeout=1) for subscription in subscriptions]
+        assert all(event is events[0] for event in events)
+        assert all(event.frame is events[0].frame for event in events)
+        assert events[0].frame == (
+            f"event: scenario_ready\nid: {events[0]['id']}\ndata: {json.dumps({'message': 'Scenario 1'})}\n\n"
+        )
+
+    @pytest.mark.asyncio
+    async def test_slow_subscriber_does_not_hold_back_others(self):
+        """Test that a full queue only affects its own subscriber"""
+        bus = InMemoryProgressBus(subscriber_queue_size=5)
+        slow = await bus.subscribe(1)
+        fast = await bus.subscribe(1)
+
+        for step in range(20):
+            await bus.publish(1, {"event": "scenario_ready", "data": {"step": step}})
+            assert (await fast.get(timeout=1))["data"]["step"] == step
+        await bus.publish(1, {"event": "analysis_complete", "data": {}})
+
+        events = [await slow.get(timeout=1) for _ in range(len(slow))]
+        assert [event["data"].get("step") for event in events] == [16, 17, 18, 19, None]
+        assert slow.dropped == 16
+        assert fast.dropped == 0
+
+    def test_overflow_coalesces_progress_and_keeps_terminal_events(self):
+        """Test that deltas merge, status messages keep the latest, and terminal events are never dropped"""
+        subscription = Subscription(1, max_pending=2)
+        subscription.put({"id": 1, "event": "analysis_failed", "data": {}})
+        subscription.put({"id": 2, "event": "research_context_delta", "data": {"message": "Hel"}})
+        subscription.put({"id": 3, "event": "research_context_delta", "data": {"message": "lo"}})
+        assert [event["id"] for event in subscription._events] == [1, 3]
+        assert subscription._events[-1]["data"]["message"] == "Hello"
+
+        subscription.put({"id": 4, "event": "strategy_progress", "data": {"message": "1/4"}})
+        subscription.put({"id": 5, "event": "strategy_progress", "data": {"message": "2/4"}})
+        subscription.put({"id": 6, "event": "analysis_complete", "data": {}})
+
+        assert [event["id"] for event in subscription._events] == [1, 6]
+        assert subscription.dropped == 4
+
+
+@pytest.mark.unit
+class TestPostgresProgressBus:
+    """Test cases for PostgresProgressBus"""
+
+    def test_encode_keeps_small_payloads(self):
+        """Test that payloads under the NOTIFY limit are sent unchanged"""
+        event = {"event": "scenario_ready", "data": {"message": "Scenario 1", "scenario": {"title": "A"}}}
+
+        payload = json.loads(PostgresProgressBus.encode(7, event))
+
+        assert payload == {"analysis_id": 7, **event}
+
+    def test_encode_truncates_oversized_payloads(self):
+        """Test that payloads over the NOTIFY limit drop their extra data"""
+        event = {"event": "research_context_delta", "data": {"message": "m", "delta": "x" * 20000}}
+
+        encoded = PostgresProgressBus.encode(7, event)
+        payload = json.loads(encoded)
+
+        assert len(encoded.encode("utf-8")) <= MAX_NOTIFY_PAYLOAD_BYTES
+        assert payload["event"] == "research_context_delta"
+        assert payload["data"]["truncated"] is True
+        assert "delta" not in payload["data"]
+
+    @pytest.mark.asyncio
+    async def test_notifications_are_routed_to_local_subscribers(self):
+        """Test that LISTEN notifications are dispatched by analysis id"""
+        bus = PostgresProgressBus(dsn="postgresql://unused")
+        with patch.object(bus, "_ensure_listening"):
+            subscription = await bus.subscribe(3)
+        notifies = [
+            SimpleNamespace(payload=PostgresProgressBus.encode(3, {"event": "status", "data": {"message": "hi"}})),
+            SimpleNamespace(payload=PostgresProgressBus.encode(4, {"event": "status", "data": {"message": "other"}})),
+            SimpleNamespace(payload="not json")
+        ]
+        bus._listen_conn = SimpleNamespace(poll=lambda: None, notifies=notifies)
+
+        bus._on_readable()
+
+        event = await subscription.get(timeout=1)
+        assert event == {"event": "status", "data": {"message": "hi"}}
+        with pytest.raises(asyncio.TimeoutError):
+            await subscription.get(timeout=0.05)
+
+    @pytest.mark.asyncio
+    async def test_notified_event_ids_are_kept_for_replay(self):
+        """Test that ids assigned by the publishing process are buffered on receipt"""
+        bus = PostgresProgressBus(dsn="postgresql://unused")
+        event = {"id": 41, "event": "status", "data": {"message": "hi"}}
+        bus._listen_conn = SimpleNamespace(
+            poll=lambda: None, notifies=[SimpleNamespace(payload=PostgresProgressBus.encode(3, event))]
+        )
+
+        bus._on_readable()
+        with patch.object(bus, "_ensure_listening"):
+            subscription = await bus.subscribe(3, last_event_id=40)
+
+        assert await subscription.get(timeout=1) == event
+        assert bus.replay(3, 41) == []
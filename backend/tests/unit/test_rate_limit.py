@@ -0,0 +1,109 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from app.core.rate_limit import RateLimiter, TokenBucket, estimate_tokens
+
+_real_sleep = asyncio.sleep
+
+
+class FakeClock:
+    """Monotonic clock advanced by asyncio.sleep"""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def monotonic(self):
+        return self.now
+    
+    async def sleep(self, seconds):
+        self.now += seconds
+        await _real_sleep(0)
+
+
+@pytest.fixture
+def clock():
+    fake = FakeClock()
+    with patch('app.core.rate_limit.time.monotonic', fake.monotonic), \
+         patch('app.core.rate_limit.asyncio.sleep', fake.sleep):
+        yield fake
+
+
+@pytest.mark.unit
+class TestRateLimiter:
+    """Unit tests for the client-side rate limiter"""
+    
+    def test_estimate_tokens(self):
+        """Test estimates include the prompt and the full completion budget"""
+        messages = [{"role": "user", "content": "x" * 400}]
+        assert estimate_tokens(messages, max_tokens=1000) == 100 + 4 + 1000
+    
+    def test_token_bucket_refills(self, clock):
+        """Test the bucket refills at its rate up to capacity"""
+        bucket = TokenBucket(capacity=60, refill_per_second=1)
+        bucket.consume(60)
+        assert bucket.wait_time(10) == 10
+        clock.now += 10
+        assert bucket.wait_time(10) == 0
+        clock.now += 1000
+        bucket.consume(0)
+        assert bucket.tokens == 60
+    
+    @pytest.mark.asyncio
+    async def test_requests_per_minute_budget(self, clock):
+        """Test requests beyond the per-minute budget are delayed"""
+        limiter = RateLimiter(requests_per_minute=2)
+        start = clock.now
+        
+        for _ in range(3):
+            await limiter.acquire()
+        
+        # The third request waits for one request's worth of refill (30s)
+        assert clock.now - start == pytest.approx(30)
+    
+    @pytest.mark.asyncio
+    async def test_tokens_per_minute_budget_and_usage_correction(self, clock):
+        """Test token reservations wait for budget and are corrected by actual usage"""
+        limiter = RateLimiter(tokens_per_minute=6000)
+        
+        reserved = await limiter.acquire(5000)
+        assert reserved == 5000
+        # The API reports much lower usage, so the difference is returned
+        limiter.record_usage(reserved, 1000)
+        
+        start = clock.now
+        await limiter.acquire(5000)
+        assert clock.now == start
+    
+    @pytest.mark.asyncio
+    async def test_oversized_request_is_clamped(self, clock):
+        """Test a request larger than the whole budget still gets through"""
+        limiter = RateLimiter(tokens_per_minute=1000)
+        
+        reserved = await limiter.acquire(5000)
+        
+        assert reserved == 1000
+    
+    @pytest.mark.asyncio
+    async def test_callers_served_in_arrival_order(self, clock):
+        """Test queued callers are granted in FIFO order"""
+        limiter = RateLimiter(tokens_per_minute=600)
+        order = []
+        
+        async def caller(i, tokens):
+            await limiter.acquire(tokens)
+            order.append(i)
+        
+        await limiter.acquire(600)
+        # A large request queued first must not be overtaken by small ones
+        await asyncio.gather(caller(0, 500), caller(1, 10), caller(2, 10))
+        
+        assert order == [0, 1, 2]
+    
+    @pytest.mark.asyncio
+    async def test_disabled_limiter_never_waits(self, clock):
+        """Test a limiter without budgets returns immediately"""
+        limiter = RateLimiter()
+        
+        assert not limiter.enabled
+        assert await limiter.acquire(10**6) == 0
+        assert clock.now == 1000.0
@@ -1,6 +1,7 @@
+import asyncio
 import pytest
 from unittest.mock import AsyncMock, patch
-from app.agents.research_agent import research_agent
+from app.agents.research_agent import research_agent, search_questions
 
 
 @pytest.mark.unit
@@ -160,3 +161,86 @@ class TestResearchAgent:
             assert company_name in result["company_context"]
             assert "Research completed" in result["company_context"]
 
+    
+    @pytest.mark.asyncio
+    async def test_search_questions_preserves_order(self):
+        """Test concurrent searches return results in question order"""
+        questions = ["Slow question?", "Fast question?", "Medium question?"]
+        delays = {"Slow question?": 0.05, "Fast question?": 0.0, "Medium question?": 0.02}
+        
+        async def fake_search(query, max_results=5):
+            await asyncio.sleep(delays[query])
+            return [{"title": query}]
+        
+        with patch('app.agents.research_agent.tavily_service') as mock_tavily:
+            mock_tavily.search = AsyncMock(side_effect=fake_search)
+            
+            results = await search_questions(questions, max_concurrency=3, timeout=5)
+            
+            assert list(results.keys()) == questions
+            for question in questions:
+                assert results[question] == [{"title": question}]
+    
+    @pytest.mark.asyncio
+    async def test_search_questions_respects_concurrency_limit(self):
+        """Test no more than max_concurrency searches run at once"""
+        questions = [f"Question {i}?" for i in range(6)]
+        in_flight = 0
+        peak = 0
+        
+        async def fake_search(query, max_results=5):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return []
+        
+        with patch('app.agents.research_agent.tavily_service') as mock_tavily:
+            mock_tavily.search = AsyncMock(side_effect=fake_search)
+            
+            await search_questions(questions, max_concurrency=2, timeout=5)
+            
+            assert peak == 2
+            assert mock_tavily.search.call_count == 6
+    
+    @pytest.mark.asyncio
+    async def test_search_questions_timeout_yields_empty(self):
+        """Test a search exceeding the per-question timeout yields no results"""
+        async def fake_search(query, max_results=5):
+            if query == "Hangs?":
+                await asyncio.sleep(10)
+            return [{"title": query}]
+        
+        with patch('app.agents.research_agent.tavily_service') as mock_tavily:
+            mock_tavily.search = AsyncMock(side_effect=fake_search)
+            
+            results = await search_questions(["Hangs?", "Works?"], max_concurrency=2, timeout=0.05)
+            
+            assert results["Hangs?"] == []
+            assert results["Works?"] == [{"title": "Works?"}]
+    
+    @pytest.mark.asyncio
+    async def test_research_agent_streams_context(self):
+        """Test the company context is streamed to the chunk callback"""
+        received = []
+        
+        async def fake_stream(**kwargs):
+            for chunk in ["Test Company ", "is a ", "leader."]:
+                yield chunk
+        
+        async def on_chunk(chunk):
+            received.append(chunk)
+        
+        with patch('app.agents.research_agent.groq_service') as mock_groq, \
+             patch('app.agents.research_agent.tavily_service') as mock_tavily:
+            mock_groq.generate = AsyncMock(return_value='{"questions": ["Question 1?"]}')
+            mock_groq.generate_stream = fake_stream
+            mock_tavily.search = AsyncMock(return_value=[])
+            
+            result = await research_agent("Test Company", on_context_chunk=on_chunk)
+            
+            assert received == ["Test Company ", "is a ", "leader."]
+            assert result["company_context"] == "Test Company is a leader."
+            # Only the questions call goes through the non-streaming API
+            assert mock_groq.generate.call_count == 1
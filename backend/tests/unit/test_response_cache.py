@@ -0,0 +1,189 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import patch
+from app.services.response_cache import (
+    ResponseCache,
+    CacheBackend,
+    MemoryCacheBackend,
+    DiskCacheBackend,
+    build_cache_backend
+)
+
+
+@pytest.mark.unit
+class TestResponseCache:
+    """Unit tests for the response cache and its backends"""
+    
+    def test_key_is_content_addressed(self):
+        """Test identical requests share a key and any change produces a new one"""
+        cache = ResponseCache(MemoryCacheBackend(), namespace="groq", ttl=60)
+        request = {"model": "m", "messages": [{"role": "user", "content": "hi"}], "temperature": 0.7}
+        
+        assert cache.make_key(request) == cache.make_key(dict(reversed(list(request.items()))))
+        assert cache.make_key(request) != cache.make_key({**request, "temperature": 0.8})
+    
+    @pytest.mark.asyncio
+    async def test_hit_miss_counters(self):
+        """Test hits and misses are counted"""
+        cache = ResponseCache(MemoryCacheBackend(), namespace="groq", ttl=60)
+        
+        assert await cache.get("k") is None
+        await cache.set("k", "value")
+        assert await cache.get("k") == "value"
+        
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+    
+    @pytest.mark.asyncio
+    async def test_memory_backend_lru_eviction(self):
+        """Test the least recently used entry is evicted first"""
+        backend = MemoryCacheBackend(max_entries=2)
+        await backend.set("a", 1, ttl=60)
+        await backend.set("b", 2, ttl=60)
+        await backend.get("a")  # "b" is now least recently used
+        await backend.set("c", 3, ttl=60)
+        
+        assert await backend.get("a") == 1
+        assert await backend.get("b") is None
+        assert await backend.get("c") == 3
+    
+    @pytest.mark.asyncio
+    async def test_memory_backend_ttl_expiry(self):
+        """Test expired entries are not returned"""
+        backend = MemoryCacheBackend()
+        await backend.set("a", 1, ttl=60)
+        
+        with patch('app.services.response_cache.time.time', return_value=time.time() + 61):
+            assert await backend.get("a") is None
+        assert len(backend) == 0
+    
+    @pytest.mark.asyncio
+    async def test_disk_backend_roundtrip_and_eviction(self, tmp_path):
+        """Test the disk backend persists values and bounds the number of files"""
+        backend = DiskCacheBackend(str(tmp_path), max_entries=2)
+        await backend.set("aa11", {"text": "one"}, ttl=60)
+        await backend.set("bb22", {"text": "two"}, ttl=60)
+        
+        # A new backend on the same directory sees the same entries
+        assert await DiskCacheBackend(str(tmp_path)).get("aa11") == {"text": "one"}
+        
+        await backend.set("cc33", {"text": "three"}, ttl=60)
+        assert len(list(tmp_path.glob("*/*.json"))) == 2
+        assert await backend.get("cc33") == {"text": "three"}
+    
+    @pytest.mark.asyncio
+    async def test_disk_backend_sweeps_only_past_capacity(self, tmp_path):
+        """Test writes below max_entries skip the directory scan and a sweep leaves headroom"""
+        backend = DiskCacheBackend(str(tmp_path), max_entries=10)
+        with patch.object(backend, "_evict", wraps=backend._evict) as evict:
+            for i in range(10):
+                await backend.set(f"k{i:02d}", i, ttl=60)
+            assert evict.call_count == 0
+            
+            await backend.set("k10", 10, ttl=60)
+            assert evict.call_count == 1
+            assert len(list(tmp_path.glob("*/*.json"))) == 9
+            
+            await backend.set("k11", 11, ttl=60)
+            assert evict.call_count == 1
+    
+    @pytest.mark.asyncio
+    async def test_disk_backend_concurrent_writes_of_one_key(self, tmp_path):
+        """Test concurrent writers of a key each use their own temp file"""
+        backend = DiskCacheBackend(str(tmp_path))
+        await asyncio.gather(*(backend.set("aa11", {"writer": i}, ttl=60) for i in range(20)))
+        
+        assert (await backend.get("aa11"))["writer"] in range(20)
+        assert list(tmp_path.glob("*/*.tmp")) == []
+    
+    def test_backend_interface_is_abstract(self):
+        """Test a backend missing part of the interface cannot be created"""
+        class GetOnlyBackend(CacheBackend):
+            async def get(self, key):
+                return None
+        
+        with pytest.raises(TypeError):
+            GetOnlyBackend()
+    
+    @pytest.mark.asyncio
+    async def test_backend_errors_are_misses(self):
+        """Test a failing backend never fails the caller"""
+        class BrokenBackend(MemoryCacheBackend):
+            async def get(self, key):
+                raise OSError("disk gone")
+        
+        cache = ResponseCache(BrokenBackend(), namespace="groq", ttl=60)
+        assert await cache.get("k") is None
+        assert cache.misses == 1
+    
+    def test_build_cache_backend(self, tmp_path):
+        """Test backends are created by name"""
+        assert isinstance(build_cache_backend("memory", max_entries=10), MemoryCacheBackend)
+        assert isinstance(build_cache_backend("disk", max_entries=10, directory=str(tmp_path)), DiskCacheBackend)
+        with pytest.raises(ValueError):
+            build_cache_backend("redis", max_entries=10)
+    
+    @pytest.mark.asyncio
+    async def test_postgres_backend_roundtrip_and_lru(self, tmp_path):
+        """Test the table-backed cache shares entries and evicts least recently used rows"""
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.models.cache_entry import CacheEntry
+        from app.services.response_cache import PostgresCacheBackend
+        
+        engine = create_engine(f"sqlite:///{tmp_path / 'cache.db'}")
+        CacheEntry.__table__.create(bind=engine)
+        session_factory = sessionmaker(bind=engine)
+        
+        backend = PostgresCacheBackend("tavily", max_entries=2, session_factory=session_factory, sweep_interval=0)
+        other_namespace = PostgresCacheBackend("groq", max_entries=2, session_factory=session_factory, sweep_interval=0)
+        
+        await backend.set("a", [{"title": "A"}], ttl=60)
+        await backend.set("b", [{"title": "B"}], ttl=60)
+        await other_namespace.set("a", "groq value", ttl=60)
+        
+        # Another instance (e.g. another process) sees the same rows
+        shared = PostgresCacheBackend("tavily", session_factory=session_factory, sweep_interval=0)
+        assert await shared.get("a") == [{"title": "A"}]
+        assert await other_namespace.get("a") == "groq value"
+        
+        await backend.set("c", [{"title": "C"}], ttl=60)  # evicts "b", the least recently used
+        assert await backend.get("b") is None
+        assert await backend.get("a") == [{"title": "A"}]
+        
+        await backend.set("expired", [], ttl=-1)
+        assert await backend.get("expired") is None
+        engine.dispose()
+    
+    @pytest.mark.asyncio
+    async def test_postgres_backend_batches_bookkeeping(self, tmp_path):
+        """Test reads do not write and sweeps run once per interval"""
+        from sqlalchemy import create_engine, event
+        from sqlalchemy.orm import sessionmaker
+        from app.models.cache_entry import CacheEntry
+        from app.services.response_cache import PostgresCacheBackend
+        
+        engine = create_engine(f"sqlite:///{tmp_path / 'cache.db'}")
+        CacheEntry.__table__.create(bind=engine)
+        backend = PostgresCacheBackend("groq", max_entries=2, session_factory=sessionmaker(bind=engine))
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+        
+        await backend.set("a", "A", ttl=60)  # First write sweeps
+        statements.clear()
+        await backend.set("b", "B", ttl=60)
+        for _ in range(3):
+            assert await backend.get("a") == "A"
+        
+        assert not any("count(" in statement.lower() for statement in statements)
+        assert not any(statement.lstrip().upper().startswith(("UPDATE", "DELETE")) for statement in statements)
+        
+        # The next sweep saves the batched access time: "a" was used last, so "b" goes
+        backend._last_sweep = None
+        await backend.set("c", "C", ttl=60)
+        assert await backend.get("a") == "A"
+        assert await backend.get("b") is None
+        engine.dispose()
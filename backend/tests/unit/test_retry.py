@@ -0,0 +1,148 @@
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import patch
+from app.core.retry import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    parse_duration,
+    parse_retry_after,
+    server_retry_delay
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.unit
+class TestRetryHeaders:
+    """Unit tests for server-provided retry delays"""
+    
+    def test_parse_duration(self):
+        """Test Groq-style reset durations"""
+        assert parse_duration("7.66s") == pytest.approx(7.66)
+        assert parse_duration("2m59.56s") == pytest.approx(179.56)
+        assert parse_duration("1h2m3s") == pytest.approx(3723)
+        assert parse_duration("120ms") == pytest.approx(0.12)
+        assert parse_duration("12") == 12
+        assert parse_duration("soon") is None
+        assert parse_duration("5s later") is None
+    
+    def test_parse_retry_after(self):
+        """Test Retry-After in seconds and as an HTTP date"""
+        now = datetime(2026, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+        assert parse_retry_after("30") == 30
+        assert parse_retry_after("Thu, 01 Jan 2026 12:00:45 GMT", now=now) == 45
+        assert parse_retry_after("Thu, 01 Jan 2026 11:59:00 GMT", now=now) == 0
+        assert parse_retry_after("whenever") is None
+    
+    def test_server_retry_delay(self):
+        """Test Retry-After wins, else the reset of each exhausted budget"""
+        import httpx
+        
+        assert server_retry_delay(httpx.Headers({"Retry-After": "4", "x-ratelimit-reset-tokens": "9s"})) == 4
+        assert server_retry_delay(httpx.Headers({
+            "x-ratelimit-remaining-requests": "0",
+            "x-ratelimit-reset-requests": "2m",
+            "x-ratelimit-remaining-tokens": "0",
+            "x-ratelimit-reset-tokens": "7.5s"
+        })) == 120
+        # Budgets with headroom left are not what we are waiting for
+        assert server_retry_delay(httpx.Headers({
+            "x-ratelimit-remaining-requests": "12",
+            "x-ratelimit-reset-requests": "2m",
+            "x-ratelimit-remaining-tokens": "0",
+            "x-ratelimit-reset-tokens": "7.5s"
+        })) == 7.5
+        assert server_retry_delay(httpx.Headers({})) is None
+        assert server_retry_delay(None) is None
+
+
+@pytest.mark.unit
+class TestRetryPolicy:
+    """Unit tests for backoff delays"""
+    
+    def test_decorrelated_jitter_bounds(self):
+        """Test delays stay between the base and max delay, growing from the previous one"""
+        policy = RetryPolicy(base_delay=1.0, max_delay=10.0, budget=1000.0)
+        backoff = policy.backoff()
+        previous = 1.0
+        for _ in range(20):
+            delay = backoff.next_delay()
+            assert 1.0 <= delay <= min(10.0, previous * 3)
+            previous = delay
+    
+    def test_server_hint_is_followed_with_jitter(self):
+        """Test Retry-After sets the delay, plus at most one base delay of jitter"""
+        import httpx
+        
+        backoff = RetryPolicy(base_delay=0.5, max_delay=2.0, budget=100.0).backoff()
+        delay = backoff.next_delay(httpx.Headers({"Retry-After": "12"}))
+        assert 12 <= delay <= 12.5
+    
+    def test_budget_stops_retries(self):
+        """Test a delay that would exceed the budget gives up instead"""
+        import httpx
+        
+        backoff = RetryPolicy(base_delay=1.0, max_delay=1.0, budget=2.5).backoff()
+        assert backoff.next_delay() == 1.0
+        assert backoff.next_delay() == 1.0
+        assert backoff.next_delay() is None
+        assert RetryPolicy(budget=10.0).backoff().next_delay(httpx.Headers({"Retry-After": "60"})) is None
+
+
+@pytest.mark.unit
+class TestCircuitBreaker:
+    """Unit tests for the circuit breaker"""
+    
+    def test_opens_after_consecutive_failures(self):
+        """Test the circuit opens at the threshold and a success resets the count"""
+        breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=30, clock=FakeClock())
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.CLOSED
+        breaker.check()
+        
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        with pytest.raises(CircuitOpenError) as excinfo:
+            breaker.check()
+        assert excinfo.value.retry_after == 30
+    
+    def test_half_open_probe(self):
+        """Test one probe goes through after the timeout and its outcome decides the state"""
+        clock = FakeClock()
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30, clock=clock)
+        breaker.record_failure()
+        
+        clock.now = 30
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        breaker.check()
+        with pytest.raises(CircuitOpenError):
+            breaker.check()  # Only one probe at a time
+        
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        
+        clock.now = 60
+        breaker.check()
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+        breaker.check()
+    
+    def test_state_gauge(self):
+        """Test the breaker state is exported on /metrics"""
+        from app.core.metrics import metrics
+        
+        breaker = CircuitBreaker("gauge-test", failure_threshold=1, clock=FakeClock())
+        assert 'circuit_breaker_state{upstream="gauge-test"} 0' in metrics.render()
+        breaker.record_failure()
+        assert 'circuit_breaker_state{upstream="gauge-test"} 2' in metrics.render()
@@ -0,0 +1,246 @@
+import asyncio
+import pytest
+from app.core.singleflight import SingleFlight, request_key
+
+
+@pytest.mark.unit
+class TestSingleFlight:
+    """Unit tests for request coalescing"""
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_result(self):
+        """Test identical concurrent calls run the function once"""
+        group = SingleFlight("test")
+        calls = 0
+        release = asyncio.Event()
+        
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return "result"
+        
+        waiters = [asyncio.create_task(group.do("key", fetch)) for _ in range(3)]
+        await asyncio.sleep(0)
+        assert group.in_flight() == 1
+        release.set()
+        
+        assert await asyncio.gather(*waiters) == ["result"] * 3
+        assert calls == 1
+        assert group.coalesced == 2
+        assert group.in_flight() == 0
+        
+        # Finished calls are not cached
+        assert await group.do("key", fetch) == "result"
+        assert calls == 2
+    
+    @pytest.mark.asyncio
+    async def test_different_keys_run_separately(self):
+        """Test calls with different keys are not coalesced"""
+        group = SingleFlight("test")
+        
+        async def fetch(value):
+            await asyncio.sleep(0)
+            return value
+        
+        results = await asyncio.gather(group.do("a", lambda: fetch(1)), group.do("b", lambda: fetch(2)))
+        
+        assert results == [1, 2]
+        assert group.coalesced == 0
+    
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_cancel_shared_call(self):
+        """Test one waiter dropping leaves the call running for the others"""
+        group = SingleFlight("test")
+        release = asyncio.Event()
+        
+        async def fetch():
+            await release.wait()
+            return "result"
+        
+        first = asyncio.create_task(group.do("key", fetch))
+        second = asyncio.create_task(group.do("key", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        
+        assert await second == "result"
+        assert first.cancelled()
+    
+    @pytest.mark.asyncio
+    async def test_last_waiter_cancelling_cancels_call(self):
+        """Test the shared call is cancelled once nobody waits for it"""
+        group = SingleFlight("test")
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+        
+        async def fetch():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+        
+        waiters = [asyncio.create_task(group.do("key", fetch)) for _ in range(2)]
+        await started.wait()
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        await asyncio.sleep(0)
+        assert group.in_flight() == 0
+    
+    @pytest.mark.asyncio
+    async def test_exception_is_shared(self):
+        """Test every waiter gets the error of the shared call"""
+        group = SingleFlight("test")
+        
+        async def fetch():
+            await asyncio.sleep(0)
+            raise ValueError("upstream down")
+        
+        results = await asyncio.gather(*[group.do("key", fetch) for _ in range(2)], return_exceptions=True)
+        
+        assert all(isinstance(result, ValueError) for result in results)
+        assert group.in_flight() == 0
+    
+    def test_request_key_ignores_key_order(self):
+        """Test equal requests get equal keys regardless of dict order"""
+        assert request_key({"a": 1, "b": [1, 2]}) == request_key({"b": [1, 2], "a": 1})
+        assert request_key({"a": 1}) != request_key({"a": 2})
+    
+    @pytest.mark.asyncio
+    async def test_caller_after_last_cancel_starts_new_call(self):
+        """Test a caller arriving while a cancelled call winds down does not inherit its cancellation"""
+        group = SingleFlight("test")
+        started = asyncio.Event()
+        
+        async def slow():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            finally:
+                # Cleanup that outlives the waiter's cancellation
+                await asyncio.sleep(0.05)
+        
+        async def fast():
+            return "fresh"
+        
+        waiter = asyncio.create_task(group.do("key", slow))
+        await started.wait()
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        
+        # The cancelled call is still unwinding
+        assert await group.do("key", fast) == "fresh"
+    
+    def test_coalesced_calls_counter(self):
+        """Test coalesced calls are exported as a counter"""
+        from app.core.metrics import metrics
+        
+        group = SingleFlight("counter-test")
+        group.coalesced = 3
+        output = metrics.render()
+        
+        assert "# TYPE singleflight_coalesced_calls_total counter" in output
+        assert 'singleflight_coalesced_calls_total{group="counter-test"} 3' in output
+
+
+@pytest.mark.unit
+class TestSingleFlightStream:
+    """Unit tests for shared streams"""
+    
+    @staticmethod
+    def _source(chunks, gate, opened=None, error=None):
+        """Async generator yielding chunks, each once the gate is set"""
+        async def generate():
+            if opened is not None:
+                opened.append(True)
+            for chunk in chunks:
+                await gate.wait()
+                yield chunk
+            if error:
+                raise error
+        return generate
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_streams_share_one_source(self):
+        """Test subscribers get every item, a late one from the first item on"""
+        group = SingleFlight("test")
+        opened = []
+        released = asyncio.Queue()
+        
+        async def source():
+            opened.append(True)
+            while (chunk := await released.get()) is not None:
+                yield chunk
+        
+        first = group.stream("key", source)
+        released.put_nowait("a")
+        assert await first.__anext__() == "a"
+        
+        # Joins after "a" was produced
+        late = asyncio.create_task(_collect(group.stream("key", source)))
+        await asyncio.sleep(0)
+        for chunk in ("b", "c", None):
+            released.put_nowait(chunk)
+        
+        assert await _collect(first) == ["b", "c"]
+        assert await late == ["a", "b", "c"]
+        assert opened == [True]
+        assert group.coalesced == 1
+        assert group.in_flight() == 0
+    
+    @pytest.mark.asyncio
+    async def test_stream_error_reaches_every_subscriber(self):
+        """Test an error raised by the source is raised to all subscribers"""
+        group = SingleFlight("test")
+        gate = asyncio.Event()
+        gate.set()
+        source = self._source(["a"], gate, error=ValueError("broken stream"))
+        
+        results = await asyncio.gather(
+            _collect(group.stream("key", source)), _collect(group.stream("key", source)),
+            return_exceptions=True
+        )
+        
+        assert all(isinstance(result, ValueError) for result in results)
+    
+    @pytest.mark.asyncio
+    async def test_subscriber_leaving_keeps_stream_for_others(self):
+        """Test the source is cancelled only when its last subscriber stops"""
+        group = SingleFlight("test")
+        gate = asyncio.Event()
+        cancelled = asyncio.Event()
+        
+        async def source():
+            try:
+                yield "a"
+                await gate.wait()
+                yield "b"
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+        
+        first = group.stream("key", source)
+        second = group.stream("key", source)
+        assert await first.__anext__() == "a"
+        assert await second.__anext__() == "a"
+        await first.aclose()
+        gate.set()
+        assert await second.__anext__() == "b"
+        
+        gate.clear()
+        third = group.stream("other", source)
+        assert await third.__anext__() == "a"
+        await third.aclose()
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        await second.aclose()
+        assert group.in_flight() == 0
+
+
+async def _collect(stream):
+    return [item async for item in stream]
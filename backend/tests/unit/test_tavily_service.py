@@ -74,3 +74,63 @@ class TestTavilyService:
             
             assert len(results) == 0
 
+    
+    @pytest.mark.asyncio
+    async def test_search_cache_normalizes_queries(self, tavily_service):
+        """Test queries differing only in case and whitespace share a cache entry"""
+        from unittest.mock import MagicMock
+        from app.services.response_cache import ResponseCache, MemoryCacheBackend
+        
+        tavily_service.cache = ResponseCache(MemoryCacheBackend(), namespace="tavily", ttl=60)
+        api_response = MagicMock()
+        api_response.json.return_value = {"results": [{"title": "Cached", "url": "https://example.com"}]}
+        api_response.raise_for_status = lambda: None
+        
+        with patch.object(tavily_service.client, 'post', new_callable=AsyncMock) as mock_post:
+            mock_post.return_value = api_response
+            
+            first = await tavily_service.search("What is  ACME's business model?")
+            second = await tavily_service.search("  what is acme's\nbusiness model?  ")
+            assert first == second
+            assert mock_post.call_count == 1
+            
+            # max_results and search_depth are part of the key
+            await tavily_service.search("What is ACME's business model?", max_results=3)
+            await tavily_service.search("What is ACME's business model?", search_depth="basic")
+            assert mock_post.call_count == 3
+    
+    def test_normalize_query(self):
+        """Test case and whitespace folding"""
+        from app.services.tavily_service import normalize_query
+        
+        assert normalize_query("  Apple\tRevenue  2024 ") == "apple revenue 2024"
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_searches_share_one_call(self, tavily_service):
+        """Test identical in-flight searches are coalesced into one API call"""
+        import asyncio
+        from unittest.mock import MagicMock
+        
+        tavily_service.cache = None
+        release = asyncio.Event()
+        api_response = MagicMock()
+        api_response.json.return_value = {"results": [{"title": "Shared", "url": "https://example.com"}]}
+        api_response.raise_for_status = lambda: None
+        
+        async def slow_post(*args, **kwargs):
+            await release.wait()
+            return api_response
+        
+        with patch.object(tavily_service.client, 'post', side_effect=slow_post) as mock_post:
+            searches = [
+                asyncio.create_task(tavily_service.search("ACME revenue")),
+                asyncio.create_task(tavily_service.search("acme  revenue")),
+                asyncio.create_task(tavily_service.search("ACME revenue", use_cache=False))
+            ]
+            await asyncio.sleep(0)
+            release.set()
+            first, second, uncoalesced = await asyncio.gather(*searches)
+        
+        assert first == second == uncoalesced
+        # use_cache=False always makes its own call
+        assert mock_post.call_count == 2
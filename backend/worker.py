@@ -0,0 +1,83 @@
+"""
+Analysis worker process
+
+Claims queued analyses from the analysis_jobs table and runs the pipeline.
+Start as many of these as needed (on any machine that can reach the
+database) and set ANALYSIS_EXECUTION_MODE=queue on the API:
+
+    python worker.py
+"""
+import argparse
+import asyncio
+import logging
+import logging.handlers
+import signal
+from pathlib import Path
+
+from app.core.config import settings
+
+# Same format as the API, in a separate log file per worker host
+log_dir = Path(__file__).parent / "logs"
+log_dir.mkdir(exist_ok=True)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] [%(name)s] - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S',
+    handlers=[
+        logging.StreamHandler(),
+        logging.handlers.RotatingFileHandler(
+            log_dir / "worker.log",
+            maxBytes=10*1024*1024,  # 10MB per file
+            backupCount=20,
+            encoding='utf-8'
+        )
+    ]
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def main(concurrency: int):
+    from app.services.analysis_worker import AnalysisWorker
+
+    if settings.PROGRESS_BUS_BACKEND != "postgres":
+        # Progress published on the in-process memory bus never reaches the API,
+        # so SSE clients would see no progress at all, only a late status check
+        logger.error(
+            "PROGRESS_BUS_BACKEND must be 'postgres' for worker processes: with the "
+            f"'{settings.PROGRESS_BUS_BACKEND}' bus the API's SSE streams receive no progress "
+            "from this worker. Set PROGRESS_BUS_BACKEND=postgres on the API and the workers."
+        )
+        raise SystemExit(1)
+    worker = AnalysisWorker(concurrency=concurrency)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            # First signal drains: stop claiming and let running analyses finish.
+            # A second one cancels them and puts their jobs back in the queue.
+            # Jobs of a worker killed outright are reclaimed once their lease expires.
+            loop.add_signal_handler(sig, worker.stop)
+        except NotImplementedError:
+            pass  # Windows
+    try:
+        await worker.run()
+    finally:
+        from app.agents.checkpointing import close_checkpointer
+        from app.services.groq_service import groq_service
+        from app.services.tavily_service import tavily_service
+        await close_checkpointer()
+        await groq_service.close()
+        await tavily_service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run queued strategic futures analyses")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.WORKER_CONCURRENCY,
+        help="Analyses run at once by this process"
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency))
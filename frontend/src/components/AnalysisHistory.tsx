@@ -2,7 +2,7 @@ import { useAnalyses, Analysis } from '../hooks/useAnalysis';
 import { Link } from 'react-router-dom';
 
 export const AnalysisHistory = () => {
-  const { analyses, loading, error } = useAnalyses();
+  const { analyses, loading, loadingMore, error, hasMore, loadMore } = useAnalyses();
 
   if (loading) {
     return (
@@ -12,7 +12,7 @@ export const AnalysisHistory = () => {
     );
   }
 
-  if (error) {
+  if (error && analyses.length === 0) {
     return (
       <div className="bg-red-50 border border-red-200 rounded-lg p-4 text-center">
         <p className="text-red-800 font-medium">{error}</p>
@@ -95,6 +95,21 @@ export const AnalysisHistory = () => {
           </div>
         </Link>
       ))}
+      {error && (
+        <p className="text-center text-sm text-red-600">{error}</p>
+      )}
+      {hasMore && (
+        <div className="text-center pt-2">
+          <button
+            type="button"
+            onClick={loadMore}
+            disabled={loadingMore}
+            className="px-4 py-2 rounded-lg bg-white shadow-md text-primary-600 font-medium hover:shadow-lg transition-shadow disabled:opacity-50"
+          >
+            {loadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        </div>
+      )}
     </div>
   );
 };
@@ -1,13 +1,14 @@
 import { useEffect, useRef } from 'react';
 import { useNavigate, useLocation } from 'react-router-dom';
 import { useAnalysisStream } from '../hooks/useAnalysisStream';
+import { MarkdownRenderer } from './MarkdownRenderer';
 
 interface AnalysisStatusProps {
   analysisId: number | null;
 }
 
 export const AnalysisStatus = ({ analysisId }: AnalysisStatusProps) => {
-  const { status, error } = useAnalysisStream(analysisId);
+  const { status, error, researchContext, scenarios } = useAnalysisStream(analysisId);
   const navigate = useNavigate();
   const location = useLocation();
   const hasRedirectedRef = useRef(false);
@@ -78,6 +79,38 @@ export const AnalysisStatus = ({ analysisId }: AnalysisStatusProps) => {
       </div>
       
       <p className="text-sm text-gray-600">{status.message}</p>
+
+      {researchContext && (
+        <div className="mt-4">
+          <h4 className="text-sm font-semibold text-gray-800 mb-2">Company Context</h4>
+          <div className="max-h-64 overflow-y-auto p-3 bg-gray-50 rounded">
+            <MarkdownRenderer content={researchContext} className="text-sm" />
+          </div>
+        </div>
+      )}
+
+      {scenarios.length > 0 && (
+        <div className="mt-4">
+          <h4 className="text-sm font-semibold text-gray-800 mb-2">
+            Scenarios ({scenarios.length})
+          </h4>
+          <ul className="space-y-2">
+            {scenarios.map((scenario) => (
+              <li
+                key={scenario.scenario_number}
+                className="p-3 bg-gray-50 rounded border-l-4 border-primary-500"
+              >
+                <p className="text-sm font-semibold text-gray-800">{scenario.title}</p>
+                {scenario.timeline && (
+                  <p className="text-xs text-gray-600">
+                    <span className="font-semibold">Timeline:</span> {scenario.timeline}
+                  </p>
+                )}
+              </li>
+            ))}
+          </ul>
+        </div>
+      )}
     </div>
   );
 };
@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useCallback } from 'react';
 import api from '../services/api';
 
 export interface Analysis {
@@ -63,72 +63,72 @@ export const useAnalysis = (analysisId: number | null) => {
   return { analysis, loading, error };
 };
 
+// Response header carrying the cursor of the next page of /api/analyses
+const NEXT_CURSOR_HEADER = 'x-next-cursor';
+
 export const useAnalyses = () => {
   const [analyses, setAnalyses] = useState<Analysis[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState<string | null>(null);
 
-  useEffect(() => {
-    const fetchAnalyses = async () => {
-      setLoading(true);
-      setError(null);
-      try {
-        console.log('[useAnalyses] Fetching analyses from /api/analyses');
-        const response = await api.get('/api/analyses');
-        console.log('[useAnalyses] Received response:', response.data);
-        const analysesData = response.data || [];
-        console.log(`[useAnalyses] Setting ${analysesData.length} analyses`);
-        setAnalyses(analysesData);
-      } catch (err: any) {
-        console.error('[useAnalyses] Error fetching analyses:', err);
-        console.error('[useAnalyses] Error details:', {
-          message: err.message,
-          response: err.response?.data,
-          status: err.response?.status,
-          statusText: err.response?.statusText
-        });
-        // Handle 404 or other errors more gracefully
-        if (err.response?.status === 404) {
-          // If endpoint doesn't exist, treat as empty list (analyses feature may not be available)
-          console.warn('[useAnalyses] 404 - Endpoint not found, treating as empty list');
-          setAnalyses([]);
-          setError(null);
-        } else {
-          const errorMsg = err.response?.data?.detail || err.message || 'Unable to load analyses. Please try again later.';
-          console.error('[useAnalyses] Setting error:', errorMsg);
-          setError(errorMsg);
-        }
-      } finally {
-        setLoading(false);
-        console.log('[useAnalyses] Loading complete');
+  // Fetch one page; without a cursor the list starts over from the newest
+  const fetchPage = useCallback(async (cursor?: string) => {
+    const setBusy = cursor ? setLoadingMore : setLoading;
+    setBusy(true);
+    setError(null);
+    try {
+      console.log('[useAnalyses] Fetching analyses from /api/analyses', cursor ? { cursor } : '');
+      const response = await api.get('/api/analyses', { params: cursor ? { cursor } : undefined });
+      const analysesData: Analysis[] = response.data || [];
+      console.log(`[useAnalyses] Received ${analysesData.length} analyses`);
+      setAnalyses((previous) => (cursor ? [...previous, ...analysesData] : analysesData));
+      setNextCursor(response.headers?.[NEXT_CURSOR_HEADER] || null);
+    } catch (err: any) {
+      console.error('[useAnalyses] Error fetching analyses:', err);
+      console.error('[useAnalyses] Error details:', {
+        message: err.message,
+        response: err.response?.data,
+        status: err.response?.status,
+        statusText: err.response?.statusText
+      });
+      // Handle 404 or other errors more gracefully
+      if (err.response?.status === 404 && !cursor) {
+        // If endpoint doesn't exist, treat as empty list (analyses feature may not be available)
+        console.warn('[useAnalyses] 404 - Endpoint not found, treating as empty list');
+        setAnalyses([]);
+        setNextCursor(null);
+        setError(null);
+      } else {
+        const errorMsg = err.response?.data?.detail || err.message || 'Unable to load analyses. Please try again later.';
+        console.error('[useAnalyses] Setting error:', errorMsg);
+        setError(errorMsg);
       }
-    };
-
-    fetchAnalyses();
+    } finally {
+      setBusy(false);
+    }
   }, []);
 
-  return { analyses, loading, error, refetch: () => {
-    const fetchAnalyses = async () => {
-      setLoading(true);
-      setError(null);
-      try {
-        const response = await api.get('/api/analyses');
-        setAnalyses(response.data || []);
-      } catch (err: any) {
-        // Handle 404 or other errors more gracefully
-        if (err.response?.status === 404) {
-          // If endpoint doesn't exist, treat as empty list (analyses feature may not be available)
-          setAnalyses([]);
-          setError(null);
-        } else {
-          setError(err.response?.data?.detail || 'Unable to load analyses. Please try again later.');
-        }
-      } finally {
-        setLoading(false);
-      }
-    };
-    fetchAnalyses();
-  }};
+  useEffect(() => {
+    fetchPage();
+  }, [fetchPage]);
+
+  const loadMore = useCallback(() => {
+    if (nextCursor && !loadingMore) {
+      fetchPage(nextCursor);
+    }
+  }, [fetchPage, nextCursor, loadingMore]);
+
+  return {
+    analyses,
+    loading,
+    loadingMore,
+    error,
+    hasMore: nextCursor !== null,
+    loadMore,
+    refetch: () => fetchPage()
+  };
 };
 
 export const createAnalysis = async (companyName: string): Promise<Analysis> => {
@@ -1,5 +1,6 @@
 import { useState, useEffect, useRef } from 'react';
 import { SSEClient, SSEEvent } from '../services/sse';
+import { Scenario } from './useAnalysis';
 
 export interface StreamStatus {
   currentStep: string;
@@ -7,6 +8,9 @@ export interface StreamStatus {
   progress: number;
 }
 
+// A scenario published as soon as it is generated, before it is saved
+export type StreamedScenario = Omit<Scenario, 'id'>;
+
 export const useAnalysisStream = (analysisId: number | null) => {
   const [status, setStatus] = useState<StreamStatus>({
     currentStep: 'idle',
@@ -14,6 +18,9 @@ export const useAnalysisStream = (analysisId: number | null) => {
     progress: 0,
   });
   const [error, setError] = useState<string | null>(null);
+  // Company context as it is being written, and scenarios as each one is ready
+  const [researchContext, setResearchContext] = useState('');
+  const [scenarios, setScenarios] = useState<StreamedScenario[]>([]);
   const clientRef = useRef<SSEClient | null>(null);
   const lastEventTimeRef = useRef<number>(Date.now());
   const statusPollIntervalRef = useRef<number | null>(null);
@@ -24,6 +31,9 @@ export const useAnalysisStream = (analysisId: number | null) => {
       return;
     }
 
+    setResearchContext('');
+    setScenarios([]);
+
     // Fallback: Poll status if no events received for 15 seconds
     const startStatusPolling = () => {
       if (statusPollIntervalRef.current) {
@@ -139,6 +149,11 @@ export const useAnalysisStream = (analysisId: number | null) => {
             });
             break;
 
+          case 'research_context_delta':
+            // Text deltas of the company context; the message is the text itself
+            setResearchContext((prev) => prev + (data.message || ''));
+            break;
+
           case 'research_complete':
             currentStepRef.current = 'research';
             setStatus({
@@ -157,6 +172,22 @@ export const useAnalysisStream = (analysisId: number | null) => {
             });
             break;
 
+          case 'scenario_ready':
+            // The scenario is left out of events too large for the progress bus
+            if (data.scenario) {
+              const scenario: StreamedScenario = data.scenario;
+              setScenarios((prev) =>
+                prev.some((s) => s.scenario_number === scenario.scenario_number)
+                  ? prev
+                  : [...prev, scenario]
+              );
+            }
+            setStatus((prev) => ({
+              ...prev,
+              message: data.message || prev.message,
+            }));
+            break;
+
           case 'scenarios_complete':
             currentStepRef.current = 'scenarios';
             setStatus({
@@ -262,6 +293,6 @@ export const useAnalysisStream = (analysisId: number | null) => {
     };
   }, [analysisId]);
 
-  return { status, error };
+  return { status, error, researchContext, scenarios };
 };
 
@@ -5,6 +5,24 @@ export interface SSEEvent {
   data: any;
 }
 
+// Named events forwarded to onMessage; add new event types here
+const PROGRESS_EVENTS = [
+  'status',
+  'analysis_start',
+  'research_start',
+  'research_context_delta',
+  'research_complete',
+  'scenarios_start',
+  'scenario_ready',
+  'scenarios_complete',
+  'strategies_start',
+  'strategies_complete',
+  'strategy_progress',
+];
+
+// Events after which the stream is closed for good
+const TERMINAL_EVENTS = ['analysis_complete', 'analysis_failed'];
+
 export class SSEClient {
   private eventSource: EventSource | null = null;
   private reconnectAttempts = 0;
@@ -12,6 +30,8 @@ export class SSEClient {
   private reconnectDelay = 1000;
   private shouldReconnect = true;
   private isTerminalState = false;
+  // Id of the last event received, so a new connection resumes where the old one stopped
+  private lastEventId: string | null = null;
 
   constructor(
     private url: string,
@@ -21,8 +41,16 @@ export class SSEClient {
   ) {}
 
   connect(): void {
-    const fullUrl = `${API_URL}${this.url}`;
+    let fullUrl = `${API_URL}${this.url}`;
+    // EventSource resends Last-Event-ID on its own reconnects, but not on a new instance
+    if (this.lastEventId) {
+      const separator = fullUrl.includes('?') ? '&' : '?';
+      fullUrl += `${separator}last_event_id=${encodeURIComponent(this.lastEventId)}`;
+    }
 
+    if (this.eventSource) {
+      this.eventSource.close();
+    }
     this.eventSource = new EventSource(fullUrl);
 
     this.eventSource.onopen = () => {
@@ -32,158 +60,21 @@ export class SSEClient {
       }
     };
 
-    this.eventSource.onmessage = (event) => {
-      try {
-        const data = JSON.parse(event.data);
-        this.onMessage({
-          event: 'message',
-          data,
-        });
-      } catch (error) {
-        console.error('Error parsing SSE message:', error);
-      }
-    };
+    this.eventSource.onmessage = (event) => this.dispatch('message', event);
 
     // Handle custom events
-    this.eventSource.addEventListener('status', (event: any) => {
-      try {
-        const data = JSON.parse(event.data);
-        this.onMessage({
-          event: 'status',
-          data,
-        });
-      } catch (error) {
-        console.error('Error parsing SSE status:', error);
-      }
-    });
-
-    this.eventSource.addEventListener('research_start', (event: any) => {
-      try {
-        const data = JSON.parse(event.data);
-        this.onMessage({
-          event: 'research_start',
-          data,
-        });
-      } catch (error) {
-        console.error('Error parsing SSE research_start:', error);
-      }
-    });
-
-    this.eventSource.addEventListener('research_complete', (event: any) => {
-      try {
-        const data = JSON.parse(event.data);
-        this.onMessage({
-          event: 'research_complete',
-          data,
-        });
-      } catch (error) {
-        console.error('Error parsing SSE research_complete:', error);
-      }
-    });
-
-    this.eventSource.addEventListener('scenarios_start', (event: any) => {
-      try {
-        const data = JSON.parse(event.data);
-        this.onMessage({
-          event: 'scenarios_start',
-          data,
-        });
-      } catch (error) {
-        console.error('Error parsing SSE scenarios_start:', error);
-      }
-    });
-
-    this.eventSource.addEventListener('scenarios_complete', (event: any) => {
-      try {
-        const data = JSON.parse(event.data);
-        this.onMessage({
-          event: 'scenarios_complete',
-          data,
-        });
-      } catch (error) {
-        console.error('Error parsing SSE scenarios_complete:', error);
-      }
-    });
-
-    this.eventSource.addEventListener('strategies_start', (event: any) => {
-      try {
-        const data = JSON.parse(event.data);
-        this.onMessage({
-          event: 'strategies_start',
-          data,
-        });
-      } catch (error) {
-        console.error('Error parsing SSE strategies_start:', error);
-      }
-    });
-
-    this.eventSource.addEventListener('strategies_complete', (event: any) => {
-      try {
-        const data = JSON.parse(event.data);
-        this.onMessage({
-          event: 'strategies_complete',
-          data,
-        });
-      } catch (error) {
-        console.error('Error parsing SSE strategies_complete:', error);
-      }
-    });
-
-    this.eventSource.addEventListener('analysis_complete', (event: any) => {
-      try {
-        const data = JSON.parse(event.data);
-        this.isTerminalState = true;
-        this.shouldReconnect = false;
-        this.onMessage({
-          event: 'analysis_complete',
-          data,
-        });
-        // Close connection after completion
-        this.disconnect();
-      } catch (error) {
-        console.error('Error parsing SSE analysis_complete:', error);
-      }
-    });
-
-    this.eventSource.addEventListener('analysis_start', (event: any) => {
-      try {
-        const data = JSON.parse(event.data);
-        this.onMessage({
-          event: 'analysis_start',
-          data,
-        });
-      } catch (error) {
-        console.error('Error parsing SSE analysis_start:', error);
-      }
-    });
-
-    this.eventSource.addEventListener('analysis_failed', (event: any) => {
-      try {
-        const data = JSON.parse(event.data);
+    for (const eventType of PROGRESS_EVENTS) {
+      this.eventSource.addEventListener(eventType, (event) => this.dispatch(eventType, event as MessageEvent));
+    }
+    for (const eventType of TERMINAL_EVENTS) {
+      this.eventSource.addEventListener(eventType, (event) => {
         this.isTerminalState = true;
         this.shouldReconnect = false;
-        this.onMessage({
-          event: 'analysis_failed',
-          data,
-        });
-        // Close connection after failure
+        this.dispatch(eventType, event as MessageEvent);
+        // Close connection after completion or failure
         this.disconnect();
-      } catch (error) {
-        console.error('Error parsing SSE analysis_failed:', error);
-      }
-    });
-
-    this.eventSource.addEventListener('strategy_progress', (event: any) => {
-      try {
-        const data = JSON.parse(event.data);
-        this.onMessage({
-          event: 'strategy_progress',
-          data,
-        });
-      } catch (error) {
-        console.error('Error parsing SSE strategy_progress:', error);
-      }
-    });
+      });
+    }
 
     this.eventSource.onerror = (error) => {
       console.log('[SSE] Error event received', {
@@ -235,6 +126,21 @@ export class SSEClient {
     };
   }
 
+  // Every event goes through here, so each one's id is recorded for Last-Event-ID resume
+  private dispatch(eventType: string, event: MessageEvent): void {
+    if (event.lastEventId) {
+      this.lastEventId = event.lastEventId;
+    }
+    try {
+      this.onMessage({
+        event: eventType,
+        data: JSON.parse(event.data),
+      });
+    } catch (error) {
+      console.error(`Error parsing SSE ${eventType}:`, error);
+    }
+  }
+
   disconnect(): void {
     console.log('[SSE] Disconnecting');
     this.shouldReconnect = false;